@@ -0,0 +1,129 @@
+"""
+Conditional GET
+Per-tenant resource version counters behind weak ETags and Last-Modified
+"""
+import functools
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ResourceVersions:
+    """
+    A version stamp per (resource, tenant), bumped from model signals.
+
+    The stamp is the time of the last change in nanoseconds, so it doubles as
+    Last-Modified, and a counter lost to cache eviction comes back as "now"
+    instead of an old value some client may still hold an ETag for. Bumps run
+    on transaction commit, so a request can never pair a new stamp with rows
+    it could not yet see.
+
+    Stamps are coarse: any diet plan written in a gym invalidates every
+    member's diet plan list there. Polls still get a 304 whenever nothing in
+    the gym changed, which is the common case.
+    """
+
+    KEY_PREFIX = 'api_version'
+
+    @staticmethod
+    def _key(resource, tenant_id):
+        return f'{ResourceVersions.KEY_PREFIX}:{resource}:{tenant_id}'
+
+    @staticmethod
+    def get(resource, tenant_id):
+        key = ResourceVersions._key(resource, tenant_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key) or time.time_ns()
+        return version
+
+    @staticmethod
+    def bump(resource, tenant_id):
+        if tenant_id is None:
+            return
+        key = ResourceVersions._key(resource, tenant_id)
+        transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+    @staticmethod
+    def etag(request, resource, version, scope=()):
+        """
+        Weak ETag for this representation: the version plus everything else
+        the body depends on (URL with host and query, negotiated format, scope)
+        """
+        parts = [
+            resource, str(version), request.build_absolute_uri(),
+            getattr(request, 'accepted_media_type', '') or '', *map(str, scope),
+        ]
+        return f'W/"{hashlib.md5("|".join(parts).encode()).hexdigest()}"'
+
+    @staticmethod
+    def respond(request, resource, build, scope=()):
+        """
+        Answer a GET from the resource's version, calling build() for the
+        response only when the client's copy is stale.
+        """
+        tenant = getattr(request, 'tenant', None)
+        if request.method not in ('GET', 'HEAD') or tenant is None:
+            return build()
+
+        version = ResourceVersions.get(resource, tenant.id)
+        etag = ResourceVersions.etag(request, resource, version, scope)
+        last_modified = int(version // 1_000_000_000)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Read-only viewset mixin answering unchanged list/retrieve calls with 304
+    before the queryset is evaluated or serialized.
+
+    Set `conditional_resource` to the name the model signals bump, and
+    override conditional_scope() when the payload depends on who is asking.
+    """
+
+    conditional_resource = None
+
+    def conditional_scope(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return ResourceVersions.respond(
+            request, self.conditional_resource,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            self.conditional_scope(),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return ResourceVersions.respond(
+            request, self.conditional_resource,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            self.conditional_scope(),
+        )
+
+
+def conditional_get(resource):
+    """Function-view decorator (inside @api_view) with the same behaviour"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return ResourceVersions.respond(request, resource, lambda: view(request, *args, **kwargs))
+        return wrapped
+    return decorator
+
+
+# Convenience functions
+def bump_resource_version(resource, tenant_id):
+    """Quick function to invalidate a tenant's cached copies of an API resource"""
+    ResourceVersions.bump(resource, tenant_id)
@@ -0,0 +1,118 @@
+"""
+Member Dashboard Cache
+Serialized member dashboard payloads with ETags, invalidated from model signals
+"""
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from core.models import Attendance, MemberProfile, Payment, Subscription
+
+
+class MemberDashboardCache:
+    """
+    The mobile app's launch call, cached per member as ready-to-send JSON bytes.
+
+    An entry holds the rendered body and its ETag, plus the day and host it
+    was built for: payment_due_days changes at midnight and image URLs are
+    absolute, so either changing counts as a miss. Entries are keyed by user
+    id, which the view knows without touching the database. A request whose
+    If-None-Match matches gets a 304 straight from the cache entry.
+
+    api.signals drops a member's entry when their Attendance, Payment,
+    Subscription, profile or user row is written or deleted. The drop waits
+    for the transaction to commit; otherwise a request in between could
+    rebuild the entry from the old rows and serve it for the rest of the day.
+    bulk_create/bulk_update and queryset update()/delete() skip the signals,
+    so code changing those rows in bulk must call invalidate() itself.
+    gym.phone_import's bulk_update needs none: phone_number is not part of
+    the payload.
+    """
+
+    CACHE_TIMEOUT = 24 * 60 * 60
+    KEY_PREFIX = 'member_dashboard'
+    RECENT_PAYMENTS = 5
+
+    @staticmethod
+    def _key(user_id):
+        return f'{MemberDashboardCache.KEY_PREFIX}:{user_id}'
+
+    @staticmethod
+    def build(member, request):
+        """Compute and serialize the dashboard payload"""
+        from .serializers import MemberProfileSerializer, PaymentSerializer, SubscriptionSerializer
+
+        today = timezone.localdate()
+        total_attendance = Attendance.objects.filter(member=member, status='Present').count()
+
+        payment_due_days = None
+        if member.next_payment_date:
+            payment_due_days = (member.next_payment_date - today).days
+
+        active_sub = Subscription.objects.filter(member=member, status='active').first()
+        recent_payments = Payment.objects.filter(member=member).order_by('-date')[:MemberDashboardCache.RECENT_PAYMENTS]
+
+        context = {'request': request}
+        data = {
+            'profile': MemberProfileSerializer(member, context=context).data,
+            'total_attendance': total_attendance,
+            'payment_due_days': payment_due_days,
+            'active_subscription': SubscriptionSerializer(active_sub, context=context).data if active_sub else None,
+            'recent_payments': PaymentSerializer(recent_payments, many=True, context=context).data,
+        }
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+    @staticmethod
+    def get(user_id, host):
+        """(etag, body) cached for this user today, or None"""
+        entry = cache.get(MemberDashboardCache._key(user_id))
+        if not entry:
+            return None
+        day, cached_host, etag, body = entry
+        if day != timezone.localdate().isoformat() or cached_host != host:
+            return None
+        return etag, body
+
+    @staticmethod
+    def set(user_id, host, body):
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        cache.set(
+            MemberDashboardCache._key(user_id),
+            (timezone.localdate().isoformat(), host, etag, body),
+            MemberDashboardCache.CACHE_TIMEOUT,
+        )
+        return etag
+
+    @staticmethod
+    def get_or_build(user, request):
+        """(etag, body) for the user's dashboard, building it on a miss"""
+        host = request.get_host()
+        cached = MemberDashboardCache.get(user.id, host)
+        if cached:
+            return cached
+        body = MemberDashboardCache.build(user.member_profile, request)
+        return MemberDashboardCache.set(user.id, host, body), body
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop entries for user ids once the current transaction commits"""
+        keys = [MemberDashboardCache._key(user_id) for user_id in user_ids if user_id is not None]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @staticmethod
+    def invalidate_members(*member_ids):
+        """Drop entries for member profile ids"""
+        member_ids = [member_id for member_id in member_ids if member_id is not None]
+        if member_ids:
+            MemberDashboardCache.invalidate(
+                *MemberProfile.objects.filter(pk__in=member_ids).values_list('user_id', flat=True)
+            )
+
+
+# Convenience functions
+def invalidate_member_dashboard(member):
+    """Quick function to drop a member's cached dashboard"""
+    MemberDashboardCache.invalidate(member.user_id)
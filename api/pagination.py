@@ -0,0 +1,172 @@
+"""
+API Pagination
+Keyset (cursor) pagination on composite ordering keys for append-heavy tables
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-method pagination: each page is "the next page_size rows after this
+    key", so page 500 costs the same index range scan as page 1 and no
+    COUNT(*) is run.
+
+    Opt in per viewset with `pagination_class = KeysetPagination` and a
+    `keyset_ordering` tuple of non-nullable fields that ends in a unique
+    field, e.g. ('-date', '-check_in_time', '-id'). Back it with a composite
+    index on the filter columns followed by the same fields. The ordering
+    query parameter is ignored on these endpoints.
+
+    The cursor is an opaque token holding the boundary row's key values and
+    the direction; responses carry next/previous links but no count.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(cursor['key'], reverse))
+        queryset = queryset.order_by(*(self._flip(field) if reverse else field for field in self.ordering))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = bool(cursor) and (has_more if reverse else True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Ordering and seek predicates
+    # ------------------------------------------------------------------
+
+    def get_ordering(self, queryset, view):
+        ordering = tuple(getattr(view, 'keyset_ordering', ()) or ())
+        if not ordering:
+            raise ImproperlyConfigured(f"{view.__class__.__name__} must set keyset_ordering to use KeysetPagination")
+        for field in ordering:
+            model_field = queryset.model._meta.get_field(field.lstrip('-'))
+            if model_field.null:
+                raise ImproperlyConfigured(f"Keyset field '{model_field.name}' must not be nullable")
+        return ordering
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def seek_filter(self, key, reverse=False):
+        """
+        Rows strictly after key in ordering (before it when reverse), as the
+        expanded lexicographic comparison
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z).
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, key):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    # ------------------------------------------------------------------
+    # Cursors
+    # ------------------------------------------------------------------
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def row_key(self, row):
+        return [self._dump(getattr(row, field.lstrip('-'))) for field in self.ordering]
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (date, datetime, time)):
+            return value.isoformat()
+        return value
+
+    def _load(self, model, key):
+        values = []
+        for field, value in zip(self.ordering, key):
+            internal_type = model._meta.get_field(field.lstrip('-')).get_internal_type()
+            parser = {'DateField': parse_date, 'DateTimeField': parse_datetime, 'TimeField': parse_time}.get(internal_type)
+            parsed = parser(value) if parser and isinstance(value, str) else value
+            if parser and parsed is None:
+                raise ValueError(value)
+            values.append(parsed)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        payload = json.dumps({'k': self.row_key(row), 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            key = payload['k']
+            if not isinstance(key, list) or len(key) != len(self.ordering):
+                raise ValueError(key)
+            return {'key': self._load(model, key), 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -0,0 +1,83 @@
+"""
+Model signal handlers for the api app
+"""
+from django.db.models.signals import post_save, post_delete
+from core.models import (
+    Attendance, BrandingConfig, CustomUser, DietPlan, MemberProfile, Payment, Subscription, Tenant, WorkoutVideo,
+)
+from .conditional import ResourceVersions
+from .dashboard_cache import MemberDashboardCache
+
+
+# ==================== Member dashboard cache ====================
+
+def _cached_user_id(instance):
+    """The member's user id without a query when the relation is already loaded"""
+    if type(instance).member.is_cached(instance):
+        return instance.member.user_id
+    return None
+
+
+def drop_member_dashboard(sender, instance, **kwargs):
+    user_id = _cached_user_id(instance)
+    if user_id is not None:
+        MemberDashboardCache.invalidate(user_id)
+    else:
+        MemberDashboardCache.invalidate_members(instance.member_id)
+
+
+def drop_profile_dashboard(sender, instance, **kwargs):
+    MemberDashboardCache.invalidate(instance.user_id)
+
+
+def drop_user_dashboard(sender, instance, **kwargs):
+    if instance.role == 'member':
+        MemberDashboardCache.invalidate(instance.pk)
+
+
+for model in (Attendance, Payment, Subscription):
+    post_save.connect(drop_member_dashboard, sender=model, dispatch_uid=f'member_dashboard_save_{model.__name__}')
+    post_delete.connect(drop_member_dashboard, sender=model, dispatch_uid=f'member_dashboard_delete_{model.__name__}')
+
+post_save.connect(drop_profile_dashboard, sender=MemberProfile, dispatch_uid='member_dashboard_save_profile')
+post_delete.connect(drop_profile_dashboard, sender=MemberProfile, dispatch_uid='member_dashboard_delete_profile')
+post_save.connect(drop_user_dashboard, sender=CustomUser, dispatch_uid='member_dashboard_save_user')
+
+
+# ==================== Conditional GET versions ====================
+
+def bump_diet_plans(sender, instance, **kwargs):
+    tenant_id = instance.tenant_id
+    if tenant_id is None and instance.member_id:
+        tenant_id = MemberProfile.objects.filter(pk=instance.member_id).values_list('tenant_id', flat=True).first()
+    ResourceVersions.bump('diet_plans', tenant_id)
+
+
+def bump_workout_videos(sender, instance, **kwargs):
+    ResourceVersions.bump('workout_videos', instance.tenant_id)
+
+
+def bump_members(sender, instance, **kwargs):
+    ResourceVersions.bump('members', instance.tenant_id)
+
+
+def bump_user_resources(sender, instance, **kwargs):
+    # Usernames appear in member lists and on diet plans
+    ResourceVersions.bump('members', instance.tenant_id)
+    ResourceVersions.bump('diet_plans', instance.tenant_id)
+
+
+def bump_branding(sender, instance, **kwargs):
+    ResourceVersions.bump('branding', instance.pk if sender is Tenant else instance.tenant_id)
+
+
+for model, handler in (
+    (DietPlan, bump_diet_plans),
+    (WorkoutVideo, bump_workout_videos),
+    (MemberProfile, bump_members),
+    (CustomUser, bump_user_resources),
+    (BrandingConfig, bump_branding),
+    (Tenant, bump_branding),
+):
+    post_save.connect(handler, sender=model, dispatch_uid=f'resource_version_save_{model.__name__}')
+    post_delete.connect(handler, sender=model, dispatch_uid=f'resource_version_delete_{model.__name__}')
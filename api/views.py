@@ -4,11 +4,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.http import HttpResponse, HttpResponseNotModified
 from django.utils import timezone
+from django.utils.http import parse_etags
 from django.db.models import Count, Q
 from core.models import *
 from .serializers import *
+from .conditional import ConditionalGetMixin, conditional_get
+from .dashboard_cache import MemberDashboardCache
+from .pagination import KeysetPagination
 from .permissions import IsTenantUser, IsMember, IsTrainer, IsTenantAdmin
+from gym.engagement_service import engagement_tracker
 
 
 # ==================== Authentication ====================
@@ -39,13 +45,18 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get('branding')
 def get_branding(request):
     """Get tenant branding configuration"""
     tenant = request.tenant
     if not tenant:
         return Response({'error': 'Tenant not found'}, status=404)
     
-    branding = BrandingConfig.objects.filter(tenant=tenant).first()
+    # Loaded together with the tenant by the resolver cache
+    try:
+        branding = tenant.branding
+    except BrandingConfig.DoesNotExist:
+        branding = None
     if branding:
         serializer = BrandingSerializer(branding, context={'request': request})
         return Response(serializer.data)
@@ -65,42 +76,19 @@ def get_branding(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsMember])
 def member_dashboard(request):
-    """Get member dashboard data"""
+    """Get member dashboard data (cached per member, honours If-None-Match)"""
     try:
-        member = request.user.member_profile
+        etag, body = MemberDashboardCache.get_or_build(request.user, request)
     except MemberProfile.DoesNotExist:
         return Response({'error': 'Member profile not found'}, status=404)
     
-    today = timezone.now().date()
-    
-    # Calculate stats
-    total_attendance = Attendance.objects.filter(
-        member=member, 
-        status='Present'
-    ).count()
-    
-    payment_due_days = None
-    if member.next_payment_date:
-        payment_due_days = (member.next_payment_date - today).days
-    
-    # Active subscription
-    active_sub = Subscription.objects.filter(
-        member=member, 
-        status='active'
-    ).first()
-    
-    # Recent payments
-    recent_payments = Payment.objects.filter(member=member).order_by('-date')[:5]
-    
-    data = {
-        'profile': MemberProfileSerializer(member, context={'request': request}).data,
-        'total_attendance': total_attendance,
-        'payment_due_days': payment_due_days,
-        'active_subscription': SubscriptionSerializer(active_sub, context={'request': request}).data if active_sub else None,
-        'recent_payments': PaymentSerializer(recent_payments, many=True, context={'request': request}).data,
-    }
-    
-    return Response(data)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @api_view(['POST'])
@@ -132,6 +120,7 @@ def member_check_in(request):
         date=today,
         status='Present'
     )
+    engagement_tracker.record_attendance(attendance)
     
     return Response(
         AttendanceSerializer(attendance, context={'request': request}).data,
@@ -143,28 +132,36 @@ class MemberAttendanceViewSet(viewsets.ReadOnlyModelViewSet):
     """Member attendance history"""
     permission_classes = [IsAuthenticated, IsMember]
     serializer_class = AttendanceSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-check_in_time', '-id')
     
     def get_queryset(self):
         return Attendance.objects.filter(
             member=self.request.user.member_profile
-        ).order_by('-date')
+        ).select_related('member__user').order_by(*self.keyset_ordering)
 
 
 class MemberPaymentViewSet(viewsets.ReadOnlyModelViewSet):
     """Member payment history"""
     permission_classes = [IsAuthenticated, IsMember]
     serializer_class = PaymentSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
     
     def get_queryset(self):
         return Payment.objects.filter(
             member=self.request.user.member_profile
-        ).order_by('-date')
+        ).order_by(*self.keyset_ordering)
 
 
-class MemberDietPlanViewSet(viewsets.ReadOnlyModelViewSet):
+class MemberDietPlanViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Member diet plans"""
     permission_classes = [IsAuthenticated, IsMember]
     serializer_class = DietPlanSerializer
+    conditional_resource = 'diet_plans'
+    
+    def conditional_scope(self):
+        return (self.request.user.pk,)
     
     def get_queryset(self):
         return DietPlan.objects.filter(
@@ -172,10 +169,11 @@ class MemberDietPlanViewSet(viewsets.ReadOnlyModelViewSet):
         ).order_by('-created_at')
 
 
-class MemberWorkoutVideoViewSet(viewsets.ReadOnlyModelViewSet):
+class MemberWorkoutVideoViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Member workout videos"""
     permission_classes = [IsAuthenticated]
     serializer_class = WorkoutVideoSerializer
+    conditional_resource = 'workout_videos'
     
     def get_queryset(self):
         queryset = WorkoutVideo.objects.all().order_by('-uploaded_at')
@@ -232,10 +230,11 @@ def trainer_dashboard(request):
     return Response(data)
 
 
-class TrainerMemberViewSet(viewsets.ReadOnlyModelViewSet):
+class TrainerMemberViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Trainer view of members"""
     permission_classes = [IsAuthenticated, IsTrainer]
     serializer_class = MemberProfileSerializer
+    conditional_resource = 'members'
     
     def get_queryset(self):
         queryset = MemberProfile.objects.all().select_related('user')
@@ -248,15 +247,18 @@ class TrainerAttendanceViewSet(viewsets.ModelViewSet):
     """Trainer attendance management"""
     permission_classes = [IsAuthenticated, IsTrainer]
     serializer_class = AttendanceSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-check_in_time', '-id')
     
     def get_queryset(self):
-        queryset = Attendance.objects.all().select_related('member__user').order_by('-date', '-check_in_time')
+        queryset = Attendance.objects.all().select_related('member__user').order_by(*self.keyset_ordering)
         if self.request.tenant:
             queryset = queryset.filter(tenant=self.request.tenant)
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save(tenant=self.request.tenant)
+        attendance = serializer.save(tenant=self.request.tenant)
+        engagement_tracker.record_attendance(attendance)
 
 
 class TrainerSessionViewSet(viewsets.ModelViewSet):
@@ -280,9 +282,11 @@ class TrainerLeaveRequestViewSet(viewsets.ModelViewSet):
     """Trainer leave request management"""
     permission_classes = [IsAuthenticated, IsTrainer]
     serializer_class = LeaveRequestSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = LeaveRequest.objects.all().select_related('member__user').order_by('-created_at')
+        queryset = LeaveRequest.objects.all().select_related('member__user').order_by(*self.keyset_ordering)
         if self.request.tenant:
             queryset = queryset.filter(tenant=self.request.tenant)
         return queryset
@@ -3,14 +3,16 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     Tenant, BrandingConfig, CustomUser, MemberProfile, Attendance, Payment, 
     Expense, DietPlan, WorkoutVideo, ChatMessage, LeaveRequest, Subscription,
-    TrainerSession, AuditLog, WhatsAppMessage,
+    TrainerSession, AuditLog, WhatsAppMessage, WhatsAppDelivery, PaymentReminderLedger,
     # Payment Gateway Models
     PaymentGateway, SubscriptionPayment, PaymentMethod, PaymentWebhook,
     # Booking System Models
-    ClassSchedule, ClassBooking, PersonalTrainingSession, BookingSettings,
+    ClassSchedule, ClassBooking, ClassOccurrence, PersonalTrainingSession, BookingSettings,
     # Gamification Models
     Exercise, WorkoutLog, PersonalBest, Achievement, MemberEngagementScore,
-    Leaderboard, Challenge, ChallengeParticipation
+    ChurnModelArtifact, Leaderboard, Challenge, ChallengeParticipation,
+    # Background Jobs
+    BackgroundJob
 )
 
 class MemberProfileInline(admin.StackedInline):
@@ -42,6 +44,8 @@ admin.site.register(Subscription)
 admin.site.register(TrainerSession)
 admin.site.register(AuditLog)
 admin.site.register(WhatsAppMessage)
+admin.site.register(WhatsAppDelivery)
+admin.site.register(PaymentReminderLedger)
 
 # ============================================
 # PHASE 1 MODERNIZATION - NEW MODELS
@@ -88,6 +92,12 @@ class ClassBookingAdmin(admin.ModelAdmin):
     search_fields = ('member__user__username', 'class_schedule__class_name')
     readonly_fields = ('booked_at', 'cancelled_at', 'checked_in_at')
 
+@admin.register(ClassOccurrence)
+class ClassOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ('class_schedule', 'booking_date', 'confirmed_count', 'waitlist_count', 'updated_at')
+    list_filter = ('booking_date', 'class_schedule__class_name')
+    readonly_fields = ('updated_at',)
+
 @admin.register(PersonalTrainingSession)
 class PersonalTrainingSessionAdmin(admin.ModelAdmin):
     list_display = ('trainer', 'member', 'session_date', 'start_time', 'status', 'rating')
@@ -133,6 +143,13 @@ class MemberEngagementScoreAdmin(admin.ModelAdmin):
     search_fields = ('member__user__username',)
     readonly_fields = ('calculated_at',)
 
+@admin.register(ChurnModelArtifact)
+class ChurnModelArtifactAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'training_samples', 'churn_rate', 'horizon_days', 'trained_at')
+    list_filter = ('trained_at',)
+    exclude = ('model_blob',)
+    readonly_fields = ('feature_names', 'metrics', 'trained_at')
+
 @admin.register(Leaderboard)
 class LeaderboardAdmin(admin.ModelAdmin):
     list_display = ('leaderboard_type', 'member', 'rank', 'score', 'period_start', 'period_end')
@@ -151,3 +168,8 @@ class ChallengeParticipationAdmin(admin.ModelAdmin):
     list_filter = ('is_completed', 'challenge__status')
     search_fields = ('member__user__username', 'challenge__title')
 
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('job_type', 'tenant', 'status', 'progress_current', 'progress_total', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status', 'created_at')
+    readonly_fields = ('result', 'created_at', 'started_at', 'finished_at')
@@ -1,7 +1,8 @@
 """
 Booking System Models for Class Scheduling and Member Bookings
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from .models import Tenant, CustomUser, MemberProfile
@@ -135,16 +136,54 @@ class ClassBooking(models.Model):
     def __str__(self):
         return f"{self.member.user.username} - {self.class_schedule.class_name} on {self.booking_date}"
     
+    @classmethod
+    def book(cls, member, class_schedule, booking_date, allow_waitlist=True):
+        """
+        Book a seat, or a waitlist place when the class is full.
+        
+        Seats are claimed with a conditional UPDATE on the occurrence's
+        counter, so concurrent requests can never oversell the class.
+        
+        Raises:
+            ValidationError: already booked, or full with no waitlist room
+        """
+        with transaction.atomic():
+            occurrence = ClassOccurrence.for_class(class_schedule, booking_date)
+            existing = cls.objects.select_for_update().filter(
+                class_schedule=class_schedule, member=member, booking_date=booking_date
+            ).first()
+            if existing and existing.status in ['confirmed', 'waitlist']:
+                raise ValidationError("You have already booked this class")
+            
+            waitlist_position = None
+            if occurrence.claim('confirmed_count', class_schedule.capacity):
+                status = 'confirmed'
+            elif allow_waitlist and occurrence.claim('waitlist_count', class_schedule.waitlist_capacity):
+                status = 'waitlist'
+                occurrence.refresh_from_db(fields=['waitlist_count'])
+                waitlist_position = occurrence.waitlist_count
+            else:
+                raise ValidationError("Class is full and waitlist is not available")
+            
+            # Re-use a cancelled booking row; (schedule, member, date) is unique
+            booking = existing or cls(member=member, class_schedule=class_schedule, booking_date=booking_date)
+            booking.status = status
+            booking.waitlist_position = waitlist_position
+            booking.cancelled_at = None
+            booking.cancellation_reason = ''
+            booking.save()
+            return booking
+    
     def can_cancel(self):
         """Check if booking can be cancelled based on cancellation policy"""
         if self.status in ['cancelled', 'attended', 'no_show']:
             return False
         
         from datetime import datetime, timedelta
-        class_datetime = datetime.combine(
+        class_datetime = timezone.make_aware(datetime.combine(
             self.booking_date,
             self.class_schedule.start_time
-        )
+        ))
         cancellation_deadline = class_datetime - timedelta(
             hours=self.class_schedule.cancellation_allowed_hours_before
         )
@@ -156,22 +195,34 @@ class ClassBooking(models.Model):
         if not self.can_cancel():
             raise ValidationError("Cancellation deadline has passed")
         
-        self.status = 'cancelled'
-        self.cancelled_at = timezone.now()
-        self.cancellation_reason = reason
-        self.save()
-        
-        # Promote from waitlist
-        if self.status == 'confirmed':
-            self._promote_from_waitlist()
-    
-    def _promote_from_waitlist(self):
-        """Promote next person from waitlist"""
-        next_waitlist = ClassBooking.objects.filter(
+        with transaction.atomic():
+            locked = ClassBooking.objects.select_for_update().get(pk=self.pk)
+            previous_status = locked.status
+            if previous_status not in ['confirmed', 'waitlist']:
+                raise ValidationError("Booking is not active")
+            
+            self.status = 'cancelled'
+            self.cancelled_at = timezone.now()
+            self.cancellation_reason = reason
+            self.waitlist_position = None
+            self.save()
+            
+            occurrence = ClassOccurrence.for_class(self.class_schedule, self.booking_date)
+            if previous_status == 'waitlist':
+                occurrence.adjust(waitlist_count=-1)
+            elif not self._promote_from_waitlist(occurrence):
+                occurrence.adjust(confirmed_count=-1)
+    
+    def _promote_from_waitlist(self, occurrence):
+        """
+        Promote next person from waitlist into the seat this booking freed.
+        Returns the promoted booking, or None if the waitlist is empty.
+        """
+        next_waitlist = ClassBooking.objects.select_for_update().filter(
             class_schedule=self.class_schedule,
             booking_date=self.booking_date,
             status='waitlist'
-        ).order_by('waitlist_position').first()
+        ).order_by('waitlist_position', 'booked_at').first()
         
         if next_waitlist:
             next_waitlist.status = 'confirmed'
@@ -179,7 +230,47 @@ class ClassBooking(models.Model):
             next_waitlist.waitlist_position = None
             next_waitlist.save()
             
+            # The freed seat goes to the promoted member; only the waitlist shrinks
+            occurrence.adjust(waitlist_count=-1)
+            
             # TODO: Send notification to promoted member
+        return next_waitlist
+
+
+class ClassOccurrence(models.Model):
+    """Capacity counters for one dated occurrence of a class schedule"""
+    class_schedule = models.ForeignKey(ClassSchedule, on_delete=models.CASCADE, related_name='occurrences')
+    booking_date = models.DateField()
+    
+    confirmed_count = models.IntegerField(default=0, help_text="Seats taken (confirmed, attended or no-show)")
+    waitlist_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'class_occurrences'
+        unique_together = ['class_schedule', 'booking_date']
+    
+    def __str__(self):
+        return f"{self.class_schedule.class_name} on {self.booking_date} ({self.confirmed_count}/{self.class_schedule.capacity})"
+    
+    @classmethod
+    def for_class(cls, class_schedule, booking_date):
+        occurrence, _ = cls.objects.get_or_create(class_schedule=class_schedule, booking_date=booking_date)
+        return occurrence
+    
+    def claim(self, field, limit):
+        """Atomically increment a counter if it is below limit; True on success"""
+        return ClassOccurrence.objects.filter(pk=self.pk, **{f'{field}__lt': limit}).update(
+            **{field: F(field) + 1, 'updated_at': timezone.now()}
+        ) == 1
+    
+    def adjust(self, **deltas):
+        """Atomically add deltas to counters, e.g. adjust(confirmed_count=-1)"""
+        ClassOccurrence.objects.filter(pk=self.pk).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
 
 
 class PersonalTrainingSession(models.Model):
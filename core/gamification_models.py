@@ -86,34 +86,6 @@ class WorkoutLog(models.Model):
     
     def __str__(self):
         return f"{self.member.user.username} - {self.exercise.name} - {self.value}"
-    
-    def save(self, *args, **kwargs):
-        """Check if this is a personal best"""
-        if self.pk is None:  # New log
-            previous_best = PersonalBest.objects.filter(
-                member=self.member,
-                exercise=self.exercise
-            ).first()
-            
-            if previous_best:
-                if self.value > previous_best.best_value:
-                    self.is_personal_best = True
-                    # Update personal best
-                    previous_best.previous_best = previous_best.best_value
-                    previous_best.best_value = self.value
-                    previous_best.achieved_date = self.logged_at.date()
-                    previous_best.save()
-            else:
-                # First time logging this exercise
-                self.is_personal_best = True
-                PersonalBest.objects.create(
-                    member=self.member,
-                    exercise=self.exercise,
-                    best_value=self.value,
-                    achieved_date=self.logged_at.date()
-                )
-        
-        super().save(*args, **kwargs)
 
 
 class PersonalBest(models.Model):
@@ -222,7 +194,15 @@ class MemberEngagementScore(models.Model):
     last_visit_days_ago = models.IntegerField()
     current_streak_days = models.IntegerField(default=0)
     longest_streak_days = models.IntegerField(default=0)
-    
+
+    # Rolling 30-day counters (kept current by events, expired nightly)
+    attendance_count_30d = models.IntegerField(default=0)
+    workout_count_30d = models.IntegerField(default=0)
+    payment_count_30d = models.IntegerField(default=0)
+    achievement_count_30d = models.IntegerField(default=0)
+    last_visit_date = models.DateField(null=True, blank=True)
+    window_start = models.DateTimeField(null=True, blank=True, help_text="Counters include events from this point on")
+
     # Payment status
     payment_status = models.CharField(max_length=20, choices=[
         ('current', 'Current'),
@@ -253,15 +233,46 @@ class MemberEngagementScore(models.Model):
         return f"{self.member.user.username} - Score: {self.overall_score} - Risk: {self.churn_risk}"
 
 
+class ChurnModelArtifact(models.Model):
+    """Trained churn classifier, per tenant or global (tenant is null)"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='churn_models', null=True, blank=True)
+    
+    model_blob = models.BinaryField(help_text="joblib-serialised classifier")
+    feature_names = models.JSONField(default=list)
+    
+    # Training metadata
+    horizon_days = models.IntegerField(default=30, help_text="Churn = no visit within this many days")
+    training_samples = models.IntegerField(default=0)
+    churn_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Percentage of churned samples")
+    metrics = models.JSONField(default=dict, blank=True)
+    
+    trained_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'churn_model_artifacts'
+        ordering = ['-trained_at']
+        indexes = [
+            models.Index(fields=['tenant', 'trained_at']),
+        ]
+    
+    def __str__(self):
+        scope = self.tenant.name if self.tenant else 'Global'
+        return f"Churn model ({scope}) - {self.trained_at:%Y-%m-%d}"
+
+
 class Leaderboard(models.Model):
     """Leaderboard entries for various metrics"""
     LEADERBOARD_TYPES = (
+        ('attendance_week', 'Weekly Attendance'),
         ('attendance_month', 'Monthly Attendance'),
         ('attendance_all_time', 'All-Time Attendance'),
+        ('workouts_week', 'Weekly Workouts'),
         ('workouts_month', 'Monthly Workouts'),
         ('workouts_all_time', 'All-Time Workouts'),
+        ('pbs_week', 'Weekly Personal Bests'),
         ('pbs_month', 'Monthly Personal Bests'),
         ('pbs_all_time', 'All-Time Personal Bests'),
+        ('points_week', 'Weekly Points'),
         ('points_month', 'Monthly Points'),
         ('points_all_time', 'All-Time Points'),
     )
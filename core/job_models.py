@@ -0,0 +1,135 @@
+"""
+Background Job Models
+Status, progress and results of long-running work started from the web UI
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+from .models import Tenant, CustomUser
+
+
+def job_file_storage():
+    """Job inputs can hold credentials, so they stay outside MEDIA_ROOT"""
+    return FileSystemStorage(location=settings.BACKGROUND_JOB_FILES_ROOT)
+
+
+class BackgroundJob(models.Model):
+    """A unit of work run outside the request/response cycle"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    JOB_TYPE_CHOICES = [
+        ('member_import', 'Member Import'),
+        ('whatsapp_broadcast', 'WhatsApp Broadcast'),
+        ('whatsapp_reminder', 'WhatsApp Payment Reminder'),
+        ('sms_reminders', 'SMS Payment Reminders'),
+        ('ai_workout_plan', 'AI Workout Plan'),
+        ('ai_diet_plan', 'AI Diet Plan'),
+        ('report_pdf', 'PDF Report'),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='background_jobs', null=True, blank=True)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, related_name='background_jobs', null=True, blank=True)
+    job_type = models.CharField(max_length=50, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    idempotency_key = models.CharField(
+        max_length=200, unique=True, null=True, blank=True,
+        help_text="Jobs started twice with the same key run once"
+    )
+
+    # Input and output
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='input/', storage=job_file_storage, null=True, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    output_file = models.FileField(upload_to='output/', storage=job_file_storage, null=True, blank=True)
+    error_report = models.TextField(blank=True, help_text="CSV of rows that could not be processed")
+    error_message = models.TextField(blank=True)
+
+    # Progress
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'background_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'job_type', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'completed' else 0
+        return min(100, int(self.progress_current * 100 / self.progress_total))
+
+    def set_progress(self, current, total=None):
+        """Persist progress without touching the other columns"""
+        self.progress_current = current
+        fields = {'progress_current': current}
+        if total is not None:
+            self.progress_total = total
+            fields['progress_total'] = total
+        BackgroundJob.objects.filter(pk=self.pk).update(**fields)
+
+    def claim(self):
+        """
+        Move a pending job to running. Returns False if another worker got it
+        first, so a redelivered task never runs the job twice.
+        """
+        started_at = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=self.pk, status='pending').update(
+            status='running', started_at=started_at
+        )
+        if claimed:
+            self.status = 'running'
+            self.started_at = started_at
+        return bool(claimed)
+
+    def mark_completed(self, result=None, error_report=''):
+        self.status = 'completed'
+        self.result = result or {}
+        self.error_report = error_report
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'result', 'error_report', 'finished_at'])
+
+    def mark_failed(self, message):
+        self.status = 'failed'
+        self.error_message = message
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'error_message', 'finished_at'])
+
+    def as_dict(self):
+        """Progress/result payload for the status endpoint"""
+        return {
+            'id': self.pk,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': {
+                'current': self.progress_current,
+                'total': self.progress_total,
+                'percent': self.progress_percent,
+            },
+            'result': self.result,
+            'error_message': self.error_message,
+            'has_error_report': bool(self.error_report),
+            'has_output_file': bool(self.output_file),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
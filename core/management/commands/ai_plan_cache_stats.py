@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from gym.ai_plan_cache import plan_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit rates of the AI workout/diet plan cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = plan_cache.stats()
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses'] + stats['coalesced']
+
+        self.stdout.write(f"Lookups:         {lookups}")
+        self.stdout.write(f"Local hits:      {stats['hits']}")
+        self.stdout.write(f"Shared hits:     {stats['shared_hits']}")
+        self.stdout.write(f"Coalesced:       {stats['coalesced']}")
+        self.stdout.write(f"Misses (Gemini): {stats['misses']}")
+        self.stdout.write(self.style.SUCCESS(f"Hit rate:        {stats['hit_rate']:.1%}"))
+
+        if options['reset']:
+            plan_cache.reset_stats()
+            self.stdout.write('Counters reset')
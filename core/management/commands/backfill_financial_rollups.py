@@ -0,0 +1,33 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tenant
+from gym.financial_rollup import FinancialRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily financial rollup from Payment, Expense, Attendance and MemberProfile rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild the tenant with this id')
+        parser.add_argument('--since', type=str, help='Only rebuild days on or after this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(id=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['tenant']} not found")
+            written = FinancialRollupService.rebuild(tenant_id=tenant.id, date_from=since, all_tenants=False)
+            scope = tenant.name
+        else:
+            written = FinancialRollupService.rebuild(date_from=since)
+            scope = 'all tenants'
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily rollup rows for {scope}'))
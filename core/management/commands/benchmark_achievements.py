@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import MemberProfile
+from gym.achievements import AchievementEngine
+from gym.benchmarking import seed_synthetic_tenant, timed, BenchmarkRollback
+from gym.personal_bests import PersonalBestEngine
+
+
+class Command(BaseCommand):
+    help = 'Compare per-member achievement checks with the batched rules sweep on synthetic members (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=10000, help='Number of synthetic members')
+        parser.add_argument('--sample', type=int, default=200,
+                            help='Members timed on the per-member path (extrapolated to the full set)')
+        parser.add_argument('--full', action='store_true', help='Time the per-member path on every member')
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                self._run(options, results)
+                raise BenchmarkRollback()
+        except BenchmarkRollback:
+            pass
+
+        count = options['members']
+        per_member = results['per_member_sample'] / results['sample_size'] * count
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'=== Achievement rules: {count} members ==='))
+        self.stdout.write(f"Seed data:                 {results['seed']:.2f}s")
+        self.stdout.write(f"Personal best recompute:   {results['personal_bests']:.2f}s")
+        self.stdout.write(f"Per-member path:           {per_member:.2f}s"
+                          + ('' if options['full'] else f" (extrapolated from {results['sample_size']})"))
+        self.stdout.write(f"Batched sweep:             {results['sweep']:.2f}s ({results['awarded']} badges)")
+        self.stdout.write(f"Repeat sweep (no awards):  {results['repeat_sweep']:.2f}s")
+        if results['sweep']:
+            self.stdout.write(self.style.SUCCESS(f"Speed-up:                  {per_member / results['sweep']:.1f}x"))
+
+    def _run(self, options, results):
+        with timed(results, 'seed'):
+            tenant = seed_synthetic_tenant(options['members'])
+        # Seeded logs are bulk-created, so their PersonalBest rows need a recompute
+        with timed(results, 'personal_bests'):
+            PersonalBestEngine().recompute(tenant.id)
+
+        member_ids = list(MemberProfile.objects.filter(tenant=tenant).order_by('id').values_list('id', flat=True))
+        sample = member_ids if options['full'] else member_ids[:options['sample']]
+        results['sample_size'] = len(sample)
+        engine = AchievementEngine()
+        # Roll the sample's awards back so the sweep starts from the same state
+        with transaction.atomic():
+            with timed(results, 'per_member_sample'):
+                for member_id in sample:
+                    engine.evaluate(member_ids=[member_id])
+            transaction.set_rollback(True)
+
+        with timed(results, 'sweep'):
+            results['awarded'] = len(engine.evaluate(tenant=tenant))
+        with timed(results, 'repeat_sweep'):
+            engine.evaluate(tenant=tenant)
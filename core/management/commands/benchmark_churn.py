@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import MemberProfile
+from gym.analytics_service import AnalyticsService
+from gym.benchmarking import seed_synthetic_tenant, timed, BenchmarkRollback
+from gym.churn_model import ChurnModelService, ChurnFeatureBuilder
+from gym.engagement_service import EngagementScoringEngine
+
+
+class Command(BaseCommand):
+    help = 'Compare per-member churn scoring with the batched churn model on synthetic members (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=10000, help='Number of synthetic members')
+        parser.add_argument('--sample', type=int, default=200,
+                            help='Members timed on the per-member path (extrapolated to the full set)')
+        parser.add_argument('--full', action='store_true', help='Time the per-member path on every member')
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                self._run(options, results)
+                raise BenchmarkRollback()
+        except BenchmarkRollback:
+            pass
+
+        count = options['members']
+        per_member = results['per_member_sample'] / results['sample_size'] * count
+        batched = results['feature_matrix'] + results['score_tenant']
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'=== Churn scoring: {count} members ==='))
+        self.stdout.write(f"Seed data:                 {results['seed']:.2f}s")
+        self.stdout.write(f"Per-member rules path:     {per_member:.2f}s"
+                          + ('' if options['full'] else f" (extrapolated from {results['sample_size']})"))
+        self.stdout.write(f"Engagement refresh (bulk): {results['refresh']:.2f}s")
+        self.stdout.write(f"Model training:            {results['train']:.2f}s")
+        self.stdout.write(f"Feature matrix:            {results['feature_matrix']:.2f}s")
+        self.stdout.write(f"Batched predict + write:   {results['score_tenant']:.2f}s")
+        if batched:
+            self.stdout.write(self.style.SUCCESS(f"Speed-up (scoring):        {per_member / batched:.1f}x"))
+
+    def _run(self, options, results):
+        with timed(results, 'seed'):
+            tenant = seed_synthetic_tenant(options['members'])
+
+        members = list(MemberProfile.objects.filter(tenant=tenant).order_by('id'))
+        sample = members if options['full'] else members[:options['sample']]
+        results['sample_size'] = len(sample)
+        with timed(results, 'per_member_sample'):
+            for member in sample:
+                AnalyticsService.predict_churn_risk_rules(member)
+
+        with timed(results, 'refresh'):
+            EngagementScoringEngine().refresh_tenant(tenant)
+        with timed(results, 'train'):
+            artifact = ChurnModelService.train(tenant=tenant)
+        if artifact is None:
+            raise BenchmarkRollback('Synthetic data produced a single class; nothing to score')
+
+        with timed(results, 'feature_matrix'):
+            ChurnFeatureBuilder().build(members)
+        with timed(results, 'score_tenant'):
+            ChurnModelService.score_tenant(tenant)
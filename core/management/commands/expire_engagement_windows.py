@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.models import Tenant
+from gym.engagement_service import EngagementScoringEngine, engagement_tracker
+from gym.churn_model import ChurnModelService
+
+
+class Command(BaseCommand):
+    help = 'Roll engagement score windows forward and re-apply the churn model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only process the tenant with this id')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Re-aggregate every member from the event tables (e.g. to backfill streaks)')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = tenants.filter(id=options['tenant'])
+
+        for tenant in tenants:
+            if options['rebuild']:
+                rebuilt = EngagementScoringEngine().refresh_tenant(tenant)
+                self.stdout.write(f"{tenant.name}: re-aggregated {rebuilt} members")
+            result = engagement_tracker.expire_windows(tenant)
+            ChurnModelService.score_tenant(tenant)
+            self.stdout.write(
+                f"{tenant.name}: rebuilt {result['rebuilt']}, "
+                f"rolled forward {result['rolled_forward']} ({result['changed']} changed)"
+            )
+
+        self.stdout.write(self.style.SUCCESS('Engagement windows expired'))
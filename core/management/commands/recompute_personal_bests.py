@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tenant
+from gym.personal_bests import personal_best_engine
+
+
+class Command(BaseCommand):
+    help = 'Rebuild PersonalBest rows and personal best flags from workout log history (after imports or backfills)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild the tenant with this id')
+
+    def handle(self, *args, **options):
+        scope = 'all tenants'
+        if options['tenant']:
+            try:
+                scope = Tenant.objects.get(id=options['tenant']).name
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['tenant']} not found")
+
+        result = personal_best_engine.recompute(tenant_id=options['tenant'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {result['personal_bests']} personal bests ({result['pb_logs']} record-setting logs) for {scope}"
+        ))
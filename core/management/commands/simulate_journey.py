@@ -147,12 +147,7 @@ class Command(BaseCommand):
         
         # Book it
         try:
-            booking = ClassBooking.objects.create(
-                member=member,
-                class_schedule=schedule,
-                booking_date=timezone.now().date(),
-                status='confirmed'
-            )
+            booking = ClassBooking.book(member, schedule, timezone.now().date())
             self.stdout.write(self.style.SUCCESS(f"   [PASS] Successfully Booked Class (Booking ID: {booking.id})"))
         except Exception as e:
              self.stdout.write(self.style.ERROR(f"   [FAIL] Booking Failed: {e}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from core.models import Tenant
+from gym.churn_model import ChurnModelService
+
+
+class Command(BaseCommand):
+    help = 'Train churn models per tenant and a global fallback model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only train the model for the tenant with this id')
+        parser.add_argument('--horizon', type=int, default=ChurnModelService.HORIZON_DAYS,
+                            help='Days without a visit that count as churn')
+        parser.add_argument('--skip-global', action='store_true', help='Do not train the global fallback model')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = tenants.filter(id=options['tenant'])
+
+        for tenant in tenants:
+            self._report(tenant.name, ChurnModelService.train(tenant=tenant, horizon_days=options['horizon']))
+            ChurnModelService.score_tenant(tenant)
+
+        if not options['tenant'] and not options['skip_global']:
+            self._report('Global', ChurnModelService.train(horizon_days=options['horizon']))
+
+    def _report(self, scope, artifact):
+        if artifact is None:
+            self.stdout.write(self.style.WARNING(f"{scope}: not enough labelled history, skipped"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{scope}: trained on {artifact.training_samples} members "
+                f"(churn rate {artifact.churn_rate}%, train accuracy {artifact.metrics['train_accuracy']})"
+            ))
@@ -1,6 +1,6 @@
 from django.utils.deprecation import MiddlewareMixin
-from core.models import Tenant
 from django.http import JsonResponse
+from core.tenant_resolver import tenant_resolver
 
 
 class TenantMiddleware(MiddlewareMixin):
@@ -28,24 +28,26 @@ class TenantMiddleware(MiddlewareMixin):
             if len(parts) > 2:
                 subdomain = parts[0]
         
+        # Tenants (with branding) come from the resolver cache, not a query per request
         if subdomain and subdomain != 'www':
-            try:
-                tenant = Tenant.objects.filter(subdomain=subdomain, is_active=True).first()
-            except Exception:
-                pass
+            tenant = tenant_resolver.by_subdomain(subdomain)
+            if tenant and not tenant.is_active:
+                tenant = None
         
         # Fallback: Try X-Tenant-ID header (for development/testing/mobile apps)
         if not tenant:
             tenant_id = request.headers.get('X-Tenant-ID') or request.headers.get('X-TENANT-ID')
             if tenant_id:
-                try:
-                    tenant = Tenant.objects.get(id=int(tenant_id), is_active=True)
-                except (Tenant.DoesNotExist, ValueError):
-                    pass
+                tenant = tenant_resolver.by_id(tenant_id)
+                if tenant and not tenant.is_active:
+                    tenant = None
         
         # Fallback: Try to get tenant from authenticated user
-        if not tenant and request.user.is_authenticated and hasattr(request.user, 'tenant'):
-            tenant = request.user.tenant
+        if not tenant and request.user.is_authenticated and getattr(request.user, 'tenant_id', None):
+            tenant = tenant_resolver.by_id(request.user.tenant_id)
+            if tenant:
+                # Saves the lazy load when views touch request.user.tenant
+                request.user.tenant = tenant
         
         # Store tenant in request
         request.tenant = tenant
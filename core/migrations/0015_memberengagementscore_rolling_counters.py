@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_brandingconfig_twilio_account_sid_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="achievement_count_30d",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="attendance_count_30d",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="last_visit_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="payment_count_30d",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="window_start",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Counters include events from this point on",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="memberengagementscore",
+            name="workout_count_30d",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_memberengagementscore_rolling_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChurnModelArtifact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model_blob",
+                    models.BinaryField(help_text="joblib-serialised classifier"),
+                ),
+                ("feature_names", models.JSONField(default=list)),
+                (
+                    "horizon_days",
+                    models.IntegerField(
+                        default=30, help_text="Churn = no visit within this many days"
+                    ),
+                ),
+                ("training_samples", models.IntegerField(default=0)),
+                (
+                    "churn_rate",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Percentage of churned samples",
+                        max_digits=5,
+                    ),
+                ),
+                ("metrics", models.JSONField(blank=True, default=dict)),
+                ("trained_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="churn_models",
+                        to="core.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "churn_model_artifacts",
+                "ordering": ["-trained_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "trained_at"],
+                        name="churn_model_tenant__a7174d_idx",
+                    )
+                ],
+            },
+        ),
+    ]
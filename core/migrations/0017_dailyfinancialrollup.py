@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_churnmodelartifact"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyFinancialRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "revenue_registration",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "revenue_monthly",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "expense_maintenance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "expense_salary",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "expense_electricity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "expense_other",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("attendance_count", models.IntegerField(default=0)),
+                ("new_members", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="core.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "daily_financial_rollups",
+                "ordering": ["-date"],
+                "unique_together": {("tenant", "date")},
+            },
+        ),
+    ]
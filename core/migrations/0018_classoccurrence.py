@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_occurrences(apps, schema_editor):
+    ClassBooking = apps.get_model("core", "ClassBooking")
+    ClassOccurrence = apps.get_model("core", "ClassOccurrence")
+    rows = (
+        ClassBooking.objects.values("class_schedule_id", "booking_date")
+        .annotate(
+            seats=Count("id", filter=Q(status__in=["confirmed", "attended", "no_show"])),
+            waitlist=Count("id", filter=Q(status="waitlist")),
+        )
+    )
+    ClassOccurrence.objects.bulk_create(
+        [
+            ClassOccurrence(
+                class_schedule_id=row["class_schedule_id"],
+                booking_date=row["booking_date"],
+                confirmed_count=row["seats"],
+                waitlist_count=row["waitlist"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_dailyfinancialrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("booking_date", models.DateField()),
+                (
+                    "confirmed_count",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Seats taken (confirmed, attended or no-show)",
+                    ),
+                ),
+                ("waitlist_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "class_schedule",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="core.classschedule",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "class_occurrences",
+                "unique_together": {("class_schedule", "booking_date")},
+            },
+        ),
+        migrations.RunPython(backfill_occurrences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_backgroundjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backgroundjob",
+            name="params",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name="backgroundjob",
+            name="job_type",
+            field=models.CharField(
+                choices=[
+                    ("member_import", "Member Import"),
+                    ("whatsapp_broadcast", "WhatsApp Broadcast"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.CreateModel(
+            name="WhatsAppDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("phone_number", models.CharField(max_length=50)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("message_sid", models.CharField(blank=True, max_length=64)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("error_message", models.TextField(blank=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "member",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="whatsapp_deliveries",
+                        to="core.memberprofile",
+                    ),
+                ),
+                (
+                    "message",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="core.whatsappmessage",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "whatsapp_deliveries",
+                "indexes": [
+                    models.Index(
+                        fields=["message", "status"],
+                        name="whatsapp_de_message_98cf3b_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_whatsappdelivery"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentReminderLedger",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("reminder_date", models.DateField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("upcoming", "Upcoming"),
+                            ("due_today", "Due Today"),
+                            ("overdue", "Overdue"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "claim_token",
+                    models.CharField(
+                        help_text="Run that claimed this reminder", max_length=32
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "member",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment_reminders",
+                        to="core.memberprofile",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payment_reminders",
+                        to="core.tenant",
+                    ),
+                ),
+                (
+                    "whatsapp_message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="core.whatsappmessage",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "payment_reminder_ledger",
+                "indexes": [
+                    models.Index(
+                        fields=["claim_token"], name="payment_rem_claim_t_0fd5c9_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("member", "reminder_date"),
+                        name="unique_member_reminder_per_day",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:31
+
+import core.job_models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_paymentreminderledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backgroundjob",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True,
+                help_text="Jobs started twice with the same key run once",
+                max_length=200,
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="backgroundjob",
+            name="output_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=core.job_models.job_file_storage,
+                upload_to="output/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="backgroundjob",
+            name="job_type",
+            field=models.CharField(
+                choices=[
+                    ("member_import", "Member Import"),
+                    ("whatsapp_broadcast", "WhatsApp Broadcast"),
+                    ("whatsapp_reminder", "WhatsApp Payment Reminder"),
+                    ("sms_reminders", "SMS Payment Reminders"),
+                    ("ai_workout_plan", "AI Workout Plan"),
+                    ("ai_diet_plan", "AI Diet Plan"),
+                    ("report_pdf", "PDF Report"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
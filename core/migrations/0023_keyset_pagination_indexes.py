@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_background_job_idempotency"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["member", "-date", "-check_in_time", "-id"],
+                name="attendance_member_keyset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["tenant", "-date", "-check_in_time", "-id"],
+                name="attendance_tenant_keyset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaverequest",
+            index=models.Index(
+                fields=["tenant", "-created_at", "-id"],
+                name="leaverequest_tenant_keyset",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["member", "-date", "-id"], name="payment_member_keyset"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:51
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_chat_tenants(apps, schema_editor):
+    """Rooms are now per tenant; older messages take their sender's tenant"""
+    ChatMessage = apps.get_model("core", "ChatMessage")
+    CustomUser = apps.get_model("core", "CustomUser")
+    ChatMessage.objects.filter(tenant__isnull=True).update(
+        tenant_id=Subquery(CustomUser.objects.filter(pk=OuterRef("sender_id")).values("tenant_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0023_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_chat_tenants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["tenant", "room_name", "id"], name="chat_room_history"
+            ),
+        ),
+    ]
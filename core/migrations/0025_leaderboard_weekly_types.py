@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_chat_room_history_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="leaderboard",
+            name="leaderboard_type",
+            field=models.CharField(
+                choices=[
+                    ("attendance_week", "Weekly Attendance"),
+                    ("attendance_month", "Monthly Attendance"),
+                    ("attendance_all_time", "All-Time Attendance"),
+                    ("workouts_week", "Weekly Workouts"),
+                    ("workouts_month", "Monthly Workouts"),
+                    ("workouts_all_time", "All-Time Workouts"),
+                    ("pbs_week", "Weekly Personal Bests"),
+                    ("pbs_month", "Monthly Personal Bests"),
+                    ("pbs_all_time", "All-Time Personal Bests"),
+                    ("points_week", "Weekly Points"),
+                    ("points_month", "Monthly Points"),
+                    ("points_all_time", "All-Time Points"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -150,6 +150,13 @@ class Attendance(models.Model):
     check_in_time = models.TimeField(auto_now_add=True)
     status = models.CharField(max_length=10, default='Present')
 
+    class Meta:
+        indexes = [
+            # Keyset pagination in the attendance APIs
+            models.Index(fields=['member', '-date', '-check_in_time', '-id'], name='attendance_member_keyset'),
+            models.Index(fields=['tenant', '-date', '-check_in_time', '-id'], name='attendance_tenant_keyset'),
+        ]
+
 class Payment(models.Model):
     PAYMENT_TYPES = (
         ('registration', 'Registration Fee'),
@@ -162,6 +169,11 @@ class Payment(models.Model):
     payment_type = models.CharField(max_length=20, choices=PAYMENT_TYPES)
     remarks = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['member', '-date', '-id'], name='payment_member_keyset'),
+        ]
+
 class Expense(models.Model):
     CATEGORY_CHOICES = (
         ('maintenance', 'Maintenance'),
@@ -200,6 +212,12 @@ class ChatMessage(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Room history pages and "after id" polls (ids follow timestamp order)
+            models.Index(fields=['tenant', 'room_name', 'id'], name='chat_room_history'),
+        ]
+
 class LeaveRequest(models.Model):
     STATUS_CHOICES = (
         ('Pending', 'Pending'),
@@ -215,6 +233,11 @@ class LeaveRequest(models.Model):
     approved_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_leaves')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', '-created_at', '-id'], name='leaverequest_tenant_keyset'),
+        ]
+
     def __str__(self):
         return f"{self.member.user.username} - {self.status}"
 
@@ -325,6 +348,64 @@ class WhatsAppMessage(models.Model):
         return f"WhatsApp to {self.time_slot} by {self.sent_by} at {self.sent_at}"
 
 
+class WhatsAppDelivery(models.Model):
+    """Per-recipient delivery status of a WhatsApp broadcast"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    message = models.ForeignKey(WhatsAppMessage, on_delete=models.CASCADE, related_name='deliveries')
+    member = models.ForeignKey(MemberProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='whatsapp_deliveries')
+    phone_number = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    message_sid = models.CharField(max_length=64, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'whatsapp_deliveries'
+        indexes = [models.Index(fields=['message', 'status'])]
+    
+    def __str__(self):
+        return f"{self.phone_number} ({self.status})"
+
+
+class PaymentReminderLedger(models.Model):
+    """One row per member per day an automatic payment reminder was claimed"""
+    KIND_CHOICES = (
+        ('upcoming', 'Upcoming'),
+        ('due_today', 'Due Today'),
+        ('overdue', 'Overdue'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='payment_reminders')
+    member = models.ForeignKey(MemberProfile, on_delete=models.CASCADE, related_name='payment_reminders')
+    reminder_date = models.DateField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    claim_token = models.CharField(max_length=32, help_text="Run that claimed this reminder")
+    whatsapp_message = models.ForeignKey(WhatsAppMessage, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'payment_reminder_ledger'
+        constraints = [
+            models.UniqueConstraint(fields=['member', 'reminder_date'], name='unique_member_reminder_per_day'),
+        ]
+        indexes = [models.Index(fields=['claim_token'])]
+    
+    def __str__(self):
+        return f"{self.member} - {self.reminder_date} ({self.kind})"
+
+
 # Import new model modules for Phase 1 Modernization
 # These models are defined in separate files for better organization
 
@@ -340,6 +421,7 @@ from .payment_models import (
 from .booking_models import (
     ClassSchedule,
     ClassBooking,
+    ClassOccurrence,
     PersonalTrainingSession,
     BookingSettings
 )
@@ -351,7 +433,18 @@ from .gamification_models import (
     PersonalBest,
     Achievement,
     MemberEngagementScore,
+    ChurnModelArtifact,
     Leaderboard,
     Challenge,
     ChallengeParticipation
 )
+
+# Reporting Models
+from .reporting_models import (
+    DailyFinancialRollup
+)
+
+# Background Job Models
+from .job_models import (
+    BackgroundJob
+)
@@ -0,0 +1,37 @@
+"""
+Reporting Models
+Pre-aggregated daily rollups that back the finance and report pages
+"""
+from django.db import models
+from .models import Tenant
+
+
+class DailyFinancialRollup(models.Model):
+    """One row per tenant per day with revenue, expenses and activity totals"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='daily_rollups', null=True, blank=True)
+    date = models.DateField()
+    
+    # Revenue by Payment.payment_type
+    revenue_registration = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_monthly = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Expenses by Expense.category
+    expense_maintenance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    expense_salary = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    expense_electricity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    expense_other = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Activity
+    attendance_count = models.IntegerField(default=0)
+    new_members = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_financial_rollups'
+        ordering = ['-date']
+        unique_together = ['tenant', 'date']
+    
+    def __str__(self):
+        scope = self.tenant.name if self.tenant else 'No tenant'
+        return f"{scope} - {self.date}"
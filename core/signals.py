@@ -0,0 +1,30 @@
+"""
+Model signal handlers for the core app
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from .models import Tenant, BrandingConfig
+from .tenant_resolver import tenant_resolver
+
+
+# ==================== Tenant resolver cache ====================
+
+def remember_old_subdomain(sender, instance, **kwargs):
+    if instance.pk:
+        instance._old_subdomain = Tenant.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+
+
+def invalidate_tenant(sender, instance, **kwargs):
+    subdomains = {instance.subdomain, getattr(instance, '_old_subdomain', None)}
+    tenant_resolver.invalidate(instance.pk, subdomains)
+
+
+def invalidate_branding(sender, instance, **kwargs):
+    tenant = Tenant.objects.filter(pk=instance.tenant_id).only('subdomain').first()
+    tenant_resolver.invalidate(instance.tenant_id, [tenant.subdomain] if tenant else [])
+
+
+pre_save.connect(remember_old_subdomain, sender=Tenant, dispatch_uid='tenant_resolver_old_subdomain')
+post_save.connect(invalidate_tenant, sender=Tenant, dispatch_uid='tenant_resolver_tenant_save')
+post_delete.connect(invalidate_tenant, sender=Tenant, dispatch_uid='tenant_resolver_tenant_delete')
+post_save.connect(invalidate_branding, sender=BrandingConfig, dispatch_uid='tenant_resolver_branding_save')
+post_delete.connect(invalidate_branding, sender=BrandingConfig, dispatch_uid='tenant_resolver_branding_delete')
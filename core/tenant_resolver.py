@@ -0,0 +1,139 @@
+"""
+Tenant Resolver
+Two-tier cache (in-process LRU, then the Django cache) for tenant lookups
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from .models import Tenant
+
+
+class TenantResolver:
+    """
+    Resolve tenants by id or subdomain with BrandingConfig loaded alongside.
+
+    Lookups go to a bounded in-process LRU first, then the shared Django cache,
+    then the database. Misses are cached too, so unknown subdomains do not hit
+    the database on every request. Signals on Tenant and BrandingConfig call
+    invalidate(); other processes see changes once their local TTL expires.
+
+    Cached tenants are shared between requests and must be treated as read-only.
+    """
+
+    LOCAL_TTL = 30
+    LOCAL_MAX_SIZE = 1024
+    SHARED_TTL = 300
+    KEY_PREFIX = 'tenant_resolver'
+    MISSING = '__missing__'
+
+    def __init__(self, local_ttl=None, local_max_size=None, shared_ttl=None):
+        self.local_ttl = local_ttl or self.LOCAL_TTL
+        self.local_max_size = local_max_size or self.LOCAL_MAX_SIZE
+        self.shared_ttl = shared_ttl or self.SHARED_TTL
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def by_id(self, tenant_id):
+        try:
+            tenant_id = int(tenant_id)
+        except (TypeError, ValueError):
+            return None
+        return self._resolve(('id', tenant_id), {'id': tenant_id})
+
+    def by_subdomain(self, subdomain):
+        if not subdomain:
+            return None
+        subdomain = subdomain.lower()
+        return self._resolve(('subdomain', subdomain), {'subdomain': subdomain})
+
+    def _resolve(self, key, lookup):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > now:
+                self._local.move_to_end(key)
+                self._stats['local_hits'] += 1
+                return entry[1]
+
+        shared_key = self._shared_key(key)
+        value = cache.get(shared_key)
+        if value is not None:
+            self._count('shared_hits')
+        else:
+            self._count('misses')
+            value = Tenant.objects.select_related('branding').filter(**lookup).first() or self.MISSING
+            cache.set(shared_key, value, self.shared_ttl)
+
+        tenant = None if value == self.MISSING else value
+        self._store(key, tenant, now)
+        return tenant
+
+    # ------------------------------------------------------------------
+    # Cache maintenance
+    # ------------------------------------------------------------------
+
+    def _store(self, key, tenant, now):
+        with self._lock:
+            self._local[key] = (now + self.local_ttl, tenant)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_size:
+                self._local.popitem(last=False)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _shared_key(self, key):
+        return f'{self.KEY_PREFIX}:{key[0]}:{key[1]}'
+
+    def invalidate(self, tenant_id=None, subdomains=()):
+        """Drop cached entries for a tenant id and any of its (old or new) subdomains"""
+        keys = [('subdomain', subdomain.lower()) for subdomain in subdomains if subdomain]
+        if tenant_id is not None:
+            keys.append(('id', tenant_id))
+
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+            if tenant_id is not None:
+                # Catch subdomain entries we were not told about
+                stale = [
+                    key for key, (_, tenant) in self._local.items()
+                    if tenant is not None and tenant.pk == tenant_id
+                ]
+                for key in stale:
+                    del self._local[key]
+
+        cache.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Empty the in-process tier (the shared tier expires on its own)"""
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """Hit/miss counters and the current in-process size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_size'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0
+        return stats
+
+
+# Singleton instance
+tenant_resolver = TenantResolver()
+
+
+# Convenience functions
+def resolve_tenant(tenant_id=None, subdomain=None):
+    """Quick function to look up a tenant by id or subdomain"""
+    if subdomain:
+        return tenant_resolver.by_subdomain(subdomain)
+    return tenant_resolver.by_id(tenant_id)
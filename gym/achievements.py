@@ -0,0 +1,222 @@
+"""
+Achievement Rules Engine
+Declarative badge rules evaluated for many members at once from grouped
+aggregate queries, awarding Achievement rows in bulk
+"""
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from core.models import Attendance, MemberProfile
+from core.gamification_models import Achievement, PersonalBest, WorkoutLog
+from .engagement_service import EngagementScoringEngine
+from .leaderboards import LeaderboardBuilder
+from .streaks import StreakService
+
+
+# A badge is earned once `metric` reaches `threshold`
+AchievementRule = namedtuple('AchievementRule', ['achievement_type', 'metric', 'threshold', 'icon', 'points', 'description'])
+
+RULES = [
+    AchievementRule('attendance_7_day', 'longest_streak', 7, '🔥', 20, 'Check in 7 days in a row'),
+    AchievementRule('attendance_30_day', 'longest_streak', 30, '🔥', 50, 'Check in 30 days in a row'),
+    AchievementRule('attendance_100_day', 'longest_streak', 100, '💯', 150, 'Check in 100 days in a row'),
+    AchievementRule('attendance_365_day', 'longest_streak', 365, '👑', 500, 'Check in every day for a year'),
+    AchievementRule('first_workout', 'workouts', 1, '🦶', 10, 'Log your first workout'),
+    AchievementRule('workouts_10', 'workouts', 10, '💪', 20, 'Log 10 workouts'),
+    AchievementRule('workouts_50', 'workouts', 50, '🏋️', 50, 'Log 50 workouts'),
+    AchievementRule('workouts_100', 'workouts', 100, '🏆', 100, 'Log 100 workouts'),
+    AchievementRule('first_pb', 'personal_bests', 1, '🥇', 10, 'Set your first personal best'),
+    AchievementRule('pb_5', 'personal_bests', 5, '🎯', 30, 'Hold personal bests on 5 exercises'),
+    AchievementRule('pb_10', 'personal_bests', 10, '🚀', 60, 'Hold personal bests on 10 exercises'),
+    AchievementRule('pb_broken', 'pbs_broken', 1, '📈', 20, 'Beat one of your own personal bests'),
+    AchievementRule('member_1_month', 'tenure_days', 30, '🌱', 10, 'Be a member for a month'),
+    AchievementRule('member_6_months', 'tenure_days', 182, '🌿', 30, 'Be a member for 6 months'),
+    AchievementRule('member_1_year', 'tenure_days', 365, '🌳', 60, 'Be a member for a year'),
+    AchievementRule('member_2_years', 'tenure_days', 730, '🏅', 120, 'Be a member for 2 years'),
+    AchievementRule('early_bird', 'early_checkins', 1, '🌅', 15, 'Check in before 7 AM'),
+    AchievementRule('night_owl', 'late_checkins', 1, '🦉', 15, 'Check in after 9 PM'),
+    AchievementRule('weekend_warrior', 'weekend_visits', 4, '⚔️', 20, 'Check in on 4 weekend days'),
+]
+
+
+class AchievementEngine:
+    """
+    Awards every badge whose rule a member now meets.
+
+    Metrics come in families, each read with one grouped query for all the
+    members in scope (longest attendance streaks come from StreakService).
+    Only the families the rules need are queried, so a workout log re-checks
+    workout and PB badges only. New badges are written
+    with bulk_create(ignore_conflicts=True) on the (member, achievement_type)
+    unique key, so overlapping runs cannot award twice.
+
+    Runs incrementally on commit of WorkoutLog and Attendance rows
+    (gym.signals) and as a nightly per-tenant sweep, which also picks up
+    tenure badges. Referral badges have no data source yet and no rule.
+    """
+
+    BATCH_SIZE = 1000
+    FAMILIES = {
+        'workouts': ['workouts'],
+        'personal_bests': ['personal_bests', 'pbs_broken'],
+        'attendance': ['early_checkins', 'late_checkins', 'weekend_visits'],
+        'streaks': ['longest_streak'],
+        'tenure': ['tenure_days'],
+    }
+    # Families an event can change
+    EVENT_FAMILIES = {
+        'workout': ['workouts', 'personal_bests'],
+        'attendance': ['attendance', 'streaks'],
+    }
+
+    def __init__(self, rules=None, today=None):
+        self.rules = rules or RULES
+        self._today = today
+        self.metric_family = {metric: family for family, metrics in self.FAMILIES.items() for metric in metrics}
+
+    # ------------------------------------------------------------------
+    # Metric families
+    # ------------------------------------------------------------------
+
+    def collect(self, family, member_filter, members):
+        """{metric: {member_id: value}} for one family"""
+        if family == 'workouts':
+            rows = WorkoutLog.objects.filter(member_filter).values('member_id').annotate(total=Count('id'))
+            return {'workouts': {row['member_id']: row['total'] for row in rows}}
+
+        if family == 'personal_bests':
+            rows = PersonalBest.objects.filter(member_filter).values('member_id').annotate(
+                total=Count('id'), broken=Sum('times_improved'),
+            )
+            return {
+                'personal_bests': {row['member_id']: row['total'] for row in rows},
+                'pbs_broken': {row['member_id']: row['broken'] or 0 for row in rows},
+            }
+
+        if family == 'attendance':
+            rows = Attendance.objects.filter(member_filter, status='Present').values('member_id').annotate(
+                early=Count('id', filter=Q(check_in_time__hour__lt=7)),
+                late=Count('id', filter=Q(check_in_time__hour__gte=21)),
+                weekend=Count('date', filter=Q(date__week_day__in=[1, 7]), distinct=True),
+            )
+            metrics = {'early_checkins': {}, 'late_checkins': {}, 'weekend_visits': {}}
+            for row in rows:
+                metrics['early_checkins'][row['member_id']] = row['early']
+                metrics['late_checkins'][row['member_id']] = row['late']
+                metrics['weekend_visits'][row['member_id']] = row['weekend']
+            return metrics
+
+        if family == 'streaks':
+            streaks = StreakService().compute(member_filter, self._today)
+            return {'longest_streak': {member_id: longest for member_id, (_, longest) in streaks.items()}}
+
+        if family == 'tenure':
+            today = self._today or timezone.localdate()
+            return {'tenure_days': {
+                member.id: (today - member.registration_date).days
+                for member in members if member.registration_date
+            }}
+        raise ValueError(f"Unknown metric family: {family}")
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def evaluate(self, tenant=None, member_ids=None, families=None):
+        """
+        Award new badges to a tenant's members or to the given member ids.
+
+        Args:
+            families: only re-check rules fed by these metric families
+
+        Returns:
+            list of the Achievement objects awarded
+        """
+        if tenant is not None:
+            members = MemberProfile.objects.filter(tenant=tenant)
+            member_filter = Q(member__tenant=tenant)
+        else:
+            member_ids = list(member_ids or [])
+            if not member_ids:
+                return []
+            members = MemberProfile.objects.filter(id__in=member_ids)
+            member_filter = Q(member_id__in=member_ids)
+
+        rules = [rule for rule in self.rules if families is None or self.metric_family[rule.metric] in families]
+        if not rules:
+            return []
+        needed = {self.metric_family[rule.metric] for rule in rules}
+
+        members = list(members.only('id', 'tenant_id', 'registration_date'))
+        tenant_ids = {member.id: member.tenant_id for member in members}
+        metrics = {}
+        for family in needed:
+            metrics.update(self.collect(family, member_filter, members))
+
+        earned = set(Achievement.objects.filter(
+            member_filter, achievement_type__in=[rule.achievement_type for rule in rules]
+        ).values_list('member_id', 'achievement_type'))
+        titles = dict(Achievement.ACHIEVEMENT_TYPES)
+        now = timezone.now()
+
+        awards = []
+        for rule in rules:
+            for member_id, value in metrics[rule.metric].items():
+                if value >= rule.threshold and member_id in tenant_ids and (member_id, rule.achievement_type) not in earned:
+                    awards.append(Achievement(
+                        member_id=member_id, achievement_type=rule.achievement_type,
+                        title=titles[rule.achievement_type], description=rule.description,
+                        icon=rule.icon, points=rule.points, earned_at=now,
+                    ))
+
+        if awards:
+            Achievement.objects.bulk_create(awards, batch_size=self.BATCH_SIZE, ignore_conflicts=True)
+            self.after_award(awards, tenant_ids)
+        return awards
+
+    def after_award(self, awards, tenant_ids):
+        """bulk_create skips Achievement signals; refresh what they would have"""
+        member_ids = sorted({award.member_id for award in awards})
+        engine = EngagementScoringEngine()
+        for start in range(0, len(member_ids), self.BATCH_SIZE):
+            engine.refresh_members(member_ids[start:start + self.BATCH_SIZE])
+        for tenant_id in sorted({tenant_ids[member_id] for member_id in member_ids} - {None}):
+            LeaderboardBuilder.refresh_on_commit('points', tenant_id)
+
+    def record_event(self, event, member_id):
+        """Incremental path: re-check the badges one event can unlock"""
+        return self.evaluate(member_ids=[member_id], families=self.EVENT_FAMILIES[event])
+
+    def record_event_on_commit(self, event, member_id):
+        transaction.on_commit(lambda: self.record_event(event, member_id))
+
+    # ------------------------------------------------------------------
+    # Display
+    # ------------------------------------------------------------------
+
+    def badges_for(self, member):
+        """Every rule as a badge dict, with `earned` set from the member's rows"""
+        earned = {achievement.achievement_type: achievement for achievement in Achievement.objects.filter(member=member)}
+        titles = dict(Achievement.ACHIEVEMENT_TYPES)
+        return [
+            {
+                'type': rule.achievement_type,
+                'name': titles[rule.achievement_type],
+                'description': rule.description,
+                'icon': rule.icon,
+                'points': rule.points,
+                'earned': earned.get(rule.achievement_type),
+            }
+            for rule in self.rules
+        ]
+
+
+# Singleton instance
+achievement_engine = AchievementEngine()
+
+
+# Convenience functions
+def award_tenant_achievements(tenant):
+    """Quick function to run the achievement sweep for one tenant"""
+    return AchievementEngine().evaluate(tenant=tenant)
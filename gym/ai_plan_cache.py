@@ -0,0 +1,193 @@
+"""
+AI Plan Cache
+LRU + TTL cache with single-flight generation for Gemini workout and diet plans
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+
+
+class PlanCache:
+    """
+    Generated plans keyed by a fingerprint of the normalised prompt.
+
+    Plans depend only on a handful of profile fields, so members with the same
+    age, goals and schedule share one Gemini call. Lookups go to a bounded
+    in-process LRU first, then the shared Django cache (so every worker process
+    benefits), then the generator. Concurrent requests for the same fingerprint
+    in one process wait for the first one instead of calling Gemini again.
+
+    Only results with success=True are stored; fallbacks are retried next time.
+    Hit/miss counters live in the shared cache so stats() covers all processes.
+    """
+
+    LOCAL_TTL = 60 * 60
+    LOCAL_MAX_SIZE = 256
+    SHARED_TTL = 24 * 60 * 60
+    KEY_PREFIX = 'ai_plan_cache'
+    COUNTERS = ['hits', 'shared_hits', 'misses', 'coalesced']
+
+    def __init__(self, local_ttl=None, local_max_size=None, shared_ttl=None):
+        self.local_ttl = local_ttl or self.LOCAL_TTL
+        self.local_max_size = local_max_size or self.LOCAL_MAX_SIZE
+        self.shared_ttl = shared_ttl or self.SHARED_TTL
+        self._local = OrderedDict()
+        self._in_flight = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(kind, prompt):
+        """Stable key for a prompt; whitespace and case differences do not matter"""
+        normalised = ' '.join(prompt.lower().split())
+        return f'{kind}:{hashlib.sha256(normalised.encode()).hexdigest()}'
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_or_generate(self, key, generate):
+        """
+        Cached result for key, or generate() run once per key at a time.
+
+        Returns a copy, so callers may modify the plan freely.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > now:
+                self._local.move_to_end(key)
+                hit = entry[1]
+            else:
+                hit = None
+                flight = self._in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._in_flight[key] = {'done': threading.Event(), 'result': None}
+
+        if hit is not None:
+            self._count('hits')
+            return copy.deepcopy(hit)
+
+        if not leader:
+            self._count('coalesced')
+            flight['done'].wait()
+            if flight['result'] is None:
+                # The first request raised; try on our own
+                return generate()
+            return copy.deepcopy(flight['result'])
+
+        try:
+            result = cache.get(self._shared_key(key))
+            if result is not None:
+                self._count('shared_hits')
+            else:
+                self._count('misses')
+                result = generate()
+                if result.get('success'):
+                    cache.set(self._shared_key(key), result, self.shared_ttl)
+            if result.get('success'):
+                self._store(key, result, now)
+            flight['result'] = result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight['done'].set()
+        return copy.deepcopy(result)
+
+    def peek(self, key):
+        """
+        Cached result for key without generating, or None (not counted as a
+        miss; the caller records the outcome with put()).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > now:
+                self._local.move_to_end(key)
+                hit = entry[1]
+            else:
+                hit = None
+        if hit is not None:
+            self._count('hits')
+            return copy.deepcopy(hit)
+
+        result = cache.get(self._shared_key(key))
+        if result is None:
+            return None
+        self._count('shared_hits')
+        self._store(key, result, now)
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        """Record a result generated outside get_or_generate() (e.g. streamed)"""
+        self._count('misses')
+        if result.get('success'):
+            cache.set(self._shared_key(key), result, self.shared_ttl)
+            self._store(key, result, time.monotonic())
+
+    # ------------------------------------------------------------------
+    # Cache maintenance
+    # ------------------------------------------------------------------
+
+    def _store(self, key, result, now):
+        with self._lock:
+            self._local[key] = (now + self.local_ttl, result)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_size:
+                self._local.popitem(last=False)
+                self._evictions += 1
+
+    def _shared_key(self, key):
+        return f'{self.KEY_PREFIX}:{key}'
+
+    def _counter_key(self, name):
+        return f'{self.KEY_PREFIX}:stats:{name}'
+
+    def _count(self, name):
+        key = self._counter_key(name)
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Evicted between add() and incr()
+                cache.set(key, 1, None)
+
+    def clear(self):
+        """Empty the in-process tier (the shared tier expires on its own)"""
+        with self._lock:
+            self._local.clear()
+
+    def reset_stats(self):
+        cache.delete_many([self._counter_key(name) for name in self.COUNTERS])
+        with self._lock:
+            self._evictions = 0
+
+    def stats(self):
+        """
+        Hit/miss counters across processes, plus this process's LRU size and
+        evictions. A high eviction count with a low hit_rate means
+        LOCAL_MAX_SIZE is too small; a low hit_rate alone means prompts vary.
+        """
+        counters = cache.get_many([self._counter_key(name) for name in self.COUNTERS])
+        stats = {name: counters.get(self._counter_key(name), 0) for name in self.COUNTERS}
+        with self._lock:
+            stats['local_size'] = len(self._local)
+            stats['local_evictions'] = self._evictions
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses'] + stats['coalesced']
+        served = lookups - stats['misses']
+        stats['hit_rate'] = round(served / lookups, 4) if lookups else 0
+        return stats
+
+
+# Singleton instance
+plan_cache = PlanCache()
+
+
+# Convenience functions
+def get_plan_cache_stats():
+    """Quick function to get AI plan cache hit rates"""
+    return plan_cache.stats()
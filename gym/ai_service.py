@@ -3,13 +3,22 @@ AI Service
 Handles AI-powered features using Google Gemini
 """
 import google.generativeai as genai
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.utils import timezone
+import io
 import json
+from .ai_plan_cache import plan_cache
+from .background_jobs import job_runner
 
 
 class GeminiAIService:
-    """Google Gemini AI integration for workout and diet plans"""
+    """
+    Google Gemini AI integration for workout and diet plans
+
+    Plans are cached by prompt fingerprint (see ai_plan_cache), so members
+    whose prompts normalise to the same text share one generation.
+    """
     
     def __init__(self):
         try:
@@ -24,14 +33,20 @@ class GeminiAIService:
         """
         Generate personalized workout plan - uses fallback if not configured
         """
+        goals = ' '.join((goals or '').split())
+        fallback = lambda: self._get_fallback_workout_plan(goals, duration_weeks, days_per_week)
         if not self.is_configured:
-            return {
-                'success': False,
-                'error': "AI Service not configured (using fallback)",
-                'fallback_plan': self._get_fallback_workout_plan(goals, duration_weeks, days_per_week)
-            }
-            
-        prompt = f"""
+            return self._not_configured(fallback)
+        
+        prompt = self.workout_prompt(member_profile, goals, duration_weeks, days_per_week)
+        return plan_cache.get_or_generate(
+            plan_cache.fingerprint('workout', prompt),
+            lambda: self._generate_plan(prompt, fallback),
+        )
+    
+    def workout_prompt(self, member_profile, goals, duration_weeks, days_per_week):
+        """Workout plan prompt; goals should already be whitespace-normalised"""
+        return f"""
         Create a detailed {duration_weeks}-week workout plan for a gym member with the following profile:
         
         Age: {member_profile.age}
@@ -71,32 +86,6 @@ class GeminiAIService:
         
         Make it specific, progressive, and suitable for their age and goals.
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from response
-            text = response.text
-            
-            # Try to parse JSON from response
-            if '```json' in text:
-                json_str = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                json_str = text.split('```')[1].split('```')[0].strip()
-            else:
-                json_str = text.strip()
-            
-            workout_plan = json.loads(json_str)
-            return {
-                'success': True,
-                'plan': workout_plan,
-                'generated_at': timezone.now().isoformat()
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'fallback_plan': self._get_fallback_workout_plan(goals, duration_weeks, days_per_week)
-            }
     
     def generate_diet_plan(self, member_profile, goals, dietary_restrictions=None):
         """
@@ -110,9 +99,23 @@ class GeminiAIService:
         Returns:
             dict with diet plan
         """
-        restrictions = ", ".join(dietary_restrictions) if dietary_restrictions else "None"
+        goals = ' '.join((goals or '').split())
+        fallback = lambda: self._get_fallback_diet_plan(goals)
+        if not self.is_configured:
+            return self._not_configured(fallback)
         
-        prompt = f"""
+        prompt = self.diet_prompt(member_profile, goals, dietary_restrictions)
+        return plan_cache.get_or_generate(
+            plan_cache.fingerprint('diet', prompt),
+            lambda: self._generate_plan(prompt, fallback),
+        )
+    
+    def diet_prompt(self, member_profile, goals, dietary_restrictions):
+        """Diet plan prompt; restrictions are deduplicated and sorted so their order does not matter"""
+        restrictions = sorted({r.strip().lower() for r in dietary_restrictions or [] if r.strip()})
+        restrictions = ", ".join(restrictions) if restrictions else "None"
+        
+        return f"""
         Create a detailed weekly diet plan for a gym member with the following profile:
         
         Age: {member_profile.age}
@@ -151,32 +154,91 @@ class GeminiAIService:
         
         Make it practical, balanced, and aligned with their goals.
         """
-        
+    
+    @staticmethod
+    def parse_plan(text):
+        """Extract the JSON plan from a model response"""
+        if '```json' in text:
+            json_str = text.split('```json')[1].split('```')[0].strip()
+        elif '```' in text:
+            json_str = text.split('```')[1].split('```')[0].strip()
+        else:
+            json_str = text.strip()
+        return json.loads(json_str)
+    
+    @staticmethod
+    def _not_configured(fallback):
+        return {
+            'success': False,
+            'error': "AI Service not configured (using fallback)",
+            'fallback_plan': fallback()
+        }
+    
+    def _generate_plan(self, prompt, fallback):
+        """Call Gemini and parse the JSON plan; fallback() supplies the plan on failure"""
         try:
             response = self.model.generate_content(prompt)
-            text = response.text
-            
-            # Extract JSON
-            if '```json' in text:
-                json_str = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                json_str = text.split('```')[1].split('```')[0].strip()
-            else:
-                json_str = text.strip()
-            
-            diet_plan = json.loads(json_str)
             return {
                 'success': True,
-                'plan': diet_plan,
+                'plan': self.parse_plan(response.text),
                 'generated_at': timezone.now().isoformat()
             }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
-                'fallback_plan': self._get_fallback_diet_plan(goals)
+                'fallback_plan': fallback()
             }
     
+    async def stream_plan(self, kind, member_profile, **params):
+        """
+        Async counterpart of generate_workout_plan/generate_diet_plan for the
+        SSE endpoint.
+        
+        Yields ('chunk', text) as Gemini produces the plan, then ('plan', result)
+        with the same result dict the sync methods return. Chunks are buffered
+        as they arrive and the JSON is parsed once the stream ends. A cached
+        plan is yielded straight away without any chunks.
+        """
+        goals = ' '.join((params.get('goals') or '').split())
+        if kind == 'workout':
+            duration_weeks, days_per_week = params['duration_weeks'], params['days_per_week']
+            fallback = lambda: self._get_fallback_workout_plan(goals, duration_weeks, days_per_week)
+            prompt = self.workout_prompt(member_profile, goals, duration_weeks, days_per_week)
+        else:
+            fallback = lambda: self._get_fallback_diet_plan(goals)
+            prompt = self.diet_prompt(member_profile, goals, params.get('dietary_restrictions'))
+        
+        if not self.is_configured:
+            yield 'plan', self._not_configured(fallback)
+            return
+        
+        key = plan_cache.fingerprint(kind, prompt)
+        cached = await sync_to_async(plan_cache.peek)(key)
+        if cached is not None:
+            yield 'plan', cached
+            return
+        
+        buffer = io.StringIO()
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                buffer.write(chunk.text)
+                yield 'chunk', chunk.text
+            result = {
+                'success': True,
+                'plan': self.parse_plan(buffer.getvalue()),
+                'generated_at': timezone.now().isoformat()
+            }
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': str(e),
+                'fallback_plan': fallback()
+            }
+        await sync_to_async(plan_cache.put)(key, result)
+        yield 'plan', result
+    
     def analyze_workout_progress(self, workout_logs):
         """
         Analyze workout progress and provide insights
@@ -289,20 +351,44 @@ class GeminiAIService:
         }
 
 
+# Singleton instance
+gemini_ai_service = GeminiAIService()
+
+
 # Convenience functions
 def generate_ai_workout_plan(member, goals, duration_weeks=4, days_per_week=3):
     """Quick function to generate workout plan"""
-    service = GeminiAIService()
-    return service.generate_workout_plan(member, goals, duration_weeks, days_per_week)
+    return gemini_ai_service.generate_workout_plan(member, goals, duration_weeks, days_per_week)
 
 
 def generate_ai_diet_plan(member, goals, dietary_restrictions=None):
     """Quick function to generate diet plan"""
-    service = GeminiAIService()
-    return service.generate_diet_plan(member, goals, dietary_restrictions)
+    return gemini_ai_service.generate_diet_plan(member, goals, dietary_restrictions)
 
 
 def analyze_member_progress(workout_logs):
     """Quick function to analyze progress"""
-    service = GeminiAIService()
-    return service.analyze_workout_progress(workout_logs)
+    return gemini_ai_service.analyze_workout_progress(workout_logs)
+
+
+@job_runner.register('ai_workout_plan', queue='ai')
+def run_ai_workout_plan_job(job):
+    """BackgroundJob handler generating a workout plan for the member who asked"""
+    params = job.params
+    return {'result': gemini_ai_service.generate_workout_plan(
+        member_profile=job.created_by.member_profile,
+        goals=params['goals'],
+        duration_weeks=params['duration_weeks'],
+        days_per_week=params['days_per_week'],
+    )}
+
+
+@job_runner.register('ai_diet_plan', queue='ai')
+def run_ai_diet_plan_job(job):
+    """BackgroundJob handler generating a diet plan for the member who asked"""
+    params = job.params
+    return {'result': gemini_ai_service.generate_diet_plan(
+        member_profile=job.created_by.member_profile,
+        goals=params['goals'],
+        dietary_restrictions=params['dietary_restrictions'],
+    )}
@@ -1,7 +1,6 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .ai_service import GeminiAIService
 from .analytics_service import AnalyticsService
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -42,6 +41,31 @@ def connect_ai_tools(request):
     return render(request, 'gym/connect_ai_tools.html')
 
 from django.urls import reverse
+from .background_jobs import start_job
+
+
+def _collect_plan_job(request, job_session_key, plan_session_key, view_name):
+    """
+    Move a finished plan job's result into the session.
+    Returns a redirect to the job's progress page while it is still running.
+    """
+    from core.models import BackgroundJob
+    
+    job_id = request.session.get(job_session_key)
+    if not job_id:
+        return None
+    
+    job = BackgroundJob.objects.filter(pk=job_id, created_by=request.user).first()
+    if job and not job.is_finished:
+        return redirect(f"{reverse('background_job_detail', args=[job.id])}?next={reverse(view_name)}")
+    
+    del request.session[job_session_key]
+    if job and job.status == 'completed':
+        request.session[plan_session_key] = job.result
+        messages.success(request, "Your AI-powered plan has been generated!")
+    elif job:
+        messages.error(request, f"Failed to generate plan: {job.error_message}")
+    return None
 
 @login_required
 def ai_workout_plan(request):
@@ -60,25 +84,20 @@ def ai_workout_plan(request):
         duration = int(request.POST.get('duration', 4))
         days_per_week = int(request.POST.get('days_per_week', 3))
         
-        # Initialize AI Service
-        ai_service = GeminiAIService()
-        
-        try:
-            # Generate the plan
-            plan_data = ai_service.generate_workout_plan(
-                member_profile=request.user.member_profile,
-                goals=goal,
-                duration_weeks=duration,
-                days_per_week=days_per_week
-            )
-            
-            request.session['generated_workout_plan'] = plan_data
-            messages.success(request, "Your AI-powered workout plan has been generated!")
-            return redirect('view_workout_plan')
-            
-        except Exception as e:
-            messages.error(request, f"Failed to generate plan: {str(e)}")
-            return redirect('ai_workout_plan')
+        # Generation can take a while, so it runs on the 'ai' job queue
+        job = start_job(
+            'ai_workout_plan',
+            tenant=getattr(request, 'tenant', None),
+            user=request.user,
+            params={
+                'goals': goal,
+                'fitness_level': fitness_level,
+                'duration_weeks': duration,
+                'days_per_week': days_per_week,
+            },
+        )
+        request.session['workout_plan_job_id'] = job.id
+        return redirect('view_workout_plan')
 
     # We removed 'api_key_configured' check to rely on the 'connect' flow and fallback
     return render(request, 'gym/ai_workout_plan.html', {
@@ -90,6 +109,9 @@ def view_workout_plan(request):
     """
     Display the generated workout plan.
     """
+    waiting = _collect_plan_job(request, 'workout_plan_job_id', 'generated_workout_plan', 'view_workout_plan')
+    if waiting:
+        return waiting
     plan_data = request.session.get('generated_workout_plan')
     
     if not plan_data:
@@ -123,24 +145,17 @@ def ai_diet_plan(request):
         goal = request.POST.get('goal')
         dietary_restrictions = request.POST.getlist('dietary_restrictions')
         
-        # Initialize AI Service
-        ai_service = GeminiAIService()
-        
-        try:
-            # Generate the plan
-            plan_data = ai_service.generate_diet_plan(
-                member_profile=request.user.member_profile,
-                goals=goal,
-                dietary_restrictions=dietary_restrictions
-            )
-            
-            request.session['generated_diet_plan'] = plan_data
-            messages.success(request, "Your AI-powered diet plan has been generated!")
-            return redirect('view_diet_plan')
-            
-        except Exception as e:
-            messages.error(request, f"Failed to generate plan: {str(e)}")
-            return redirect('ai_diet_plan')
+        job = start_job(
+            'ai_diet_plan',
+            tenant=getattr(request, 'tenant', None),
+            user=request.user,
+            params={
+                'goals': goal,
+                'dietary_restrictions': dietary_restrictions,
+            },
+        )
+        request.session['diet_plan_job_id'] = job.id
+        return redirect('view_diet_plan')
 
     return render(request, 'gym/ai_diet_plan.html', {
         'api_key_configured': True
@@ -151,6 +166,9 @@ def view_diet_plan(request):
     """
     Display the generated diet plan.
     """
+    waiting = _collect_plan_job(request, 'diet_plan_job_id', 'generated_diet_plan', 'view_diet_plan')
+    if waiting:
+        return waiting
     plan_data = request.session.get('generated_diet_plan')
     
     if not plan_data:
@@ -170,6 +188,71 @@ def view_diet_plan(request):
         'plan': diet_plan
     })
 
+# kind -> (session key for the result, view showing it)
+STREAMED_PLANS = {
+    'workout': ('generated_workout_plan', 'view_workout_plan'),
+    'diet': ('generated_diet_plan', 'view_diet_plan'),
+}
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@login_required
+async def ai_plan_stream(request, kind):
+    """
+    Generate a workout or diet plan and stream it as server-sent events.
+    
+    Async, so under the ASGI server (gym_management.asgi) a slow Gemini call
+    waits on the event loop instead of holding a worker. Emits 'chunk' events
+    with raw model text, then 'done' with the URL of the parsed plan.
+    """
+    from django.http import Http404, HttpResponseForbidden, HttpResponseNotAllowed, StreamingHttpResponse
+    from core.models import MemberProfile
+    from .ai_service import gemini_ai_service
+    
+    if kind not in STREAMED_PLANS:
+        raise Http404("Unknown plan type")
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if not await request.session.aget('ai_connected'):
+        return HttpResponseForbidden("Connect your AI assistant first")
+    
+    user = await request.auser()
+    try:
+        member_profile = await MemberProfile.objects.aget(user=user)
+    except MemberProfile.DoesNotExist:
+        raise Http404("Only members can generate plans")
+    
+    if kind == 'workout':
+        params = {
+            'goals': request.POST.get('goal'),
+            'duration_weeks': int(request.POST.get('duration', 4)),
+            'days_per_week': int(request.POST.get('days_per_week', 3)),
+        }
+    else:
+        params = {
+            'goals': request.POST.get('goal'),
+            'dietary_restrictions': request.POST.getlist('dietary_restrictions'),
+        }
+    session_key, view_name = STREAMED_PLANS[kind]
+    
+    async def events():
+        async for event, data in gemini_ai_service.stream_plan(kind, member_profile, **params):
+            if event == 'chunk':
+                yield _sse('chunk', data)
+                continue
+            # The session middleware already ran, so the result is saved here
+            await request.session.aset(session_key, data)
+            await request.session.asave()
+            yield _sse('done', {'success': data['success'], 'redirect': reverse(view_name)})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx buffering the stream
+    return response
+
 @login_required
 def member_insights(request):
     """
@@ -195,7 +278,7 @@ def gym_analytics(request):
         return redirect('dashboard')
         
     try:
-        analytics = AnalyticsService.get_gym_analytics()
+        analytics = AnalyticsService.get_gym_analytics(request.tenant)
     except Exception as e:
         messages.error(request, f"Could not retrieve gym analytics: {str(e)}")
         analytics = {}
@@ -5,11 +5,11 @@ Handles churn prediction and engagement analytics
 from django.db.models import Count, Avg, Sum, Q, F
 from django.utils import timezone
 from datetime import timedelta
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
 from core.models import MemberProfile, Attendance
 from core.gamification_models import WorkoutLog, MemberEngagementScore
 from core.payment_models import SubscriptionPayment
+from .engagement_service import EngagementScoringEngine
+from .churn_model import ChurnModelService
 
 
 class AnalyticsService:
@@ -90,27 +90,35 @@ class AnalyticsService:
     @staticmethod
     def predict_churn_risk(member):
         """
-        Predict churn risk based on engagement patterns
+        Predict churn risk for a member
+        
+        Uses the trained churn model for the member's tenant (or the global
+        model) when one exists, otherwise falls back to the engagement rules.
+        
+        Returns:
+            str: 'low', 'medium', 'high', 'critical'
+        """
+        probabilities = ChurnModelService.predict([member], tenant=member.tenant)
+        if probabilities:
+            return ChurnModelService.probability_to_risk(probabilities[member.id])
+        return AnalyticsService.predict_churn_risk_rules(member)
+    
+    @staticmethod
+    def predict_churn_risk_rules(member):
+        """
+        Rule-based churn risk from engagement score and visit recency
         
         Returns:
             str: 'low', 'medium', 'high', 'critical'
         """
         engagement_score = AnalyticsService.calculate_engagement_score(member)
         
-        # Get additional factors
         now = timezone.now()
-        thirty_days_ago = now - timedelta(days=30)
         
         # Check last visit
         last_visit = Attendance.objects.filter(member=member).order_by('-date', '-check_in_time').first()
         days_since_visit = (now.date() - last_visit.date).days if last_visit else 999
         
-        # Check payment status
-        overdue_payments = SubscriptionPayment.objects.filter(
-            member=member,
-            status='failed'
-        ).count()
-        
         # Churn risk logic
         if engagement_score >= 70 and days_since_visit <= 7:
             return 'low'
@@ -227,48 +235,16 @@ class AnalyticsService:
     
     @staticmethod
     def update_all_engagement_scores(tenant):
-        """Update engagement scores for all members"""
-        members = MemberProfile.objects.filter(tenant=tenant)
-        updated_count = 0
-        
-        for member in members:
-            score = AnalyticsService.calculate_engagement_score(member)
-            churn_risk = AnalyticsService.predict_churn_risk(member)
-            
-            # Get last visit
-            # Get last visit
-            last_visit = Attendance.objects.filter(member=member).order_by('-date', '-check_in_time').first()
-            days_since_visit = (timezone.now().date() - last_visit.date).days if last_visit else 999
-            
-            # Check payment status
-            has_overdue = SubscriptionPayment.objects.filter(
-                member=member,
-                status='failed'
-            ).exists()
-            
-            # Update or create engagement score
-            MemberEngagementScore.objects.update_or_create(
-                member=member,
-                defaults={
-                    'overall_score': score,
-                    'attendance_score': min((Attendance.objects.filter(
-                        member=member,
-                        date__gte=(timezone.now() - timedelta(days=30)).date()
-                    ).count() / 12) * 30, 30),
-                    'workout_score': min((WorkoutLog.objects.filter(
-                        member=member,
-                        logged_at__gte=timezone.now() - timedelta(days=30)
-                    ).count() / 12) * 25, 25),
-                    'payment_score': 20 if not has_overdue else 0,
-                    'last_visit_days_ago': days_since_visit,
-                    'churn_risk': churn_risk,
-                    'payment_status': 'current' if not has_overdue else 'overdue',
-                    'calculated_at': timezone.now()
-                }
-            )
-            updated_count += 1
+        """
+        Update engagement scores for all members.
         
-        return updated_count
+        Uses the set-based EngagementScoringEngine: a handful of grouped
+        aggregate queries for the whole tenant instead of ~10 per member.
+        Churn columns are then filled from the trained model, if any.
+        """
+        updated = EngagementScoringEngine().refresh_tenant(tenant)
+        ChurnModelService.score_tenant(tenant)
+        return updated
 
 
 # Convenience functions
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class GymConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gym'
+
+    def ready(self):
+        from . import signals, tasks  # tasks registers the background job handlers
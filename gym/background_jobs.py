@@ -0,0 +1,127 @@
+"""
+Background Jobs
+Runs BackgroundJob handlers on Celery workers (or a local thread pool) after the request returns
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from core.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobRunner:
+    """
+    Dispatches jobs to handlers registered per job_type.
+
+    Jobs are submitted on transaction commit so the worker always sees the
+    BackgroundJob row. With a Celery broker configured each job becomes a
+    gym.tasks.run_background_job task on its handler's queue; without one
+    it runs on an in-process thread pool. With settings.BACKGROUND_JOBS_EAGER
+    the handler runs inline, which is what tests and single-process setups want.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._handlers = {}
+        self._queues = {}
+        self._executor = None
+
+    def register(self, job_type, queue='default'):
+        """Decorator registering handler(job) for a job type and its Celery queue"""
+        def decorator(handler):
+            self._handlers[job_type] = handler
+            self._queues[job_type] = queue
+            return handler
+        return decorator
+
+    def queue_for(self, job_type):
+        return self._queues.get(job_type, 'default')
+
+    def submit(self, job):
+        if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+            self.run(job.pk)
+            return
+        if getattr(settings, 'CELERY_BROKER_URL', ''):
+            from .tasks import run_background_job
+            queue = self.queue_for(job.job_type)
+            transaction.on_commit(lambda: run_background_job.apply_async(args=[job.pk], queue=queue))
+            return
+        transaction.on_commit(lambda: self._get_executor().submit(self._run_in_thread, job.pk))
+
+    def _get_executor(self):
+        if self._executor is None:
+            workers = self.max_workers or getattr(settings, 'BACKGROUND_JOB_WORKERS', 2)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='background-job')
+        return self._executor
+
+    def _run_in_thread(self, job_id):
+        close_old_connections()
+        try:
+            self.run(job_id)
+        finally:
+            close_old_connections()
+
+    def run(self, job_id):
+        """Execute a pending job and record its outcome"""
+        job = BackgroundJob.objects.filter(pk=job_id, status='pending').first()
+        if job is None:
+            return None
+
+        handler = self._handlers.get(job.job_type)
+        if handler is None:
+            job.mark_failed(f"No handler registered for job type '{job.job_type}'")
+            return job
+
+        if not job.claim():
+            return None
+        try:
+            result = handler(job)
+        except Exception as e:
+            logger.exception("Background job %s failed", job.pk)
+            job.mark_failed(str(e))
+            return job
+
+        result = result or {}
+        job.mark_completed(result.get('result', {}), result.get('error_report', ''))
+        return job
+
+
+# Singleton instance
+job_runner = BackgroundJobRunner()
+
+
+# Convenience functions
+def start_job(job_type, tenant=None, user=None, **fields):
+    """Quick function to create a BackgroundJob and queue it"""
+    job = BackgroundJob.objects.create(job_type=job_type, tenant=tenant, created_by=user, **fields)
+    job_runner.submit(job)
+    return job
+
+
+def start_job_once(key, job_type, tenant=None, user=None, **fields):
+    """
+    Quick function to queue a job at most once per idempotency key.
+
+    A repeat call returns the existing job; a failed one is queued again.
+
+    Returns:
+        (job, created)
+    """
+    job, created = BackgroundJob.objects.get_or_create(
+        idempotency_key=key,
+        defaults={'job_type': job_type, 'tenant': tenant, 'created_by': user, **fields},
+    )
+    if created:
+        job_runner.submit(job)
+        return job, True
+
+    retried = BackgroundJob.objects.filter(pk=job.pk, status='failed').update(
+        status='pending', error_message='', started_at=None, finished_at=None
+    )
+    if retried:
+        job.refresh_from_db()
+        job_runner.submit(job)
+        return job, True
+    return job, False
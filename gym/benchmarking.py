@@ -0,0 +1,112 @@
+"""
+Benchmark Helpers
+Synthetic tenant data and timing utilities for the benchmark_* management commands
+"""
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+import numpy as np
+from django.utils import timezone
+from core.models import Tenant, CustomUser, MemberProfile, Attendance, Subscription
+from core.gamification_models import Exercise, WorkoutLog
+from core.payment_models import SubscriptionPayment
+
+
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def timed(results, label):
+    """Record the wall-clock seconds of the enclosed block in results[label]"""
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def seed_synthetic_tenant(member_count, days=120, seed=42, prefix='bench'):
+    """
+    Create a tenant with `member_count` members and `days` of realistic history.
+
+    Each member gets a visit propensity; roughly a quarter stop visiting at a
+    random point, so churn labels and engagement scores have real spread.
+    Everything is written with bulk_create, so this is meant to run inside a
+    transaction that the caller rolls back.
+    """
+    rng = np.random.default_rng(seed)
+    now = timezone.now()
+    today = now.date()
+
+    tenant = Tenant.objects.create(
+        name=f'{prefix.title()} Gym', subdomain=f'{prefix}-{seed}', contact_email=f'{prefix}@example.com'
+    )
+    exercise, _ = Exercise.objects.get_or_create(
+        name='Benchmark Squat', defaults={'category': 'strength', 'measurement_type': 'weight'}
+    )
+
+    CustomUser.objects.bulk_create(
+        [
+            CustomUser(username=f'{prefix}{seed}_{i}', role='member', tenant=tenant, password='!')
+            for i in range(member_count)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    users = CustomUser.objects.filter(tenant=tenant).order_by('id')
+    tenure = rng.integers(days // 2, days * 3, size=member_count)
+    MemberProfile.objects.bulk_create(
+        [
+            MemberProfile(
+                tenant=tenant, user=user, membership_type='monthly', age=int(rng.integers(18, 65)),
+                registration_date=today - timedelta(days=int(tenure[i])),
+                next_payment_date=today + timedelta(days=int(rng.integers(-10, 30))),
+                registration_amount=0, monthly_amount=1000, allotted_slot='Morning',
+            )
+            for i, user in enumerate(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    members = list(MemberProfile.objects.filter(tenant=tenant).order_by('id').values_list('id', flat=True))
+
+    propensity = rng.beta(2, 3, size=member_count)
+    stops_at = np.where(rng.random(member_count) < 0.25, rng.integers(0, days, size=member_count), days)
+
+    attendance, workouts, subscriptions = [], [], []
+    for i, member_id in enumerate(members):
+        first_day = max(days - int(tenure[i]), 0)
+        visits = np.nonzero(rng.random(days) < propensity[i] * 0.6)[0]
+        visits = visits[(visits >= first_day) & (visits < stops_at[i])]
+        for day in visits:
+            visit_date = today - timedelta(days=int(days - day))
+            attendance.append(Attendance(tenant=tenant, member_id=member_id, date=visit_date))
+            if rng.random() < 0.5:
+                workouts.append(WorkoutLog(
+                    member_id=member_id, exercise=exercise, value=int(rng.integers(20, 120)),
+                    logged_at=now - timedelta(days=int(days - day)),
+                ))
+        start = today - timedelta(days=int(tenure[i]))
+        subscriptions.append(Subscription(
+            member_id=member_id, plan='monthly', start_date=start,
+            end_date=today + timedelta(days=int(rng.integers(-30, 30))),
+            amount=1000, auto_renewal=bool(rng.random() < 0.6),
+        ))
+
+    Attendance.objects.bulk_create(attendance, batch_size=BATCH_SIZE)
+    WorkoutLog.objects.bulk_create(workouts, batch_size=BATCH_SIZE)
+    Subscription.objects.bulk_create(subscriptions, batch_size=BATCH_SIZE)
+
+    payments = []
+    for subscription_id, member_id in Subscription.objects.filter(
+        member__tenant=tenant
+    ).values_list('id', 'member_id'):
+        for month in range(3):
+            payments.append(SubscriptionPayment(
+                subscription_id=subscription_id, member_id=member_id, amount=1000, payment_method='upi',
+                payment_date=now - timedelta(days=30 * month + int(rng.integers(0, 10))),
+                status='failed' if rng.random() < 0.08 else 'completed',
+            ))
+    SubscriptionPayment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+
+    return tenant
+
+
+class BenchmarkRollback(Exception):
+    """Raised at the end of a benchmark to roll back its synthetic data"""
@@ -0,0 +1,108 @@
+"""
+Class Calendar
+Expands recurring class schedules into dated calendar events in memory
+"""
+from datetime import timedelta
+from django.db.models import Q
+from core.booking_models import ClassSchedule, ClassBooking, ClassOccurrence
+
+
+class ClassCalendar:
+    """
+    Calendar events for one member over a date range.
+
+    Recurring schedules are expanded to dates in Python; booking data for the
+    whole range comes from two queries (the ClassOccurrence seat counters and
+    the member's own bookings), so the cost is constant in schedules and days.
+    """
+
+    def __init__(self, tenant, member):
+        self.tenant = tenant
+        self.member = member
+
+    def schedules(self, start_date, end_date):
+        """Active schedules in effect at some point in the range"""
+        return list(
+            ClassSchedule.objects.filter(
+                tenant=self.tenant,
+                is_active=True,
+                effective_from__lte=end_date,
+            ).filter(
+                Q(effective_until__isnull=True) | Q(effective_until__gte=start_date)
+            ).select_related('instructor')
+        )
+
+    @staticmethod
+    def occurrences(schedule, start_date, end_date):
+        """Dates in the range on which the schedule runs"""
+        first = max(start_date, schedule.effective_from)
+        last = min(end_date, schedule.effective_until) if schedule.effective_until else end_date
+        current = first + timedelta(days=(schedule.day_of_week - first.weekday()) % 7)
+        while current <= last:
+            yield current
+            current += timedelta(days=7)
+
+    def events(self, start_date, end_date):
+        """FullCalendar event dicts for every class occurrence in the range"""
+        schedules = self.schedules(start_date, end_date)
+        if not schedules:
+            return []
+
+        in_range = Q(class_schedule__in=schedules, booking_date__gte=start_date, booking_date__lte=end_date)
+
+        confirmed_counts = {
+            (schedule_id, booking_date): count
+            for schedule_id, booking_date, count in ClassOccurrence.objects.filter(in_range)
+            .values_list('class_schedule_id', 'booking_date', 'confirmed_count')
+        }
+        member_bookings = {
+            (booking.class_schedule_id, booking.booking_date): booking
+            for booking in ClassBooking.objects.filter(in_range, member=self.member).only(
+                'id', 'class_schedule_id', 'booking_date', 'status'
+            )
+        }
+
+        events = []
+        for schedule in schedules:
+            instructor = schedule.instructor.get_full_name() if schedule.instructor else 'TBA'
+            for current_date in self.occurrences(schedule, start_date, end_date):
+                key = (schedule.id, current_date)
+                booking = member_bookings.get(key)
+                bookings_count = confirmed_counts.get(key, 0)
+                events.append(self.event(schedule, current_date, instructor, bookings_count, booking))
+        return events
+
+    @staticmethod
+    def event(schedule, current_date, instructor, bookings_count, booking):
+        if not booking:
+            color = '#667eea'
+        elif booking.status == 'confirmed':
+            color = '#28a745'
+        else:
+            color = '#ffc107'
+
+        return {
+            'id': f'{schedule.id}_{current_date}',
+            'title': f'{schedule.class_name} ({bookings_count}/{schedule.capacity})',
+            'start': f'{current_date}T{schedule.start_time}',
+            'end': f'{current_date}T{schedule.end_time}',
+            'backgroundColor': color,
+            'borderColor': color,
+            'extendedProps': {
+                'schedule_id': schedule.id,
+                'date': str(current_date),
+                'instructor': instructor,
+                'capacity': schedule.capacity,
+                'booked': bookings_count,
+                'is_full': bookings_count >= schedule.capacity,
+                'is_booked': booking is not None,
+                'booking_status': booking.status if booking else None,
+                'booking_id': booking.id if booking else None,
+            }
+        }
+
+
+# Convenience functions
+def get_member_calendar_events(tenant, member, start_date, end_date):
+    """Quick function to build calendar events for a member"""
+    return ClassCalendar(tenant, member).events(start_date, end_date)
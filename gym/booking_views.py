@@ -8,7 +8,9 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
+from django.db import IntegrityError
 from django.db.models import Q
+from django.core.exceptions import ValidationError
 
 from core.booking_models import (
     ClassSchedule,
@@ -18,6 +20,7 @@ from core.booking_models import (
 )
 from core.models import MemberProfile
 from core.decorators import role_required
+from .booking_calendar import ClassCalendar
 
 
 @login_required
@@ -64,61 +67,11 @@ def get_calendar_events(request):
     
     events = []
     
-    # Get all class schedules
-    schedules = ClassSchedule.objects.filter(
-        tenant=tenant,
-        is_active=True
-    )
-    
-    # Convert schedules to calendar events
+    # Expand recurring schedules over the requested range
     if start and end:
-        start_date = datetime.fromisoformat(start.replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(end.replace('Z', '+00:00'))
-        
-        for schedule in schedules:
-            # Generate events for each occurrence within date range
-            current_date = start_date.date()
-            while current_date <= end_date.date():
-                # Check if this day matches the schedule
-                if current_date.weekday() == schedule.day_of_week:
-                    # Check if member has booked this class
-                    booking = ClassBooking.objects.filter(
-                        member=member,
-                        class_schedule=schedule,
-                        booking_date=current_date
-                    ).first()
-                    
-                    # Get current bookings count
-                    bookings_count = ClassBooking.objects.filter(
-                        class_schedule=schedule,
-                        booking_date=current_date,
-                        status='confirmed'
-                    ).count()
-                    
-                    is_full = bookings_count >= schedule.capacity
-                    
-                    event = {
-                        'id': f'{schedule.id}_{current_date}',
-                        'title': f'{schedule.class_name} ({bookings_count}/{schedule.capacity})',
-                        'start': f'{current_date}T{schedule.start_time}',
-                        'end': f'{current_date}T{schedule.end_time}',
-                        'backgroundColor': '#667eea' if not booking else ('#28a745' if booking.status == 'confirmed' else '#ffc107'),
-                        'borderColor': '#667eea' if not booking else ('#28a745' if booking.status == 'confirmed' else '#ffc107'),
-                        'extendedProps': {
-                            'schedule_id': schedule.id,
-                            'date': str(current_date),
-                            'instructor': schedule.instructor.get_full_name() if schedule.instructor else 'TBA',
-                            'capacity': schedule.capacity,
-                            'booked': bookings_count,
-                            'is_full': is_full,
-                            'is_booked': booking is not None,
-                            'booking_status': booking.status if booking else None,
-                            'booking_id': booking.id if booking else None,
-                        }
-                    }
-                    events.append(event)
-                
-                current_date += timedelta(days=1)
+        start_date = datetime.fromisoformat(start.replace('Z', '+00:00')).date()
+        end_date = datetime.fromisoformat(end.replace('Z', '+00:00')).date()
+        events = ClassCalendar(tenant, member).events(start_date, end_date)
     
     return JsonResponse(events, safe=False)
 
@@ -140,58 +93,25 @@ def book_class(request):
         except ValueError:
             return JsonResponse({'success': False, 'error': 'Invalid date format'})
         
-        # Check if already booked
-        existing_booking = ClassBooking.objects.filter(
-            member=member,
-            class_schedule=schedule,
-            booking_date=booking_date,
-            status__in=['confirmed', 'waitlist']
-        ).first()
-        
-        if existing_booking:
-            return JsonResponse({
-                'success': False,
-                'error': 'You have already booked this class'
-            })
-        
-        # Check capacity
-        confirmed_bookings = ClassBooking.objects.filter(
-            class_schedule=schedule,
-            booking_date=booking_date,
-            status='confirmed'
-        ).count()
-        
         # Get booking settings
         settings = BookingSettings.objects.filter(tenant=request.user.tenant).first()
         allow_waitlist = settings.allow_waitlist if settings else True
         
-        if confirmed_bookings >= schedule.capacity:
-            if allow_waitlist:
-                # Add to waitlist
-                booking = ClassBooking.objects.create(
-                    member=member,
-                    class_schedule=schedule,
-                    booking_date=booking_date,
-                    status='waitlist'
-                )
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Added to waitlist',
-                    'status': 'waitlist'
-                })
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Class is full and waitlist is not available'
-                })
+        # Claim a seat (or waitlist place) atomically
+        try:
+            booking = ClassBooking.book(member, schedule, booking_date, allow_waitlist=allow_waitlist)
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'error': e.messages[0]})
+        except IntegrityError:
+            # A concurrent request from the same member won the race
+            return JsonResponse({'success': False, 'error': 'You have already booked this class'})
         
-        # Create booking
-        booking = ClassBooking.objects.create(
-            member=member,
-            class_schedule=schedule,
-            booking_date=booking_date,
-            status='confirmed'
-        )
+        if booking.status == 'waitlist':
+            return JsonResponse({
+                'success': True,
+                'message': 'Added to waitlist',
+                'status': 'waitlist'
+            })
         
         return JsonResponse({
             'success': True,
@@ -212,29 +132,16 @@ def cancel_booking(request, booking_id):
     
     # Check cancellation policy
     settings = BookingSettings.objects.filter(tenant=request.user.tenant).first()
-    if settings and settings.cancellation_hours:
-        hours_until_class = (datetime.combine(booking.booking_date, booking.class_schedule.start_time) - timezone.now()).total_seconds() / 3600
-        if hours_until_class < settings.cancellation_hours:
-            messages.error(request, f'Cannot cancel within {settings.cancellation_hours} hours of class')
-            return redirect('my_bookings')
-    
-    # Cancel booking
-    booking.status = 'cancelled'
-    booking.cancelled_at = timezone.now()
-    booking.save()
-    
-    # Promote from waitlist if applicable
-    if settings and settings.allow_waitlist:
-        waitlist_booking = ClassBooking.objects.filter(
-            class_schedule=booking.class_schedule,
-            booking_date=booking.booking_date,
-            status='waitlist'
-        ).order_by('booked_at').first()
-        
-        if waitlist_booking:
-            waitlist_booking.status = 'confirmed'
-            waitlist_booking.save()
-            # TODO: Send notification to member
+    if settings and not settings.allow_cancellation:
+        messages.error(request, 'Cancellations are not allowed for this gym')
+        return redirect('my_bookings')
+    
+    # Cancel booking (releases the seat and promotes from waitlist)
+    try:
+        booking.cancel()
+    except ValidationError as e:
+        messages.error(request, e.messages[0])
+        return redirect('my_bookings')
     
     messages.success(request, 'Booking cancelled successfully')
     return redirect('my_bookings')
@@ -0,0 +1,225 @@
+"""
+Chat Service
+Room history in id-cursor pages and a pub/sub layer that pushes new messages
+to WebSocket subscribers
+"""
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from core.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSubscription:
+    """Messages published to one group, for one WebSocket connection"""
+
+    def __init__(self, layer, group):
+        self.layer = layer
+        self.group = group
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self):
+        self.layer._unsubscribe(self)
+
+
+class InMemoryChatLayer:
+    """
+    Process-local pub/sub: fine for a single ASGI worker and for tests.
+    publish() may be called from any thread (e.g. a WSGI-style view).
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    async def subscribe(self, group):
+        subscription = ChatSubscription(self, group)
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._groups.get(subscription.group)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._groups[subscription.group]
+
+    def publish(self, group, message):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+            except RuntimeError:
+                # The connection's event loop has shut down
+                self._unsubscribe(subscription)
+
+
+class RedisChatSubscription:
+    """A Redis pub/sub channel read from the connection's event loop"""
+
+    def __init__(self, pubsub, group):
+        self.pubsub = pubsub
+        self.group = group
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.unsubscribe(self.group)
+        await self.pubsub.aclose()
+
+
+class RedisChatLayer:
+    """Redis pub/sub, so messages reach subscribers on every ASGI worker"""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self._publisher = redis.Redis.from_url(url)
+
+    async def subscribe(self, group):
+        import redis.asyncio
+
+        pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        await pubsub.subscribe(group)
+        return RedisChatSubscription(pubsub, group)
+
+    def publish(self, group, message):
+        try:
+            self._publisher.publish(group, json.dumps(message))
+        except Exception as e:
+            logger.error(f"Chat publish to {group} failed: {str(e)}")
+
+
+class ChatService:
+    """
+    Group chat rooms scoped to a tenant.
+
+    Pages load newest-first by message id (`before` cursor) so opening a room
+    reads PAGE_SIZE rows however long its history is. New messages are pushed
+    to connected WebSockets through the layer; clients without a socket poll
+    with a `since_id` cursor and get only the rows they have not seen.
+
+    With a shared cache (settings.SHARED_CACHE) each room's newest id is
+    cached and refreshed when a message commits, so a poll with nothing new is
+    answered without touching ChatMessage. A per-process cache would miss
+    messages posted through other workers, so then every poll reads the id
+    from the database. LATEST_ID_TIMEOUT bounds how long a refresh lost to a
+    race can hide a message from pollers.
+    """
+
+    PAGE_SIZE = 50
+    LATEST_ID_TIMEOUT = 60
+
+    def __init__(self, layer=None):
+        self._layer = layer
+
+    @property
+    def layer(self):
+        if self._layer is None:
+            redis_url = getattr(settings, 'REDIS_URL', '')
+            self._layer = RedisChatLayer(redis_url) if redis_url else InMemoryChatLayer()
+        return self._layer
+
+    @staticmethod
+    def group_name(tenant_id, room_name):
+        return f"chat.{tenant_id or 'global'}.{room_name}"
+
+    @staticmethod
+    def room_messages(tenant_id, room_name):
+        return ChatMessage.objects.filter(tenant_id=tenant_id, room_name=room_name).select_related('sender')
+
+    def _latest_key(self, tenant_id, room_name):
+        return f'chat_latest_id:{self.group_name(tenant_id, room_name)}'
+
+    def refresh_latest_id(self, tenant_id, room_name):
+        latest = self.room_messages(tenant_id, room_name).aggregate(latest=Max('id'))['latest'] or 0
+        if settings.SHARED_CACHE:
+            cache.set(self._latest_key(tenant_id, room_name), latest, self.LATEST_ID_TIMEOUT)
+        return latest
+
+    def latest_id(self, tenant_id, room_name):
+        """Id of the room's newest message (0 when empty), from cache when it is shared"""
+        if not settings.SHARED_CACHE:
+            return self.refresh_latest_id(tenant_id, room_name)
+        latest = cache.get(self._latest_key(tenant_id, room_name))
+        if latest is None:
+            latest = self.refresh_latest_id(tenant_id, room_name)
+        return latest
+
+    def has_new(self, tenant_id, room_name, since_id):
+        return self.latest_id(tenant_id, room_name) > since_id
+
+    def history(self, tenant_id, room_name, before=None, limit=None):
+        """
+        A page of the room's messages, oldest first.
+
+        Returns:
+            (messages, has_older)
+        """
+        limit = limit or self.PAGE_SIZE
+        messages = self.room_messages(tenant_id, room_name)
+        if before:
+            messages = messages.filter(id__lt=before)
+        page = list(messages.order_by('-id')[:limit + 1])
+        has_older = len(page) > limit
+        page = page[:limit]
+        page.reverse()
+        return page, has_older
+
+    def since(self, tenant_id, room_name, since_id):
+        """Up to PAGE_SIZE messages newer than since_id, oldest first"""
+        return list(self.room_messages(tenant_id, room_name).filter(id__gt=since_id).order_by('id')[:self.PAGE_SIZE])
+
+    @staticmethod
+    def payload(message):
+        return {
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'sender': message.sender.username,
+            'content': message.content,
+            'timestamp': message.timestamp.isoformat(),
+        }
+
+    def post(self, sender, tenant_id, room_name, content):
+        """Save a message and push it to the room once committed"""
+        message = ChatMessage.objects.create(
+            tenant_id=tenant_id, sender=sender, room_name=room_name, content=content
+        )
+        group, payload = self.group_name(tenant_id, room_name), self.payload(message)
+        transaction.on_commit(lambda: self.committed(tenant_id, room_name, group, payload))
+        return message
+
+    def committed(self, tenant_id, room_name, group, payload):
+        self.refresh_latest_id(tenant_id, room_name)
+        self.layer.publish(group, payload)
+
+    async def subscribe(self, tenant_id, room_name):
+        return await self.layer.subscribe(self.group_name(tenant_id, room_name))
+
+
+# Singleton instance
+chat_service = ChatService()
+
+
+# Convenience functions
+def post_chat_message(sender, tenant_id, room_name, content):
+    """Quick function to save a chat message and push it to the room"""
+    return chat_service.post(sender, tenant_id, room_name, content)
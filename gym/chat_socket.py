@@ -0,0 +1,100 @@
+"""
+Chat WebSocket
+Plain ASGI WebSocket endpoint for chat rooms at /ws/chat/<room_name>/
+"""
+import asyncio
+import json
+import logging
+import re
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aget_user
+from .chat_service import chat_service
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSocket:
+    """
+    One connection per open chat page.
+
+    The user comes from the Django session cookie and the tenant from the
+    user, as in the HTTP views. Every message the room's group receives is
+    forwarded as JSON (ChatService.payload); text frames of the form
+    {"content": "..."} post a message.
+    """
+
+    PATH = re.compile(r'^/ws/chat/(?P<room_name>[^/]+)/$')
+    MAX_CONTENT_LENGTH = 2000
+
+    async def __call__(self, scope, receive, send):
+        match = self.PATH.match(scope['path'])
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+        user = await self.authenticate(scope) if match and self.same_origin(scope) else None
+        if user is None:
+            await send({'type': 'websocket.close', 'code': 4403})
+            return
+
+        room_name = match['room_name']
+        subscription = await chat_service.subscribe(user.tenant_id, room_name)
+        await send({'type': 'websocket.accept'})
+        forward = asyncio.create_task(self.forward(subscription, send))
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                if event['type'] == 'websocket.receive':
+                    await self.handle_frame(user, room_name, event.get('text') or '')
+        finally:
+            forward.cancel()
+            await subscription.close()
+
+    @staticmethod
+    async def forward(subscription, send):
+        while True:
+            message = await subscription.get()
+            await send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    async def handle_frame(self, user, room_name, text):
+        try:
+            content = (json.loads(text).get('content') or '').strip()
+        except (ValueError, AttributeError):
+            return
+        if content:
+            await sync_to_async(chat_service.post)(
+                user, user.tenant_id, room_name, content[:self.MAX_CONTENT_LENGTH]
+            )
+
+    @staticmethod
+    def headers(scope):
+        return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+    def same_origin(self, scope):
+        """Browsers send Origin on WebSocket handshakes; reject other sites' pages"""
+        headers = self.headers(scope)
+        origin = headers.get('origin')
+        return not origin or urlsplit(origin).netloc == headers.get('host')
+
+    async def authenticate(self, scope):
+        """The logged-in user from the session cookie, or None"""
+        cookies = {}
+        for part in self.headers(scope).get('cookie', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            cookies[name] = value
+        session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+        if not session_key:
+            return None
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        user = await aget_user(SimpleNamespace(session=session))
+        return user if user.is_authenticated else None
+
+
+# Singleton instance
+chat_socket = ChatSocket()
@@ -0,0 +1,138 @@
+"""
+Dashboard Metrics
+Per-tenant dashboard totals kept in the cache and maintained from model signals
+"""
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from core.models import CustomUser, MemberProfile, Payment, Expense
+
+
+class DashboardMetrics:
+    """
+    Cached member/trainer/staff counts and lifetime income/expenses per tenant.
+
+    Each metric is stored under its own integer key (money in paise), so
+    signal handlers can apply deltas with atomic cache.incr/decr and the
+    dashboard reads every metric with a single get_many round trip. A missing
+    key means "unknown": the whole set is recomputed on the next read.
+
+    Deltas and invalidations are applied on transaction commit, so a rolled
+    back write never reaches the totals. They are only correct when every
+    worker sees the same cache (settings.SHARED_CACHE, i.e. Redis): with the
+    per-process LocMem default one worker's deltas would never reach the
+    others, so the totals are computed on every read instead.
+    """
+
+    CACHE_TIMEOUT = 60 * 60  # Bounds drift from bulk updates that bypass signals
+    KEY_PREFIX = 'dashboard_metrics'
+    METRICS = ['members', 'trainers', 'staff', 'income', 'expense']
+    MONEY_METRICS = {'income', 'expense'}
+
+    @staticmethod
+    def _scope(tenant_id):
+        return tenant_id if tenant_id is not None else 'all'
+
+    @staticmethod
+    def _keys(tenant_id):
+        scope = DashboardMetrics._scope(tenant_id)
+        return {metric: f'{DashboardMetrics.KEY_PREFIX}:{scope}:{metric}' for metric in DashboardMetrics.METRICS}
+
+    @staticmethod
+    def to_minor_units(amount):
+        return int(Decimal(str(amount or 0)) * 100)
+
+    @staticmethod
+    def compute(tenant_id):
+        """Run the aggregates for one tenant (or every tenant for None)"""
+        members = MemberProfile.objects.all()
+        users = CustomUser.objects.all()
+        payments = Payment.objects.all()
+        expenses = Expense.objects.all()
+        if tenant_id is not None:
+            members = members.filter(tenant_id=tenant_id)
+            users = users.filter(tenant_id=tenant_id)
+            payments = payments.filter(member__tenant_id=tenant_id)
+            expenses = expenses.filter(tenant_id=tenant_id)
+
+        return {
+            'members': members.count(),
+            'trainers': users.filter(role='trainer').count(),
+            'staff': users.filter(role='staff').count(),
+            'income': DashboardMetrics.to_minor_units(payments.aggregate(total=Sum('amount'))['total']),
+            'expense': DashboardMetrics.to_minor_units(expenses.aggregate(total=Sum('amount'))['total']),
+        }
+
+    @staticmethod
+    def get(tenant):
+        """
+        Dashboard totals for a tenant (None = every tenant).
+
+        Returns:
+            dict with total_members, trainers_count, staff_count, income, expense, profit
+        """
+        tenant_id = tenant.id if tenant is not None else None
+        keys = DashboardMetrics._keys(tenant_id)
+        cached = cache.get_many(list(keys.values())) if settings.SHARED_CACHE else {}
+
+        if len(cached) == len(keys):
+            values = {metric: cached[key] for metric, key in keys.items()}
+        elif not settings.SHARED_CACHE:
+            values = DashboardMetrics.compute(tenant_id)
+        else:
+            values = DashboardMetrics.compute(tenant_id)
+            cache.set_many(
+                {keys[metric]: value for metric, value in values.items()},
+                DashboardMetrics.CACHE_TIMEOUT,
+            )
+
+        income = Decimal(values['income']) / 100
+        expense = Decimal(values['expense']) / 100
+        return {
+            'total_members': values['members'],
+            'trainers_count': values['trainers'],
+            'staff_count': values['staff'],
+            'income': income,
+            'expense': expense,
+            'profit': income - expense,
+        }
+
+    @staticmethod
+    def apply_delta(tenant_id, metric, delta):
+        """
+        Adjust a cached metric for the tenant and the all-tenants scope once
+        the current transaction commits. If a key is not cached, that scope
+        is invalidated instead.
+        """
+        if delta and settings.SHARED_CACHE:
+            transaction.on_commit(lambda: DashboardMetrics._incr(tenant_id, metric, delta))
+
+    @staticmethod
+    def _incr(tenant_id, metric, delta):
+        for scope_id in {tenant_id, None}:
+            key = DashboardMetrics._keys(scope_id)[metric]
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                DashboardMetrics._delete(scope_id)
+
+    @staticmethod
+    def invalidate(tenant_id):
+        """Drop cached metrics for the tenant and the all-tenants scope once the transaction commits"""
+        if settings.SHARED_CACHE:
+            transaction.on_commit(lambda: DashboardMetrics._delete(tenant_id))
+
+    @staticmethod
+    def _delete(tenant_id):
+        keys = []
+        for scope_id in {tenant_id, None}:
+            keys.extend(DashboardMetrics._keys(scope_id).values())
+        cache.delete_many(keys)
+
+
+# Convenience functions
+def get_dashboard_metrics(tenant):
+    """Quick function to read dashboard totals for a tenant"""
+    return DashboardMetrics.get(tenant)
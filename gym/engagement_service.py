@@ -0,0 +1,519 @@
+"""
+Engagement Scoring Engine
+Set-based engagement scoring for whole tenants using grouped aggregates,
+plus incremental maintenance of each member's rolling 30-day counters
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from datetime import timedelta
+import numpy as np
+from core.models import MemberProfile, Attendance
+from core.gamification_models import WorkoutLog, Achievement, MemberEngagementScore, ChurnModelArtifact
+from core.payment_models import SubscriptionPayment
+from .streaks import StreakService
+
+
+class EngagementScoringEngine:
+    """
+    Bulk version of AnalyticsService.calculate_engagement_score / predict_churn_risk.
+
+    Per-member features are collected with one grouped query per source table
+    (Attendance, WorkoutLog, SubscriptionPayment, Achievement), scored as NumPy
+    vectors and written back with bulk_create / bulk_update. The weights and
+    thresholds mirror the per-member path exactly. Attendance streaks come
+    from StreakService in the same refresh.
+
+    churn_risk / churn_probability hold the rule-based estimate only for
+    tenants without a churn model. Where ChurnModelService scores the tenant,
+    refreshes leave those columns as the model wrote them, and new rows are
+    predicted with the model.
+    """
+
+    WINDOW_DAYS = 30
+    NO_VISIT_DAYS = 999
+    BATCH_SIZE = 500
+
+    COUNTER_FIELDS = [
+        'attendance_count_30d', 'workout_count_30d', 'payment_count_30d',
+        'achievement_count_30d', 'last_visit_date', 'window_start',
+    ]
+    SCORE_FIELDS = [
+        'overall_score', 'attendance_score', 'workout_logging_score',
+        'attendance_rate_30d', 'last_visit_days_ago', 'calculated_at',
+    ]
+    CHURN_FIELDS = ['churn_risk', 'churn_probability']
+    PAYMENT_FIELDS = ['payment_score', 'payment_status', 'days_until_payment_due']
+    STREAK_FIELDS = ['current_streak_days', 'longest_streak_days']
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self.window_start = self.now - timedelta(days=self.WINDOW_DAYS)
+        self._churn_models = {}
+
+    def has_churn_model(self, tenant_id):
+        """Whether ChurnModelService scores this tenant (its own model or the global one)"""
+        if tenant_id not in self._churn_models:
+            self._churn_models[tenant_id] = ChurnModelArtifact.objects.filter(
+                Q(tenant_id=tenant_id) | Q(tenant__isnull=True)
+            ).exists()
+        return self._churn_models[tenant_id]
+
+    # ------------------------------------------------------------------
+    # Feature collection
+    # ------------------------------------------------------------------
+
+    def collect_features(self, member_filter, member_ids):
+        """
+        Collect per-member features with one grouped query per table.
+
+        Args:
+            member_filter: Q object on the `member` relation (e.g. Q(member__tenant=t))
+            member_ids: ordered list of member ids the arrays are aligned to
+
+        Returns:
+            dict of NumPy arrays aligned to member_ids
+        """
+        index = {member_id: i for i, member_id in enumerate(member_ids)}
+        size = len(member_ids)
+
+        attendance_30d = np.zeros(size, dtype=np.int64)
+        workouts_30d = np.zeros(size, dtype=np.int64)
+        payments_30d = np.zeros(size, dtype=np.int64)
+        failed_payments = np.zeros(size, dtype=np.int64)
+        achievements_30d = np.zeros(size, dtype=np.int64)
+        current_streak = np.zeros(size, dtype=np.int64)
+        longest_streak = np.zeros(size, dtype=np.int64)
+        last_visit = [None] * size
+
+        attendance_rows = Attendance.objects.filter(member_filter).values('member_id').annotate(
+            recent=Count('id', filter=Q(date__gte=self.window_start.date())),
+            last_visit=Max('date', filter=Q(status='Present')),
+        )
+        for row in attendance_rows:
+            i = index.get(row['member_id'])
+            if i is not None:
+                attendance_30d[i] = row['recent']
+                last_visit[i] = row['last_visit']
+
+        workout_rows = WorkoutLog.objects.filter(
+            member_filter, logged_at__gte=self.window_start
+        ).values('member_id').annotate(total=Count('id'))
+        for row in workout_rows:
+            i = index.get(row['member_id'])
+            if i is not None:
+                workouts_30d[i] = row['total']
+
+        payment_rows = SubscriptionPayment.objects.filter(
+            member_filter, status__in=['completed', 'failed']
+        ).values('member_id').annotate(
+            recent=Count('id', filter=Q(status='completed', payment_date__gte=self.window_start)),
+            failed=Count('id', filter=Q(status='failed')),
+        )
+        for row in payment_rows:
+            i = index.get(row['member_id'])
+            if i is not None:
+                payments_30d[i] = row['recent']
+                failed_payments[i] = row['failed']
+
+        achievement_rows = Achievement.objects.filter(
+            member_filter, earned_at__gte=self.window_start
+        ).values('member_id').annotate(total=Count('id'))
+        for row in achievement_rows:
+            i = index.get(row['member_id'])
+            if i is not None:
+                achievements_30d[i] = row['total']
+
+        for member_id, (current, longest) in StreakService().compute(member_filter, self.now.date()).items():
+            i = index.get(member_id)
+            if i is not None:
+                current_streak[i] = current
+                longest_streak[i] = longest
+
+        return {
+            'attendance_30d': attendance_30d,
+            'workouts_30d': workouts_30d,
+            'payments_30d': payments_30d,
+            'failed_payments': failed_payments,
+            'achievements_30d': achievements_30d,
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'last_visit_date': last_visit,
+            'days_since_visit': self._days_since(last_visit),
+        }
+
+    def features_from_rows(self, rows):
+        """Rebuild feature arrays from the counters stored on score rows"""
+        last_visit = [row.last_visit_date for row in rows]
+        today = self.now.date()
+        return {
+            'attendance_30d': np.array([row.attendance_count_30d for row in rows], dtype=np.int64),
+            'workouts_30d': np.array([row.workout_count_30d for row in rows], dtype=np.int64),
+            'payments_30d': np.array([row.payment_count_30d for row in rows], dtype=np.int64),
+            'achievements_30d': np.array([row.achievement_count_30d for row in rows], dtype=np.int64),
+            'current_streak': np.array([StreakService.current_as_of(row, today) for row in rows], dtype=np.int64),
+            'longest_streak': np.array([row.longest_streak_days for row in rows], dtype=np.int64),
+            'last_visit_date': last_visit,
+            'days_since_visit': self._days_since(last_visit),
+        }
+
+    def _days_since(self, dates):
+        today = self.now.date()
+        return np.array(
+            [(today - day).days if day else self.NO_VISIT_DAYS for day in dates],
+            dtype=np.int64,
+        )
+
+    # ------------------------------------------------------------------
+    # Vectorised scoring
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def score(cls, features):
+        """
+        Score feature arrays. Weights match calculate_engagement_score:
+        attendance 30, payments 20, workout logging 25, recency 15, achievements 10.
+        """
+        attendance_score = np.minimum((features['attendance_30d'] / 12) * 30, 30)
+        payment_score = np.minimum(features['payments_30d'] * 20, 20)
+        workout_score = np.minimum((features['workouts_30d'] / 12) * 25, 25)
+
+        days = features['days_since_visit']
+        recency_score = np.select([days <= 3, days <= 7, days <= 14], [15, 10, 5], default=0)
+
+        achievement_score = np.minimum(features['achievements_30d'] * 2, 10)
+
+        # Same summation order as the per-member path so float results are identical
+        total = attendance_score + payment_score + workout_score + recency_score + achievement_score
+        overall = np.array([round(float(value), 2) for value in total])
+
+        churn_risk = np.select(
+            [
+                (overall >= 70) & (days <= 7),
+                (overall >= 50) & (days <= 14),
+                (overall >= 30) | (days <= 21),
+            ],
+            ['low', 'medium', 'high'],
+            default='critical',
+        )
+
+        return {
+            'overall_score': overall,
+            'attendance_score': attendance_score,
+            'workout_logging_score': workout_score,
+            'attendance_rate_30d': np.minimum(features['attendance_30d'] / 12 * 100, 100),
+            'churn_risk': churn_risk,
+            # Rule-based estimate: the less engaged, the more likely to churn
+            'churn_probability': np.clip(100 - overall, 0, 100),
+        }
+
+    def _row_values(self, features, scores, i):
+        """Counter and score column values for the i-th member"""
+        return {
+            'attendance_count_30d': int(features['attendance_30d'][i]),
+            'workout_count_30d': int(features['workouts_30d'][i]),
+            'payment_count_30d': int(features['payments_30d'][i]),
+            'achievement_count_30d': int(features['achievements_30d'][i]),
+            'last_visit_date': features['last_visit_date'][i],
+            'current_streak_days': int(features['current_streak'][i]),
+            'longest_streak_days': int(features['longest_streak'][i]),
+            'window_start': self.window_start,
+            'overall_score': float(scores['overall_score'][i]),
+            'attendance_score': round(float(scores['attendance_score'][i]), 2),
+            'workout_logging_score': round(float(scores['workout_logging_score'][i]), 2),
+            'attendance_rate_30d': round(float(scores['attendance_rate_30d'][i]), 2),
+            'last_visit_days_ago': int(features['days_since_visit'][i]),
+            'churn_risk': str(scores['churn_risk'][i]),
+            'churn_probability': round(float(scores['churn_probability'][i]), 2),
+            'calculated_at': self.now,
+        }
+
+    def rescore_rows(self, rows, keep_churn=False):
+        """
+        Recompute scores for score rows from their stored counters, without
+        touching the event tables. Returns the rows whose scores changed.
+
+        Args:
+            keep_churn: leave the model-written churn columns untouched
+        """
+        if not rows:
+            return []
+        features = self.features_from_rows(rows)
+        scores = self.score(features)
+        changed = []
+        for i, row in enumerate(rows):
+            values = self._row_values(features, scores, i)
+            values.pop('window_start')
+            values.pop('calculated_at')
+            if keep_churn:
+                for field in self.CHURN_FIELDS:
+                    values.pop(field)
+            if any(getattr(row, field) != value for field, value in values.items()):
+                changed.append(row)
+            for field, value in values.items():
+                setattr(row, field, value)
+            row.window_start = self.window_start
+            row.calculated_at = self.now
+        return changed
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def refresh_tenant(self, tenant):
+        """Recompute and store engagement scores for every member of a tenant"""
+        members = MemberProfile.objects.filter(tenant=tenant)
+        return self._refresh(members, Q(member__tenant=tenant))
+
+    def refresh_members(self, member_ids):
+        """Recompute and store engagement scores for the given member ids"""
+        member_ids = list(member_ids)
+        if not member_ids:
+            return 0
+        members = MemberProfile.objects.filter(id__in=member_ids)
+        return self._refresh(members, Q(member_id__in=member_ids))
+
+    def _refresh(self, members, member_filter):
+        members = list(members.only('id', 'tenant_id', 'registration_date', 'next_payment_date').order_by('id'))
+        if not members:
+            return 0
+
+        member_ids = [member.id for member in members]
+        features = self.collect_features(member_filter, member_ids)
+        scores = self.score(features)
+        today = self.now.date()
+
+        existing = latest_score_rows(MemberEngagementScore.objects.filter(member_filter))
+
+        to_create = []
+        to_update = []
+        model_updates = []
+        model_created = []
+        for i, member in enumerate(members):
+            has_overdue = features['failed_payments'][i] > 0
+            values = self._row_values(features, scores, i)
+            values.update({
+                'payment_score': 0 if has_overdue else 20,
+                'payment_status': 'overdue' if has_overdue else 'current',
+                'days_until_payment_due': (
+                    (member.next_payment_date - today).days if member.next_payment_date else None
+                ),
+            })
+
+            modelled = self.has_churn_model(member.tenant_id)
+            row = existing.get(member.id)
+            if row is None:
+                row = MemberEngagementScore(member_id=member.id, **values)
+                to_create.append(row)
+                if modelled:
+                    model_created.append((member, row))
+            else:
+                if modelled:
+                    for field in self.CHURN_FIELDS:
+                        values.pop(field)
+                for field, value in values.items():
+                    setattr(row, field, value)
+                (model_updates if modelled else to_update).append(row)
+
+        self._predict_churn(model_created)
+        fields = self.COUNTER_FIELDS + self.SCORE_FIELDS + self.PAYMENT_FIELDS + self.STREAK_FIELDS
+        with transaction.atomic():
+            if to_update:
+                MemberEngagementScore.objects.bulk_update(
+                    to_update, fields + self.CHURN_FIELDS, batch_size=self.BATCH_SIZE,
+                )
+            if model_updates:
+                MemberEngagementScore.objects.bulk_update(model_updates, fields, batch_size=self.BATCH_SIZE)
+            if to_create:
+                MemberEngagementScore.objects.bulk_create(to_create, batch_size=self.BATCH_SIZE)
+
+        return len(members)
+
+    @staticmethod
+    def _predict_churn(pairs):
+        """Fill churn columns on new (member, row) pairs from their tenant's model"""
+        if not pairs:
+            return
+        from .churn_model import ChurnModelService
+
+        by_tenant = {}
+        for member, row in pairs:
+            by_tenant.setdefault(member.tenant_id, []).append((member, row))
+        for tenant_id, tenant_pairs in by_tenant.items():
+            probabilities = ChurnModelService.predict([member for member, _ in tenant_pairs], tenant=tenant_id) or {}
+            for member, row in tenant_pairs:
+                probability = probabilities.get(member.id)
+                if probability is not None:
+                    row.churn_probability = round(probability * 100, 2)
+                    row.churn_risk = ChurnModelService.probability_to_risk(probability)
+
+
+class EngagementTracker:
+    """
+    Incremental engagement maintenance.
+
+    Events (check-ins, workout logs, completed payments) bump the member's
+    rolling counters and rescore that single row from them. Achievements are
+    bulk-created, so AchievementEngine refreshes their members instead. The nightly
+    expire_windows() pass only rescans events that have aged out of the window
+    since the last pass, and rolls every other row forward from its counters.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def record_attendance(self, attendance):
+        # Only Present marks are visits; StreakService.compute() counts nothing else
+        self._record(
+            attendance.member_id,
+            'attendance_count_30d',
+            in_window=lambda start: attendance.date >= start.date(),
+            visit_date=attendance.date if attendance.status == 'Present' else None,
+        )
+
+    def record_workout(self, workout_log):
+        self._record(
+            workout_log.member_id,
+            'workout_count_30d',
+            in_window=lambda start: workout_log.logged_at >= start,
+        )
+
+    def record_payment(self, payment):
+        if payment.status != 'completed':
+            return
+        self._record(
+            payment.member_id,
+            'payment_count_30d',
+            in_window=lambda start: payment.payment_date >= start,
+        )
+
+    def _record(self, member_id, counter, in_window, visit_date=None):
+        engine = EngagementScoringEngine()
+        with transaction.atomic():
+            row = (
+                MemberEngagementScore.objects.select_for_update()
+                .filter(member_id=member_id)
+                .order_by('-calculated_at')
+                .first()
+            )
+
+            # No counters yet, or the nightly pass has fallen behind: rebuild exactly
+            if row is None or row.window_start is None or \
+                    row.window_start < engine.window_start - timedelta(days=1):
+                engine.refresh_members([member_id])
+                return
+
+            if in_window(row.window_start):
+                setattr(row, counter, getattr(row, counter) + 1)
+            # A back-dated check-in can join or split runs; recount those exactly
+            streak_extended = visit_date is None or StreakService.extend(row, visit_date)
+            if visit_date and (row.last_visit_date is None or visit_date > row.last_visit_date):
+                row.last_visit_date = visit_date
+
+            tenant_id = MemberProfile.objects.filter(pk=member_id).values_list('tenant_id', flat=True).first()
+            keep_churn = engine.has_churn_model(tenant_id)
+            engine.window_start = row.window_start
+            engine.rescore_rows([row], keep_churn=keep_churn)
+            row.save(update_fields=[counter, 'last_visit_date'] + EngagementScoringEngine.SCORE_FIELDS
+                     + EngagementScoringEngine.STREAK_FIELDS
+                     + ([] if keep_churn else EngagementScoringEngine.CHURN_FIELDS))
+            if not streak_extended:
+                engine.refresh_members([member_id])
+
+    def expire_windows(self, tenant):
+        """
+        Nightly pass for one tenant.
+
+        Members with events that fell out of the window since their counters were
+        last rebuilt (or without counters at all) are re-aggregated; everyone else
+        is rescored from stored counters, and only changed rows are written.
+        """
+        engine = EngagementScoringEngine()
+        cutoff = engine.window_start
+
+        rows = latest_score_rows(
+            MemberEngagementScore.objects.filter(member__tenant=tenant).select_related('member')
+        )
+
+        to_rebuild = set(
+            MemberProfile.objects.filter(tenant=tenant, engagement_scores__isnull=True).values_list('id', flat=True)
+        )
+        to_rebuild.update(member_id for member_id, row in rows.items() if row.window_start is None)
+
+        starts = [row.window_start for row in rows.values() if row.window_start is not None]
+        if starts:
+            oldest = min(starts)
+            scope = Q(member__tenant=tenant)
+            to_rebuild.update(Attendance.objects.filter(
+                scope, date__gte=oldest.date(), date__lt=cutoff.date()
+            ).values_list('member_id', flat=True).distinct())
+            to_rebuild.update(WorkoutLog.objects.filter(
+                scope, logged_at__gte=oldest, logged_at__lt=cutoff
+            ).values_list('member_id', flat=True).distinct())
+            to_rebuild.update(SubscriptionPayment.objects.filter(
+                scope, status='completed', payment_date__gte=oldest, payment_date__lt=cutoff
+            ).values_list('member_id', flat=True).distinct())
+            to_rebuild.update(Achievement.objects.filter(
+                scope, earned_at__gte=oldest, earned_at__lt=cutoff
+            ).values_list('member_id', flat=True).distinct())
+
+        rebuilt = 0
+        rebuild_ids = sorted(to_rebuild)
+        for offset in range(0, len(rebuild_ids), self.CHUNK_SIZE):
+            rebuilt += engine.refresh_members(rebuild_ids[offset:offset + self.CHUNK_SIZE])
+
+        # Everyone else keeps their counters; only recency, lapsed streaks and due dates move
+        today = engine.now.date()
+        remaining = [row for member_id, row in rows.items() if member_id not in to_rebuild]
+        keep_churn = engine.has_churn_model(tenant.id)
+        changed = set(id(row) for row in engine.rescore_rows(remaining, keep_churn=keep_churn))
+        for row in remaining:
+            next_due = row.member.next_payment_date
+            days_until_due = (next_due - today).days if next_due else None
+            if days_until_due != row.days_until_payment_due:
+                row.days_until_payment_due = days_until_due
+                changed.add(id(row))
+
+        changed_rows = [row for row in remaining if id(row) in changed]
+        unchanged_ids = [row.pk for row in remaining if id(row) not in changed]
+        with transaction.atomic():
+            if changed_rows:
+                MemberEngagementScore.objects.bulk_update(
+                    changed_rows,
+                    ['window_start'] + EngagementScoringEngine.SCORE_FIELDS + ['days_until_payment_due']
+                    + EngagementScoringEngine.STREAK_FIELDS
+                    + ([] if keep_churn else EngagementScoringEngine.CHURN_FIELDS),
+                    batch_size=EngagementScoringEngine.BATCH_SIZE,
+                )
+            for offset in range(0, len(unchanged_ids), self.CHUNK_SIZE):
+                MemberEngagementScore.objects.filter(
+                    pk__in=unchanged_ids[offset:offset + self.CHUNK_SIZE]
+                ).update(window_start=cutoff, calculated_at=engine.now)
+
+        return {
+            'rebuilt': rebuilt,
+            'rolled_forward': len(remaining),
+            'changed': len(changed),
+        }
+
+
+def latest_score_rows(queryset):
+    """Map member_id -> most recent MemberEngagementScore row"""
+    latest = {}
+    for row in queryset.order_by('member_id', '-calculated_at'):
+        latest.setdefault(row.member_id, row)
+    return latest
+
+
+# Singleton instance
+engagement_tracker = EngagementTracker()
+
+
+# Convenience functions
+def refresh_tenant_engagement(tenant, now=None):
+    """Quick function to rescore every member of a tenant"""
+    return EngagementScoringEngine(now=now).refresh_tenant(tenant)
+
+
+def expire_engagement_windows(tenant):
+    """Quick function to run the nightly window expiry for a tenant"""
+    return engagement_tracker.expire_windows(tenant)
@@ -0,0 +1,228 @@
+"""
+Financial Rollup Service
+Maintains DailyFinancialRollup rows and answers report queries from them
+"""
+import operator
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from core.models import MemberProfile, Attendance, Payment, Expense
+from core.reporting_models import DailyFinancialRollup
+
+
+REVENUE_COLUMNS = {
+    'registration': 'revenue_registration',
+    'monthly': 'revenue_monthly',
+}
+EXPENSE_COLUMNS = {
+    'maintenance': 'expense_maintenance',
+    'salary': 'expense_salary',
+    'electricity': 'expense_electricity',
+    'other': 'expense_other',
+}
+
+_date_field = models.DateField()
+
+
+def _column_sum(columns):
+    return reduce(operator.add, (F(column) for column in columns))
+
+
+class FinancialRollupService:
+    """Incremental maintenance, backfill and reads of the daily rollup"""
+
+    BATCH_SIZE = 1000
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def contribution(instance):
+        """
+        (tenant_id, date, column, amount) this row adds to the rollup, or None.
+        Dates go through DateField.to_python, so in-memory datetimes and
+        strings land on the same day the database will store.
+        """
+        if isinstance(instance, Payment):
+            column = REVENUE_COLUMNS.get(instance.payment_type)
+            if column is None:
+                return None
+            return (instance.tenant_id, _date_field.to_python(instance.date), column,
+                    Decimal(str(instance.amount or 0)))
+        if isinstance(instance, Expense):
+            column = EXPENSE_COLUMNS.get(instance.category, 'expense_other')
+            return (instance.tenant_id, _date_field.to_python(instance.date), column,
+                    Decimal(str(instance.amount or 0)))
+        if isinstance(instance, Attendance):
+            return (instance.tenant_id, _date_field.to_python(instance.date), 'attendance_count', 1)
+        if isinstance(instance, MemberProfile):
+            return (instance.tenant_id, _date_field.to_python(instance.registration_date), 'new_members', 1)
+        return None
+
+    @staticmethod
+    def apply(contribution, sign=1):
+        """Add (or with sign=-1 remove) a contribution with an F() increment"""
+        if contribution is None:
+            return
+        tenant_id, date, column, amount = contribution
+        if not amount or date is None:
+            return
+
+        delta = sign * amount
+        rows = DailyFinancialRollup.objects.filter(tenant_id=tenant_id, date=date)
+        if rows.update(**{column: F(column) + delta}):
+            return
+        try:
+            with transaction.atomic():
+                DailyFinancialRollup.objects.create(tenant_id=tenant_id, date=date, **{column: delta})
+        except IntegrityError:
+            # Another writer created the row between our update and insert
+            rows.update(**{column: F(column) + delta})
+
+    @staticmethod
+    def rebuild_day(tenant_id, date):
+        """Recompute one tenant-day from the raw tables"""
+        FinancialRollupService.rebuild(tenant_id=tenant_id, date_from=date, date_to=date, all_tenants=False)
+
+    # ------------------------------------------------------------------
+    # Backfill
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def rebuild(tenant_id=None, date_from=None, date_to=None, all_tenants=True):
+        """
+        Replace rollup rows in the given scope with fresh grouped aggregates.
+
+        Args:
+            tenant_id: tenant to rebuild (None with all_tenants=False means the
+                rows that have no tenant)
+            date_from / date_to: optional inclusive date range
+            all_tenants: ignore tenant_id and rebuild every tenant
+
+        Returns:
+            number of rollup rows written
+        """
+        def scoped(queryset, date_field):
+            if not all_tenants:
+                queryset = queryset.filter(tenant_id=tenant_id) if tenant_id is not None \
+                    else queryset.filter(tenant__isnull=True)
+            if date_from:
+                queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+            if date_to:
+                queryset = queryset.filter(**{f'{date_field}__lte': date_to})
+            return queryset
+
+        days = defaultdict(dict)
+
+        for row in scoped(Payment.objects.all(), 'date').values('tenant_id', 'date', 'payment_type').annotate(
+            total=Sum('amount')
+        ):
+            column = REVENUE_COLUMNS.get(row['payment_type'])
+            if column:
+                days[(row['tenant_id'], row['date'])][column] = row['total']
+
+        for row in scoped(Expense.objects.all(), 'date').values('tenant_id', 'date', 'category').annotate(
+            total=Sum('amount')
+        ):
+            column = EXPENSE_COLUMNS.get(row['category'], 'expense_other')
+            day = days[(row['tenant_id'], row['date'])]
+            day[column] = day.get(column, 0) + row['total']
+
+        for row in scoped(Attendance.objects.all(), 'date').values('tenant_id', 'date').annotate(total=Count('id')):
+            days[(row['tenant_id'], row['date'])]['attendance_count'] = row['total']
+
+        for row in scoped(MemberProfile.objects.all(), 'registration_date').values(
+            'tenant_id', 'registration_date'
+        ).annotate(total=Count('id')):
+            days[(row['tenant_id'], row['registration_date'])]['new_members'] = row['total']
+
+        with transaction.atomic():
+            scoped(DailyFinancialRollup.objects.all(), 'date').delete()
+            DailyFinancialRollup.objects.bulk_create(
+                [
+                    DailyFinancialRollup(tenant_id=day_tenant_id, date=date, **values)
+                    for (day_tenant_id, date), values in days.items()
+                ],
+                batch_size=FinancialRollupService.BATCH_SIZE,
+            )
+        return len(days)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def rows(tenant, date_from=None, date_to=None):
+        queryset = DailyFinancialRollup.objects.all()
+        if tenant:
+            queryset = queryset.filter(tenant=tenant)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        return queryset
+
+    @staticmethod
+    def totals(tenant, date_from=None, date_to=None):
+        """Revenue, expenses and profit over a date range in one aggregate"""
+        revenue = _column_sum(REVENUE_COLUMNS.values())
+        expenses = _column_sum(EXPENSE_COLUMNS.values())
+        result = FinancialRollupService.rows(tenant, date_from, date_to).aggregate(
+            revenue=Sum(revenue, output_field=models.DecimalField()),
+            expenses=Sum(expenses, output_field=models.DecimalField()),
+        )
+        revenue_total = result['revenue'] or Decimal(0)
+        expense_total = result['expenses'] or Decimal(0)
+        return {
+            'revenue': revenue_total,
+            'expenses': expense_total,
+            'profit': revenue_total - expense_total,
+        }
+
+    @staticmethod
+    def monthly_revenue(tenant, since):
+        """[{'month': date, 'total': Decimal}] from `since` onwards"""
+        revenue = _column_sum(REVENUE_COLUMNS.values())
+        return list(
+            FinancialRollupService.rows(tenant, date_from=since)
+            .annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(total=Sum(revenue, output_field=models.DecimalField()))
+            .filter(total__gt=0)
+            .order_by('month')
+        )
+
+    @staticmethod
+    def expense_breakdown(tenant, date_from=None, date_to=None):
+        """[{'category': str, 'total': Decimal}] sorted by total, largest first"""
+        sums = FinancialRollupService.rows(tenant, date_from, date_to).aggregate(
+            **{category: Sum(column) for category, column in EXPENSE_COLUMNS.items()}
+        )
+        breakdown = [
+            {'category': category, 'total': total}
+            for category, total in sums.items() if total
+        ]
+        return sorted(breakdown, key=lambda item: item['total'], reverse=True)
+
+    @staticmethod
+    def daily_attendance(tenant, since):
+        """[{'date': date, 'count': int}] for days with check-ins from `since` onwards"""
+        return list(
+            FinancialRollupService.rows(tenant, date_from=since)
+            .filter(attendance_count__gt=0)
+            .values('date')
+            .annotate(count=Sum('attendance_count'))
+            .order_by('date')
+        )
+
+
+# Convenience functions
+def backfill_financial_rollups(tenant=None, date_from=None):
+    """Quick function to rebuild rollups for one tenant or all tenants"""
+    if tenant is None:
+        return FinancialRollupService.rebuild(date_from=date_from)
+    return FinancialRollupService.rebuild(tenant_id=tenant.id, date_from=date_from, all_tenants=False)
@@ -167,6 +167,13 @@ class BulkPhoneImportForm(forms.Form):
         help_text='Upload a CSV file with columns: username, phone_number',
         widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv'})
     )
+    dry_run = forms.BooleanField(
+        label='Preview changes only',
+        required=False,
+        initial=True,
+        help_text='Show which numbers would change without saving anything',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
     
     def clean_csv_file(self):
         file = self.cleaned_data['csv_file']
@@ -3,23 +3,26 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Sum, Count, Max
+from django.db import transaction
+from django.db.models import Sum, Max
 from core.gamification_models import (
     Exercise, WorkoutLog, PersonalBest, Achievement, 
     Leaderboard, Challenge, ChallengeParticipation
 )
-from gym.analytics_service import AnalyticsService
+from gym.engagement_service import engagement_tracker
 
 @login_required
 def gamification_dashboard(request):
     """Main dashboard for gamification features"""
+    from .streaks import streak_service
+    
     member = request.user.member_profile
     
     # Get recent logs
     recent_logs = WorkoutLog.objects.filter(member=member).order_by('-logged_at')[:5]
     
     # Get personal bests
-    pbs = PersonalBest.objects.filter(member=member).order_by('-achieved_at')[:3]
+    pbs = PersonalBest.objects.filter(member=member).select_related('exercise').order_by('-achieved_date')[:3]
     
     # Get recent achievements
     achievements = Achievement.objects.filter(member=member).order_by('-earned_at')[:3]
@@ -33,7 +36,8 @@ def gamification_dashboard(request):
         'pbs': pbs,
         'achievements': achievements,
         'level': level,
-        'points': exercises_completed * 50
+        'points': exercises_completed * 50,
+        'streaks': streak_service.member_streaks(member),
     })
 
 @login_required
@@ -52,41 +56,36 @@ def log_workout(request):
         
         try:
             exercise = Exercise.objects.get(id=exercise_id)
+            duration_seconds = int(duration) * 60 if duration else None
+            
+            # The exercise's measurement decides which input is the primary value
+            value = {
+                'weight': weight,
+                'reps': reps,
+                'time': duration_seconds,
+            }.get(exercise.measurement_type) or weight or reps or duration_seconds or 0
             
-            # Create log
-            log = WorkoutLog.objects.create(
-                member=request.user.member_profile,
-                exercise=exercise,
-                sets=int(sets) if sets else None,
-                reps=int(reps) if reps else None,
-                weight=float(weight) if weight else None,
-                duration_seconds=int(duration) * 60 if duration else None,
-                notes=request.POST.get('notes', ''),
-                logged_at=timezone.now()
-            )
+            # Create log (personal bests are checked as it is saved, in the
+            # same transaction so a failed insert rolls the best back too)
+            with transaction.atomic():
+                log = WorkoutLog.objects.create(
+                    member=request.user.member_profile,
+                    exercise=exercise,
+                    value=value,
+                    sets=int(sets) if sets else None,
+                    reps=int(reps) if reps else None,
+                    duration_seconds=duration_seconds,
+                    notes=request.POST.get('notes', ''),
+                    logged_at=timezone.now()
+                )
             
             # Update Engagement Score (trigger update to keep it fresh)
-            AnalyticsService.calculate_engagement_score(request.user.member_profile)
+            engagement_tracker.record_workout(log)
             
-            # Check for Personal Best
-            if weight and exercise.measurement_type == 'weight':
-                current_pb = PersonalBest.objects.filter(
-                    member=request.user.member_profile,
-                    exercise=exercise
-                ).first()
-                
-                if not current_pb or float(weight) > current_pb.value:
-                    PersonalBest.objects.update_or_create(
-                        member=request.user.member_profile,
-                        exercise=exercise,
-                        defaults={
-                            'value': float(weight),
-                            'achieved_at': timezone.now()
-                        }
-                    )
-                    messages.success(request, f"New Personal Best! {weight}kg on {exercise.name}")
+            if log.is_personal_best:
+                messages.success(request, f"New Personal Best! {log.value} on {exercise.name}")
             
-            if request.htmx:
+            if request.headers.get('HX-Request'):
                 # Return partial for HTMX
                 recent_logs = WorkoutLog.objects.filter(
                     member=request.user.member_profile
@@ -100,7 +99,7 @@ def log_workout(request):
             return redirect('log_workout')
             
         except Exception as e:
-            if request.htmx:
+            if request.headers.get('HX-Request'):
                 return HttpResponse(f"<div class='alert alert-danger'>Error: {str(e)}</div>")
             messages.error(request, f"Error logging workout: {str(e)}")
     
@@ -116,34 +115,32 @@ def log_workout(request):
 
 @login_required
 def leaderboard(request):
-    """Global leaderboard view"""
-    # Simply count workouts for now as 'points'
-    # In a real app, this would be more complex
+    """Gym leaderboard, read from the precomputed Leaderboard rows"""
+    from .leaderboards import LeaderboardBuilder
+    
+    tenant = getattr(request, 'tenant', None) or request.user.tenant
+    period = request.GET.get('period', 'month')
+    if period not in LeaderboardBuilder.PERIODS:
+        period = 'month'
     
-    leaders = WorkoutLog.objects.values('member__user__username', 'member__user__first_name', 'member__user__last_name') \
-        .annotate(total_workouts=Count('id')) \
-        .order_by('-total_workouts')[:10]
+    leaders = []
+    if tenant:
+        LeaderboardBuilder.ensure_built(tenant.id)
+        leaders = LeaderboardBuilder.top(tenant.id, 'workouts', period)
         
     return render(request, 'gym/leaderboard.html', {
-        'leaders': leaders
+        'leaders': leaders,
+        'period': period,
     })
 
 @login_required
 def achievements_view(request):
-    """View member achievements"""
-    # Logic to check and award new achievements could go here
-    # For now, just display existing ones
-    
-    my_achievements = Achievement.objects.filter(member=request.user.member_profile)
+    """Member badges: every rule, earned or still locked"""
+    from .achievements import achievement_engine
     
-    # Define some available badges (mock data for display)
-    available_badges = [
-        {'name': 'First Step', 'description': 'Log your first workout', 'icon': '🦶'},
-        {'name': 'Consistency King', 'description': 'Work out 3 days in a row', 'icon': '👑'},
-        {'name': 'Heavy Lifter', 'description': 'Bench press 100kg', 'icon': '🏋️'},
-    ]
+    badges = achievement_engine.badges_for(request.user.member_profile)
     
     return render(request, 'gym/achievements.html', {
-        'achievements': my_achievements,
-        'available_badges': available_badges
+        'earned_badges': [badge for badge in badges if badge['earned']],
+        'locked_badges': [badge for badge in badges if not badge['earned']],
     })
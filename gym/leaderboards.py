@@ -0,0 +1,232 @@
+"""
+Leaderboard Builder
+Materialises weekly, monthly and all-time rankings per tenant into Leaderboard
+"""
+import calendar
+import threading
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, Rank
+from django.utils import timezone
+from core.models import Attendance
+from core.gamification_models import Achievement, Leaderboard, WorkoutLog
+
+# Refresh callbacks waiting for the current transaction, per thread
+_queued = threading.local()
+
+
+class LeaderboardBuilder:
+    """
+    Rankings are computed in the database and stored, so the leaderboard page
+    reads ten precomputed rows instead of grouping every WorkoutLog.
+
+    Each source table is read with one query per refresh: conditional
+    aggregates give every member's score for each metric and period, and
+    RANK() OVER (PARTITION BY tenant ORDER BY score DESC) ranks them, so ties
+    share a rank. Results are upserted on Leaderboard's unique key; members
+    left without a score in a period have their row removed.
+
+    WorkoutLog and Achievement writes queue one refresh per tenant and
+    transaction (gym.signals), however many rows it saves. With a Celery
+    broker the refresh runs on the analytics queue after DEBOUNCE_SECONDS, and
+    further writes in that window ride along; without one it runs inline on
+    commit. Attendance boards and period rollover are refreshed by the
+    periodic rebuild_leaderboards task.
+    """
+
+    PERIODS = ['week', 'month', 'all_time']
+    ALL_TIME = (date(2000, 1, 1), date(9999, 12, 31))
+    BUILT_TTL = 60 * 60
+    DEBOUNCE_SECONDS = 30
+    TOP_N = 10
+
+    # source: (model, date field, {metric: aggregate filter or Sum field})
+    SOURCES = {
+        'workouts': (WorkoutLog, 'logged_at', {'workouts': Q(), 'pbs': Q(is_personal_best=True)}),
+        'attendance': (Attendance, 'date', {'attendance': Q(status='Present')}),
+        'points': (Achievement, 'earned_at', {'points': 'points'}),
+    }
+
+    # ------------------------------------------------------------------
+    # Periods
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def period_bounds(cls, period, today=None):
+        """(period_start, period_end) dates, both inclusive"""
+        today = today or timezone.localdate()
+        if period == 'week':
+            start = today - timedelta(days=today.weekday())
+            return start, start + timedelta(days=6)
+        if period == 'month':
+            return today.replace(day=1), today.replace(day=calendar.monthrange(today.year, today.month)[1])
+        return cls.ALL_TIME
+
+    @staticmethod
+    def board_type(metric, period):
+        return f"{metric}_{period}"
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def ranked_scores(cls, source, tenant_ids=None, today=None):
+        """
+        One row per member with activity in the source: member_id, member_tenant
+        and `{metric}_{period}` score and `{metric}_{period}_rank` columns.
+        """
+        model, date_field, metrics = cls.SOURCES[source]
+        lookup = f'{date_field}__date' if model._meta.get_field(date_field).get_internal_type() == 'DateTimeField' else date_field
+
+        scores, ranks = {}, {}
+        for period in cls.PERIODS:
+            period_q = Q()
+            if period != 'all_time':
+                period_q = Q(**{f'{lookup}__range': cls.period_bounds(period, today)})
+            for metric, spec in metrics.items():
+                if isinstance(spec, Q):
+                    score = Count('id', filter=spec & period_q)
+                else:
+                    score = Coalesce(Sum(spec, filter=period_q), Value(0), output_field=IntegerField())
+                name = cls.board_type(metric, period)
+                scores[name] = score
+                ranks[f'{name}_rank'] = Window(Rank(), partition_by=[F('member_tenant')], order_by=F(name).desc())
+
+        rows = model.objects.filter(member__tenant_id__isnull=False)
+        if tenant_ids is not None:
+            rows = rows.filter(member__tenant_id__in=tenant_ids)
+        return (
+            rows.values('member_id', member_tenant=F('member__tenant_id'))
+            .annotate(**scores)
+            .annotate(**ranks)
+            .order_by()
+        )
+
+    @classmethod
+    def refresh(cls, source, tenant_ids=None, today=None):
+        """
+        Recompute and store every board fed by the source.
+
+        Returns:
+            number of Leaderboard rows written
+        """
+        today = today or timezone.localdate()
+        now = timezone.now()
+        metrics = cls.SOURCES[source][2]
+        entries = []
+        for row in cls.ranked_scores(source, tenant_ids, today):
+            for period in cls.PERIODS:
+                period_start, period_end = cls.period_bounds(period, today)
+                for metric in metrics:
+                    name = cls.board_type(metric, period)
+                    if row[name]:
+                        entries.append(Leaderboard(
+                            tenant_id=row['member_tenant'], leaderboard_type=name, member_id=row['member_id'],
+                            rank=row[f'{name}_rank'], score=row[name],
+                            period_start=period_start, period_end=period_end, calculated_at=now,
+                        ))
+
+        with transaction.atomic():
+            Leaderboard.objects.bulk_create(
+                entries,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['leaderboard_type', 'member', 'period_start', 'period_end'],
+                update_fields=['tenant', 'rank', 'score', 'calculated_at'],
+            )
+            # Rows this run did not touch belong to members who no longer score
+            for period in cls.PERIODS:
+                period_start, period_end = cls.period_bounds(period, today)
+                stale = Leaderboard.objects.filter(
+                    leaderboard_type__in=[cls.board_type(metric, period) for metric in metrics],
+                    period_start=period_start, period_end=period_end, calculated_at__lt=now,
+                )
+                if tenant_ids is not None:
+                    stale = stale.filter(tenant_id__in=tenant_ids)
+                stale.delete()
+        return len(entries)
+
+    @classmethod
+    def rebuild(cls, tenant_ids=None, today=None):
+        """Refresh every source; returns {source: rows written}"""
+        summary = {source: cls.refresh(source, tenant_ids, today) for source in cls.SOURCES}
+        cache.set_many({cls._built_key(tenant_id): True for tenant_id in tenant_ids or ['all']}, cls.BUILT_TTL)
+        return summary
+
+    @classmethod
+    def refresh_on_commit(cls, source, tenant_id):
+        """Queue a refresh of a tenant's boards once the current transaction commits"""
+        if tenant_id is None:
+            return
+        key = (source, tenant_id)
+        callbacks = _queued.__dict__.setdefault('callbacks', {})
+        queued = callbacks.get(key)
+        # Still registered means this transaction already has one; a rolled-back
+        # transaction drops its callbacks, so the entry is stale then
+        if queued is not None and any(func is queued for _, func, _ in transaction.get_connection().run_on_commit):
+            return
+
+        def callback():
+            callbacks.pop(key, None)
+            cls.schedule_refresh(source, tenant_id)
+
+        callbacks[key] = callback
+        transaction.on_commit(callback)
+
+    @staticmethod
+    def _pending_key(source, tenant_id):
+        return f'leaderboard_refresh_pending:{source}:{tenant_id}'
+
+    @classmethod
+    def schedule_refresh(cls, source, tenant_id):
+        """Refresh on a Celery worker (at most one pending task per board set), or inline without a broker"""
+        if not getattr(settings, 'CELERY_BROKER_URL', ''):
+            cls.refresh(source, [tenant_id])
+            return
+        # The key outlives the countdown so a lost task cannot block refreshes for long
+        if cache.add(cls._pending_key(source, tenant_id), True, cls.DEBOUNCE_SECONDS * 4):
+            from .tasks import refresh_tenant_leaderboards
+            refresh_tenant_leaderboards.apply_async(args=[source, tenant_id], countdown=cls.DEBOUNCE_SECONDS)
+
+    @classmethod
+    def run_scheduled_refresh(cls, source, tenant_id):
+        # Clear the marker first so writes landing during the refresh queue another
+        cache.delete(cls._pending_key(source, tenant_id))
+        return cls.refresh(source, [tenant_id])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _built_key(tenant_id):
+        return f'leaderboards_built:{tenant_id}'
+
+    @classmethod
+    def ensure_built(cls, tenant_id):
+        """Build a tenant's boards if neither they nor all boards were built recently"""
+        if not cache.get_many([cls._built_key(tenant_id), cls._built_key('all')]):
+            cls.rebuild([tenant_id])
+
+    @classmethod
+    def top(cls, tenant_id, metric='workouts', period='month', limit=None):
+        """The stored ranking, best first"""
+        period_start, period_end = cls.period_bounds(period)
+        return (
+            Leaderboard.objects.filter(
+                tenant_id=tenant_id, leaderboard_type=cls.board_type(metric, period),
+                period_start=period_start, period_end=period_end,
+            )
+            .select_related('member__user')
+            .order_by('rank', 'member_id')[:limit or cls.TOP_N]
+        )
+
+
+# Convenience functions
+def rebuild_leaderboards(tenant_ids=None):
+    """Quick function to recompute all leaderboards"""
+    return LeaderboardBuilder.rebuild(tenant_ids)
@@ -0,0 +1,299 @@
+"""
+Member Import Pipeline
+Streams a member CSV and creates users and profiles in batches
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from api.conditional import ResourceVersions
+from core.models import CustomUser, MemberProfile
+from .background_jobs import job_runner
+from .dashboard_metrics import DashboardMetrics
+from .financial_rollup import FinancialRollupService
+from .password_hashing import PasswordHasherPool
+
+
+class RowError(Exception):
+    pass
+
+
+class MemberImportPipeline:
+    """
+    Import members from a CSV file object in fixed-size chunks.
+
+    Per chunk: rows are validated, existing usernames/emails are fetched with
+    one `IN` query each, passwords are hashed in a process pool and users and
+    profiles are inserted with bulk_create inside one transaction. Rows that
+    fail end up in a per-row error report instead of aborting the import.
+
+    bulk_create skips model signals, so the dashboard metrics, the day's
+    financial rollup and the API's member and diet plan versions are
+    refreshed once at the end.
+    """
+
+    CHUNK_SIZE = 500
+    REQUIRED_FIELDS = ('username', 'email', 'password')
+    MEMBERSHIP_TYPES = {choice for choice, _ in MemberProfile.MEMBERSHIP_TYPES}
+    ERROR_REPORT_COLUMNS = ['row', 'username', 'email', 'error']
+
+    def __init__(self, tenant, job=None, chunk_size=None, hasher=None):
+        self.tenant = tenant
+        self.job = job
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.hasher = hasher
+        self.registration_date = timezone.localdate()
+        self.imported = 0
+        self.processed = 0
+        self.errors = []
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def count_rows(file_obj):
+        """Data rows in the file (cheap line count, used for progress only)"""
+        file_obj.seek(0)
+        lines = sum(1 for line in file_obj if line.strip())
+        file_obj.seek(0)
+        return max(0, lines - 1)
+
+    @staticmethod
+    def read_rows(file_obj):
+        """Yield (row_number, row dict) without loading the file into memory"""
+        text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', newline='')
+        try:
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+        finally:
+            text.detach()
+
+    def chunks(self, rows):
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    def clean_row(self, row):
+        """Normalized field values for a row, or RowError"""
+        values = {key: (value or '').strip() for key, value in row.items() if key}
+
+        if any(not values.get(field) for field in self.REQUIRED_FIELDS):
+            raise RowError('Missing username, email, or password')
+
+        membership_type = (values.get('membership_type') or 'monthly').lower()
+        if membership_type not in self.MEMBERSHIP_TYPES:
+            raise RowError(f"Invalid membership_type '{membership_type}'")
+
+        try:
+            age = int(values.get('age') or 20)
+        except ValueError:
+            raise RowError(f"Invalid age '{values.get('age')}'")
+        if age <= 0:
+            raise RowError('Age must be a positive integer')
+
+        amounts = {}
+        for field in ('registration_amount', 'monthly_amount'):
+            try:
+                amounts[field] = Decimal(values.get(field) or 0)
+            except InvalidOperation:
+                raise RowError(f"Invalid {field} '{values.get(field)}'")
+
+        return {
+            'username': CustomUser.normalize_username(values['username']),
+            'email': CustomUser.objects.normalize_email(values['email']),
+            'password': values['password'],
+            'first_name': values.get('first_name', ''),
+            'last_name': values.get('last_name', ''),
+            'membership_type': membership_type,
+            'age': age,
+            'phone_number': values.get('phone_number', ''),
+            'allotted_slot': values.get('allotted_slot') or 'General',
+            'address': values.get('address', ''),
+            **amounts,
+        }
+
+    def existing_identities(self, cleaned):
+        """Usernames and emails from this chunk that already exist"""
+        usernames = set(CustomUser.objects.filter(
+            username__in=[values['username'] for values in cleaned]
+        ).values_list('username', flat=True))
+        emails = set(CustomUser.objects.filter(
+            email__in=[values['email'] for values in cleaned]
+        ).values_list('email', flat=True))
+        return usernames, {email.lower() for email in emails}
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    def run(self, file_obj):
+        """Import every row; returns the summary dict"""
+        if self.job is not None:
+            self.job.set_progress(0, self.count_rows(file_obj))
+
+        hasher = self.hasher or PasswordHasherPool()
+        with hasher:
+            for chunk in self.chunks(self.read_rows(file_obj)):
+                self.import_chunk(chunk, hasher)
+                self.processed += len(chunk)
+                if self.job is not None:
+                    self.job.set_progress(self.processed)
+
+        if self.imported:
+            tenant_id = self.tenant.id if self.tenant else None
+            DashboardMetrics.invalidate(tenant_id)
+            ResourceVersions.bump('members', tenant_id)
+            ResourceVersions.bump('diet_plans', tenant_id)
+            FinancialRollupService.rebuild_day(tenant_id, self.registration_date)
+
+        return self.summary()
+
+    def import_chunk(self, chunk, hasher):
+        cleaned = []
+        for row_num, row in chunk:
+            try:
+                values = self.clean_row(row)
+            except RowError as e:
+                self.add_error(row_num, row, str(e))
+                continue
+            cleaned.append((row_num, row, values))
+
+        existing_usernames, existing_emails = self.existing_identities([values for _, _, values in cleaned])
+
+        pending = []
+        for row_num, row, values in cleaned:
+            username, email = values['username'], values['email'].lower()
+            if username in existing_usernames:
+                self.add_error(row_num, row, f"Username '{username}' already exists")
+            elif email in existing_emails:
+                self.add_error(row_num, row, f"Email '{values['email']}' already exists")
+            elif username in self._seen_usernames:
+                self.add_error(row_num, row, f"Duplicate username '{username}' in file")
+            elif email in self._seen_emails:
+                self.add_error(row_num, row, f"Duplicate email '{values['email']}' in file")
+            else:
+                self._seen_usernames.add(username)
+                self._seen_emails.add(email)
+                pending.append((row_num, row, values))
+
+        if not pending:
+            return
+
+        hashes = hasher.hash_many([values['password'] for _, _, values in pending])
+        members = [
+            (row_num, row, self.build_user(values, password_hash), values)
+            for (row_num, row, values), password_hash in zip(pending, hashes)
+        ]
+
+        try:
+            with transaction.atomic():
+                users = CustomUser.objects.bulk_create([user for _, _, user, _ in members])
+                MemberProfile.objects.bulk_create([
+                    self.build_profile(user, values)
+                    for user, (_, _, _, values) in zip(users, members)
+                ])
+            self.imported += len(members)
+        except IntegrityError:
+            # A concurrent writer took one of the usernames; retry row by row
+            self.import_rows_individually(members)
+
+    def import_rows_individually(self, members):
+        for row_num, row, user, values in members:
+            try:
+                with transaction.atomic():
+                    user.pk = None
+                    user.save()
+                    self.build_profile(user, values).save()
+                self.imported += 1
+            except IntegrityError as e:
+                self.add_error(row_num, row, f"Could not save: {e}")
+
+    def build_user(self, values, password_hash):
+        return CustomUser(
+            username=values['username'],
+            email=values['email'],
+            password=password_hash,
+            first_name=values['first_name'],
+            last_name=values['last_name'],
+            role='member',
+            tenant=self.tenant,
+        )
+
+    def build_profile(self, user, values):
+        return MemberProfile(
+            user=user,
+            tenant=self.tenant,
+            membership_type=values['membership_type'],
+            age=values['age'],
+            phone_number=values['phone_number'],
+            registration_amount=values['registration_amount'],
+            monthly_amount=values['monthly_amount'],
+            allotted_slot=values['allotted_slot'],
+            address=values['address'],
+            registration_date=self.registration_date,
+        )
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def add_error(self, row_num, row, message):
+        self.errors.append({
+            'row': row_num,
+            'username': (row.get('username') or '').strip(),
+            'email': (row.get('email') or '').strip(),
+            'error': message,
+        })
+
+    def error_report(self):
+        """Per-row errors as CSV text ('' when every row imported)"""
+        if not self.errors:
+            return ''
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=self.ERROR_REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(sorted(self.errors, key=lambda error: error['row']))
+        return output.getvalue()
+
+    def summary(self):
+        return {
+            'total': self.processed,
+            'imported': self.imported,
+            'failed': len(self.errors),
+        }
+
+
+@job_runner.register('member_import')
+def run_member_import_job(job):
+    """BackgroundJob handler for uploaded member CSVs"""
+    pipeline = MemberImportPipeline(job.tenant, job=job)
+    try:
+        with job.input_file.open('rb') as file_obj:
+            summary = pipeline.run(file_obj)
+    finally:
+        # The upload contains plaintext passwords; never keep it around
+        job.input_file.delete(save=True)
+    return {'result': summary, 'error_report': pipeline.error_report()}
+
+
+# Convenience functions
+def import_members(tenant, file_obj):
+    """Quick function to import a member CSV synchronously"""
+    pipeline = MemberImportPipeline(tenant)
+    summary = pipeline.run(file_obj)
+    summary['errors'] = pipeline.errors
+    return summary
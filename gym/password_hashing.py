@@ -0,0 +1,63 @@
+"""
+Password Hashing Pool
+Hashes batches of passwords across worker processes.
+
+Kept free of model imports: spawned workers only need settings to call
+make_password, so they start without loading the app registry.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+class PasswordHasherPool:
+    """
+    Context manager hashing password lists in a process pool.
+
+    The configured hasher (PBKDF2 by default) is CPU-bound by design, so a
+    single process hashes a few passwords per second. Small batches are
+    hashed in-process, where pool start-up would cost more than it saves.
+    Workers use the spawn start method, which is safe to use from the
+    threads background jobs run on.
+    """
+
+    MIN_POOL_BATCH = 32
+
+    def __init__(self, workers=None):
+        self.workers = workers or getattr(settings, 'PASSWORD_HASH_WORKERS', 0) or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'gym_management.settings'),),
+            )
+        return self._executor
+
+    def hash_many(self, passwords):
+        """Hashes in the same order as the input"""
+        if self.workers <= 1 or len(passwords) < self.MIN_POOL_BATCH:
+            return [hash_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_executor().map(hash_password, passwords, chunksize=chunksize))
@@ -0,0 +1,257 @@
+"""
+Payment Reminder Engine
+Selects, claims and sends automatic WhatsApp payment reminders, plus the
+background jobs behind the manual WhatsApp and SMS reminder buttons
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from django.db.models import Case, CharField, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+from core.models import BrandingConfig, MemberProfile, PaymentReminderLedger, WhatsAppMessage
+from .background_jobs import job_runner
+from .sms_service import sms_service
+from .whatsapp_dispatcher import broadcast_dispatcher
+from .whatsapp_service import whatsapp_service
+
+
+class PaymentReminderEngine:
+    """
+    Daily reminder run for every tenant with auto reminders enabled.
+
+    All upcoming, due-today and overdue members across the selected tenants
+    come from one annotated query. A PaymentReminderLedger row (unique per
+    member per day) is claimed before each send, so overlapping runs and
+    re-runs on the same day never message a member twice. Sends go out per
+    tenant through the broadcast dispatcher's thread pool in batches.
+    """
+
+    OVERDUE_WINDOW_DAYS = 7
+    BATCH_SIZE = 200
+
+    def __init__(self, today=None, dispatcher=None, batch_size=None):
+        self.today = today or timezone.localdate()
+        self.dispatcher = dispatcher or broadcast_dispatcher
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.claim_token = uuid.uuid4().hex
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def tenant_configs(tenant_ids=None, shard=None):
+        """
+        {tenant_id: days_before} for tenants with auto reminders enabled.
+
+        Args:
+            tenant_ids: restrict to these tenants
+            shard: (index, count) to take only tenants with id % count == index
+        """
+        configs = BrandingConfig.objects.filter(enable_auto_whatsapp_reminders=True, tenant__is_active=True)
+        if tenant_ids:
+            configs = configs.filter(tenant_id__in=tenant_ids)
+        days_before = dict(configs.values_list('tenant_id', 'whatsapp_reminder_days_before'))
+        if shard:
+            index, count = shard
+            days_before = {tenant_id: days for tenant_id, days in days_before.items() if tenant_id % count == index}
+        return days_before
+
+    def due_members(self, tenant_days_before):
+        """Members needing a reminder today, annotated with `reminder_kind`"""
+        today = self.today
+        upcoming = Q()
+        for days in set(tenant_days_before.values()):
+            upcoming |= Q(
+                tenant_id__in=[tenant_id for tenant_id, d in tenant_days_before.items() if d == days],
+                next_payment_date=today + timedelta(days=days),
+            )
+
+        already_reminded = PaymentReminderLedger.objects.filter(member=OuterRef('pk'), reminder_date=today)
+        return (
+            MemberProfile.objects.filter(tenant_id__in=list(tenant_days_before))
+            .filter(upcoming | Q(
+                next_payment_date__gte=today - timedelta(days=self.OVERDUE_WINDOW_DAYS),
+                next_payment_date__lte=today,
+            ))
+            .exclude(phone_number__isnull=True)
+            .exclude(phone_number='')
+            .exclude(Exists(already_reminded))
+            .annotate(reminder_kind=Case(
+                When(next_payment_date=today, then=Value('due_today')),
+                When(next_payment_date__lt=today, then=Value('overdue')),
+                default=Value('upcoming'),
+                output_field=CharField(),
+            ))
+            .select_related('user', 'tenant')
+            .order_by('tenant_id', 'id')
+        )
+
+    def message_for(self, member, days_before):
+        gym_name = member.tenant.name
+        amount = member.monthly_amount
+        due_date_str = member.next_payment_date.strftime('%B %d, %Y')
+        first_name = member.user.first_name or member.user.username
+
+        if member.reminder_kind == 'upcoming':
+            return f"Hello {first_name}, this is an automatic reminder from {gym_name}. Your gym subscription payment of {amount} is due in {days_before} days ({due_date_str}). Looking forward to seeing you at the gym!"
+        if member.reminder_kind == 'due_today':
+            return f"Hello {first_name}, this is an automatic reminder from {gym_name}. Just a final nudge that your gym payment of {amount} is due today. Have a great workout!"
+        days_overdue = (self.today - member.next_payment_date).days
+        return f"Hello {first_name}, this is an automatic reminder from {gym_name}. Your gym payment of {amount} is {days_overdue} days overdue. Please clear it today to continue your membership. Thank you!"
+
+    # ------------------------------------------------------------------
+    # Claiming and sending
+    # ------------------------------------------------------------------
+
+    def claim(self, members):
+        """
+        Insert ledger rows for the members; returns {member_id: ledger} for the
+        rows this run inserted (members claimed by another run are left out).
+        """
+        PaymentReminderLedger.objects.bulk_create(
+            [
+                PaymentReminderLedger(
+                    tenant_id=member.tenant_id,
+                    member=member,
+                    reminder_date=self.today,
+                    kind=member.reminder_kind,
+                    claim_token=self.claim_token,
+                )
+                for member in members
+            ],
+            ignore_conflicts=True,
+        )
+        return {
+            ledger.member_id: ledger
+            for ledger in PaymentReminderLedger.objects.filter(
+                claim_token=self.claim_token, member__in=[member.id for member in members]
+            )
+        }
+
+    def send_batch(self, tenant, members, days_before):
+        """Claim, send and record one batch of a tenant's reminders"""
+        claimed = self.claim(members)
+        members = [member for member in members if member.id in claimed]
+        if not members:
+            return 0, 0
+
+        bodies = {member.id: self.message_for(member, days_before) for member in members}
+        results = dict(self.dispatcher.send_many(
+            tenant, [(member.id, member.phone_number, bodies[member.id]) for member in members]
+        ))
+
+        logs = WhatsAppMessage.objects.bulk_create([
+            WhatsAppMessage(
+                tenant=tenant,
+                sent_by=None,
+                recipients=[member.id],
+                message_content=bodies[member.id],
+                status='sent' if results[member.id]['success'] else 'failed',
+                error_message=results[member.id]['error'] or '',
+                recipient_count=1,
+                time_slot='auto_payment_reminder',
+            )
+            for member in members
+        ])
+
+        ledgers = []
+        for member, log in zip(members, logs):
+            ledger = claimed[member.id]
+            ledger.status = log.status
+            ledger.whatsapp_message = log
+            ledgers.append(ledger)
+        PaymentReminderLedger.objects.bulk_update(ledgers, fields=['status', 'whatsapp_message'])
+
+        sent = sum(1 for member in members if results[member.id]['success'])
+        return sent, len(members) - sent
+
+    def run(self, tenant_ids=None, shard=None, log=None):
+        """
+        Send today's reminders.
+
+        Returns:
+            dict with tenants, sent, failed, skipped (tenants without Twilio)
+        """
+        tenant_days_before = self.tenant_configs(tenant_ids, shard)
+        summary = {'tenants': len(tenant_days_before), 'sent': 0, 'failed': 0, 'skipped': 0}
+        if not tenant_days_before:
+            return summary
+
+        by_tenant = defaultdict(list)
+        for member in self.due_members(tenant_days_before):
+            by_tenant[member.tenant_id].append(member)
+
+        for tenant_id, members in by_tenant.items():
+            tenant = members[0].tenant
+            if not whatsapp_service.is_configured(tenant=tenant):
+                summary['skipped'] += 1
+                continue
+            for start in range(0, len(members), self.batch_size):
+                sent, failed = self.send_batch(
+                    tenant, members[start:start + self.batch_size], tenant_days_before[tenant_id]
+                )
+                summary['sent'] += sent
+                summary['failed'] += failed
+            if log:
+                log(f"{tenant.name}: {len(members)} reminder(s) processed")
+        return summary
+
+
+# Manual reminders
+SMS_DUE_WINDOW_DAYS = 10
+SMS_REMINDER_TEMPLATE = "Hello {name}, your gym membership is due on {due_date}. Please pay soon to avoid interruption."
+
+
+def sms_due_members(tenant, today=None):
+    """Members whose payment falls due within SMS_DUE_WINDOW_DAYS"""
+    today = today or timezone.localdate()
+    members = MemberProfile.objects.filter(
+        next_payment_date__range=[today, today + timedelta(days=SMS_DUE_WINDOW_DAYS)]
+    ).select_related('user')
+    if tenant:
+        members = members.filter(tenant=tenant)
+    return members
+
+
+def manual_reminder_message(member):
+    gym_name = member.tenant.name if member.tenant else "Your Gym"
+    due_date = member.next_payment_date.strftime('%B %d, %Y') if member.next_payment_date else "N/A"
+    first_name = member.user.first_name or member.user.username
+    return f"Hello {first_name}, this is a friendly reminder from {gym_name}. Your gym subscription payment of {member.monthly_amount} is due on {due_date}. Please clear it as soon as possible to continue your workouts. Thank you!"
+
+
+@job_runner.register('whatsapp_reminder', queue='messaging')
+def run_whatsapp_reminder_job(job):
+    """BackgroundJob handler sending one member's WhatsApp payment reminder"""
+    member = MemberProfile.objects.select_related('user', 'tenant').get(pk=job.params['member_id'])
+    message_content = manual_reminder_message(member)
+    result = whatsapp_service.send_message(member.phone_number, message_content, tenant=member.tenant)
+
+    whatsapp_log = WhatsAppMessage.objects.create(
+        tenant=member.tenant,
+        sent_by=job.created_by,
+        recipients=[member.id],
+        message_content=message_content,
+        status='sent' if result['success'] else 'failed',
+        error_message=result.get('error', '') if not result['success'] else '',
+        recipient_count=1,
+        time_slot='payment_reminder'
+    )
+    if not result['success']:
+        # Failing the job lets the same reminder be queued again
+        raise RuntimeError(result.get('error') or 'WhatsApp send failed')
+    return {'result': {'whatsapp_message_id': whatsapp_log.id, 'message_sid': result['message_sid']}}
+
+
+@job_runner.register('sms_reminders', queue='messaging')
+def run_sms_reminders_job(job):
+    """BackgroundJob handler texting every member with a payment due soon"""
+    members = sms_due_members(job.tenant, today=date.fromisoformat(job.params['date']))
+    return {'result': sms_service.send_bulk_sms(members, SMS_REMINDER_TEMPLATE, tenant=job.tenant)}
+
+
+# Convenience functions
+def send_payment_reminders(tenant_ids=None, shard=None):
+    """Quick function to run today's automatic payment reminders"""
+    return PaymentReminderEngine().run(tenant_ids=tenant_ids, shard=shard)
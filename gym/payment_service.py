@@ -12,6 +12,7 @@ from core.payment_models import (
     PaymentMethod
 )
 from core.models import MemberProfile, Subscription
+from .engagement_service import engagement_tracker
 
 
 class StripePaymentService:
@@ -225,6 +226,8 @@ class PaymentManager:
             payment.subscription.status = 'active'
             payment.subscription.save()
         
+        engagement_tracker.record_payment(payment)
+        
         return payment
     
     @staticmethod
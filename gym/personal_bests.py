@@ -0,0 +1,153 @@
+"""
+Personal Best Engine
+Race-free personal best updates for new workout logs, and a batch recompute
+of PersonalBest rows from WorkoutLog history
+"""
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Window
+from django.db.models.expressions import RowRange
+from django.utils import timezone
+from core.gamification_models import PersonalBest, WorkoutLog
+from .leaderboards import LeaderboardBuilder
+
+
+class PersonalBestEngine:
+    """
+    The only place personal bests are decided.
+
+    record() runs for every new WorkoutLog (gym.signals, pre_save) and moves
+    the PersonalBest row with a single conditional UPDATE ... WHERE
+    best_value < new. The comparison happens inside the database, so two logs
+    saved at once can never both "win" with the lower value. A plain
+    conditional UPDATE was chosen over an INSERT ... ON CONFLICT with
+    GREATEST() so the same code runs on SQLite and Postgres.
+
+    recompute() rebuilds a tenant's PersonalBest rows and is_personal_best
+    flags from the whole log history. Use it after bulk imports or backfills,
+    which skip save() and its signals.
+    """
+
+    BATCH_SIZE = 500
+
+    # ------------------------------------------------------------------
+    # Single log
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _improve(member_id, exercise_id, value, achieved_date):
+        return PersonalBest.objects.filter(
+            member_id=member_id, exercise_id=exercise_id, best_value__lt=value
+        ).update(
+            previous_best=F('best_value'),
+            best_value=value,
+            achieved_date=achieved_date,
+            times_improved=F('times_improved') + 1,
+            updated_at=timezone.now(),
+        )
+
+    def record(self, log):
+        """
+        Apply a new log to its PersonalBest row.
+
+        Returns:
+            True if the log set a personal best
+        """
+        if log.value is None:
+            return False
+        value = Decimal(str(log.value))
+        achieved_date = timezone.localdate(log.logged_at) if timezone.is_aware(log.logged_at) else log.logged_at.date()
+
+        if self._improve(log.member_id, log.exercise_id, value, achieved_date):
+            return True
+        try:
+            with transaction.atomic():
+                PersonalBest.objects.create(
+                    member_id=log.member_id, exercise_id=log.exercise_id,
+                    best_value=value, achieved_date=achieved_date,
+                )
+            return True
+        except IntegrityError:
+            # A row exists: either it is at least as good, or another log
+            # created it a moment ago with a lower value
+            return bool(self._improve(log.member_id, log.exercise_id, value, achieved_date))
+
+    # ------------------------------------------------------------------
+    # Batch recompute
+    # ------------------------------------------------------------------
+
+    def recompute(self, tenant_id=None):
+        """
+        Rebuild PersonalBest rows and is_personal_best flags from WorkoutLog.
+
+        A log is a personal best when its value beats every earlier log of the
+        same member and exercise; one windowed query gives each log that
+        running maximum.
+
+        Returns:
+            dict with personal_bests (rows written) and pb_logs (flagged logs)
+        """
+        logs = WorkoutLog.objects.all()
+        if tenant_id is not None:
+            logs = logs.filter(member__tenant_id=tenant_id)
+        logs = logs.annotate(previous_max=Window(
+            Max('value'),
+            partition_by=[F('member_id'), F('exercise_id')],
+            order_by=[F('logged_at').asc(), F('id').asc()],
+            frame=RowRange(start=None, end=-1),
+        )).values_list('id', 'member_id', 'exercise_id', 'value', 'logged_at', 'previous_max').order_by()
+
+        bests = {}
+        pb_log_ids = []
+        for log_id, member_id, exercise_id, value, logged_at, previous_max in logs.iterator(chunk_size=2000):
+            if previous_max is not None and value <= previous_max:
+                continue
+            pb_log_ids.append(log_id)
+            key = (member_id, exercise_id)
+            best = bests.get(key)
+            achieved_date = timezone.localdate(logged_at) if timezone.is_aware(logged_at) else logged_at.date()
+            if best is None:
+                bests[key] = PersonalBest(
+                    member_id=member_id, exercise_id=exercise_id, best_value=value,
+                    achieved_date=achieved_date, times_improved=0,
+                )
+            elif value > best.best_value:
+                # Rows for one key arrive in logged_at order, so this is the next improvement
+                best.previous_best = best.best_value
+                best.best_value = value
+                best.achieved_date = achieved_date
+                best.times_improved += 1
+
+        now = timezone.now()
+        for best in bests.values():
+            best.updated_at = now
+        scope = WorkoutLog.objects.all() if tenant_id is None else WorkoutLog.objects.filter(member__tenant_id=tenant_id)
+        stale = PersonalBest.objects.filter(updated_at__lt=now)
+        if tenant_id is not None:
+            stale = stale.filter(member__tenant_id=tenant_id)
+        with transaction.atomic():
+            PersonalBest.objects.bulk_create(
+                list(bests.values()),
+                batch_size=self.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['member', 'exercise'],
+                update_fields=['best_value', 'previous_best', 'achieved_date', 'times_improved', 'updated_at'],
+            )
+            scope.filter(is_personal_best=True).update(is_personal_best=False)
+            for start in range(0, len(pb_log_ids), self.BATCH_SIZE):
+                WorkoutLog.objects.filter(pk__in=pb_log_ids[start:start + self.BATCH_SIZE]).update(is_personal_best=True)
+            # Pairs whose logs are all gone
+            stale.delete()
+        # Queryset updates skip the signals that keep the boards current
+        LeaderboardBuilder.refresh('workouts', None if tenant_id is None else [tenant_id])
+        return {'personal_bests': len(bests), 'pb_logs': len(pb_log_ids)}
+
+
+# Singleton instance
+personal_best_engine = PersonalBestEngine()
+
+
+# Convenience functions
+def recompute_personal_bests(tenant_id=None):
+    """Quick function to rebuild personal bests from workout history"""
+    return personal_best_engine.recompute(tenant_id)
@@ -0,0 +1,120 @@
+"""
+Phone Import Pipeline
+Validates a username/phone_number CSV and applies it with chunked bulk updates
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from core.models import MemberProfile
+from .member_import import MemberImportPipeline
+
+
+class PhoneImportPipeline:
+    """
+    Bulk phone-number import for one tenant.
+
+    plan() normalizes every number with MemberProfile.validate_phone before
+    touching the database, then resolves usernames to profiles with one
+    `IN` query per chunk. The resulting diff can be shown as a dry-run
+    preview or written with apply(), which issues one bulk_update per chunk.
+    """
+
+    CHUNK_SIZE = 1000
+    PREVIEW_ROWS = 200
+
+    def __init__(self, tenant, chunk_size=None):
+        self.tenant = tenant
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.changes = []
+        self.unchanged = 0
+        self.errors = []
+
+    def members(self):
+        if self.tenant:
+            return MemberProfile.objects.filter(tenant=self.tenant)
+        return MemberProfile.objects.filter(tenant__isnull=True)
+
+    def parse(self, file_obj):
+        """Validated (row, username, phone) entries; bad rows go to errors"""
+        entries = []
+        seen = set()
+        for row_num, row in MemberImportPipeline.read_rows(file_obj):
+            username = (row.get('username') or '').strip()
+            phone_number = (row.get('phone_number') or '').strip()
+            if not username or not phone_number:
+                self.errors.append((row_num, "Missing username or phone number"))
+                continue
+            if username in seen:
+                self.errors.append((row_num, f"Duplicate username '{username}' in file"))
+                continue
+            try:
+                phone_clean = MemberProfile.validate_phone(phone_number)
+            except ValidationError as e:
+                self.errors.append((row_num, f"Invalid phone format for '{username}' - {e.messages[0]}"))
+                continue
+            seen.add(username)
+            entries.append((row_num, username, phone_clean))
+        return entries
+
+    def plan(self, file_obj):
+        """Build the diff of phone numbers that would change"""
+        entries = self.parse(file_obj)
+        for start in range(0, len(entries), self.chunk_size):
+            chunk = entries[start:start + self.chunk_size]
+            profiles = {
+                username: (profile_id, current)
+                for username, profile_id, current in self.members().filter(
+                    user__username__in=[username for _, username, _ in chunk]
+                ).values_list('user__username', 'id', 'phone_number')
+            }
+            for row_num, username, phone_number in chunk:
+                if username not in profiles:
+                    self.errors.append((row_num, f"Member '{username}' not found"))
+                    continue
+                profile_id, current = profiles[username]
+                if current == phone_number:
+                    self.unchanged += 1
+                    continue
+                self.changes.append({
+                    'row': row_num,
+                    'profile_id': profile_id,
+                    'username': username,
+                    'old': current or '',
+                    'new': phone_number,
+                })
+        self.errors.sort()
+        return self.changes
+
+    def apply(self):
+        """Write the planned changes; returns the number of profiles updated"""
+        profiles = [MemberProfile(id=change['profile_id'], phone_number=change['new']) for change in self.changes]
+        with transaction.atomic():
+            MemberProfile.objects.bulk_update(profiles, fields=['phone_number'], batch_size=self.chunk_size)
+        return len(profiles)
+
+    def error_messages(self):
+        return [f"Row {row_num}: {message}" for row_num, message in self.errors]
+
+    def summary(self):
+        return {
+            'changed': len(self.changes),
+            'unchanged': self.unchanged,
+            'failed': len(self.errors),
+        }
+
+    def preview(self):
+        """Summary plus the first PREVIEW_ROWS changes for the dry-run page"""
+        return {
+            'summary': self.summary(),
+            'changes': self.changes[:self.PREVIEW_ROWS],
+            'truncated': len(self.changes) > self.PREVIEW_ROWS,
+        }
+
+
+# Convenience functions
+def import_phone_numbers(tenant, file_obj, dry_run=False):
+    """Quick function to preview or apply a phone-number CSV"""
+    pipeline = PhoneImportPipeline(tenant)
+    pipeline.plan(file_obj)
+    if not dry_run:
+        pipeline.apply()
+    return pipeline
@@ -0,0 +1,60 @@
+"""
+Report Export
+Renders the financial report PDF in a background job
+"""
+import io
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.utils import timezone
+from xhtml2pdf import pisa
+from .background_jobs import job_runner, start_job
+from .financial_rollup import FinancialRollupService
+
+
+class ReportExporter:
+    """Builds the PDF version of the reports page from the financial rollup"""
+
+    REVENUE_MONTHS_DAYS = 180
+
+    @staticmethod
+    def context(tenant):
+        """Same rollup reads as reports_view"""
+        now = timezone.now()
+        totals = FinancialRollupService.totals(tenant)
+        return {
+            'monthly_revenue': FinancialRollupService.monthly_revenue(
+                tenant, since=now.date() - timedelta(days=ReportExporter.REVENUE_MONTHS_DAYS)
+            ),
+            'expense_breakdown': FinancialRollupService.expense_breakdown(tenant),
+            'total_revenue': totals['revenue'],
+            'total_expenses': totals['expenses'],
+            'profit': totals['revenue'] - totals['expenses'],
+            'generate_date': now,
+            'tenant': tenant,
+        }
+
+    @staticmethod
+    def render_pdf(tenant):
+        """PDF bytes for the tenant's report; raises ValueError if rendering fails"""
+        html = render_to_string('gym/report_pdf.html', ReportExporter.context(tenant))
+        output = io.BytesIO()
+        pisa_status = pisa.CreatePDF(html, dest=output)
+        if pisa_status.err:
+            raise ValueError(f"PDF rendering failed with {pisa_status.err} error(s)")
+        return output.getvalue()
+
+
+@job_runner.register('report_pdf', queue='reports')
+def run_report_pdf_job(job):
+    """BackgroundJob handler saving the report PDF as the job's output file"""
+    filename = f"gym_report_{timezone.now().strftime('%Y%m%d')}.pdf"
+    job.output_file.save(filename, ContentFile(ReportExporter.render_pdf(job.tenant)), save=False)
+    job.save(update_fields=['output_file'])
+    return {'result': {'filename': filename}}
+
+
+# Convenience functions
+def export_report_pdf(tenant, user=None):
+    """Quick function to queue a PDF export of the tenant's report"""
+    return start_job('report_pdf', tenant=tenant, user=user)
@@ -0,0 +1,204 @@
+"""
+Model signal handlers for the gym app
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from core.models import CustomUser, MemberProfile, Payment, Expense, Attendance, BrandingConfig
+from core.gamification_models import Achievement, WorkoutLog
+from .achievements import achievement_engine
+from .dashboard_metrics import DashboardMetrics
+from .financial_rollup import FinancialRollupService
+from .leaderboards import LeaderboardBuilder
+from .personal_bests import personal_best_engine
+from .twilio_clients import twilio_clients
+
+
+# ==================== Dashboard metrics ====================
+
+# Fields each dashboard metric depends on
+DASHBOARD_STATE = {
+    Payment: lambda i: (i.member_id, DashboardMetrics.to_minor_units(i.amount)),
+    Expense: lambda i: (i.tenant_id, DashboardMetrics.to_minor_units(i.amount)),
+    MemberProfile: lambda i: (i.tenant_id,),
+    CustomUser: lambda i: (i.tenant_id, i.role),
+}
+DASHBOARD_FIELDS = {
+    Payment: {'member_id', 'amount'},
+    Expense: {'tenant_id', 'amount'},
+    MemberProfile: {'tenant_id'},
+    CustomUser: {'tenant_id', 'role'},
+}
+
+
+def _member_tenant_id(payment, member_id):
+    if member_id == payment.member_id and Payment.member.is_cached(payment):
+        return payment.member.tenant_id
+    return MemberProfile.objects.filter(pk=member_id).values_list('tenant_id', flat=True).first()
+
+
+def _contributions(instance, state):
+    """(tenant_id, metric, amount) this instance adds to the dashboard totals"""
+    sender = type(instance)
+    if sender is Payment:
+        member_id, cents = state
+        return [(_member_tenant_id(instance, member_id), 'income', cents)]
+    if sender is Expense:
+        tenant_id, cents = state
+        return [(tenant_id, 'expense', cents)]
+    if sender is MemberProfile:
+        return [(state[0], 'members', 1)]
+    tenant_id, role = state
+    if role == 'trainer':
+        return [(tenant_id, 'trainers', 1)]
+    if role == 'staff':
+        return [(tenant_id, 'staff', 1)]
+    return []
+
+
+def _apply(contributions, sign):
+    for tenant_id, metric, amount in contributions:
+        DashboardMetrics.apply_delta(tenant_id, metric, sign * amount)
+
+
+def update_dashboard_on_save(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_stored', {}).get('dashboard')
+    new = DASHBOARD_STATE[sender](instance)
+    if old == new:
+        return
+    if old is not None:
+        _apply(_contributions(instance, old), -1)
+    _apply(_contributions(instance, new), 1)
+
+
+def update_dashboard_on_delete(sender, instance, **kwargs):
+    _apply(_contributions(instance, DASHBOARD_STATE[sender](_deleted_copy(sender, instance))), -1)
+
+
+for model in DASHBOARD_STATE:
+    post_save.connect(update_dashboard_on_save, sender=model, dispatch_uid=f'dashboard_save_{model.__name__}')
+    pre_delete.connect(update_dashboard_on_delete, sender=model, dispatch_uid=f'dashboard_delete_{model.__name__}')
+
+
+# ==================== Daily financial rollup ====================
+
+ROLLUP_FIELDS = {
+    Payment: {'tenant_id', 'date', 'payment_type', 'amount'},
+    Expense: {'tenant_id', 'date', 'category', 'amount'},
+    Attendance: {'tenant_id', 'date'},
+    MemberProfile: {'tenant_id', 'registration_date'},
+}
+
+
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_stored', {}).get('rollup')
+    new = FinancialRollupService.contribution(instance)
+    if old == new:
+        return
+    FinancialRollupService.apply(old, -1)
+    FinancialRollupService.apply(new, 1)
+
+
+def update_rollup_on_delete(sender, instance, **kwargs):
+    FinancialRollupService.apply(FinancialRollupService.contribution(_deleted_copy(sender, instance)), -1)
+
+
+for model in ROLLUP_FIELDS:
+    post_save.connect(update_rollup_on_save, sender=model, dispatch_uid=f'rollup_save_{model.__name__}')
+    pre_delete.connect(update_rollup_on_delete, sender=model, dispatch_uid=f'rollup_delete_{model.__name__}')
+
+
+# ==================== Stored state ====================
+
+# Fields the dashboard and rollup deltas read, per model
+STORED_FIELDS = {
+    model: DASHBOARD_FIELDS.get(model, set()) | ROLLUP_FIELDS.get(model, set())
+    for model in {**DASHBOARD_FIELDS, **ROLLUP_FIELDS}
+}
+
+
+def _stored_copy(sender, instance):
+    """
+    An unsaved copy of the row as the database has it, with only the tracked
+    fields loaded, or None for a row that is not there yet
+    """
+    if instance.pk is None or instance._state.adding:
+        return None
+    row = sender._base_manager.filter(pk=instance.pk).values(*STORED_FIELDS[sender]).first()
+    return None if row is None else sender(**row)
+
+
+def _deleted_copy(sender, instance):
+    """The instance itself, or its stored row when a tracked field was deferred"""
+    if instance.get_deferred_fields() & STORED_FIELDS[sender]:
+        return _stored_copy(sender, instance) or instance
+    return instance
+
+
+def remember_stored_state(sender, instance, **kwargs):
+    """
+    Before an update, read the previous dashboard and rollup state in one
+    lookup so post_save can apply the difference. This runs on writes only;
+    loading rows costs nothing extra.
+    """
+    stored = _stored_copy(sender, instance)
+    instance._stored = {} if stored is None else {
+        'dashboard': DASHBOARD_STATE[sender](stored) if sender in DASHBOARD_STATE else None,
+        'rollup': FinancialRollupService.contribution(stored),
+    }
+
+
+for model in STORED_FIELDS:
+    pre_save.connect(remember_stored_state, sender=model, dispatch_uid=f'stored_state_{model.__name__}')
+
+
+# ==================== Personal bests ====================
+
+def record_personal_best(sender, instance, raw=False, **kwargs):
+    # New logs only; the flag is set before the row is written. The PersonalBest
+    # write is not undone if the insert then fails, so create logs in a transaction
+    if instance._state.adding and not raw:
+        instance.is_personal_best = personal_best_engine.record(instance)
+
+
+pre_save.connect(record_personal_best, sender=WorkoutLog, dispatch_uid='personal_best_record')
+
+
+# ==================== Leaderboards ====================
+
+LEADERBOARD_SOURCES = {WorkoutLog: 'workouts', Achievement: 'points'}
+
+
+def refresh_leaderboards(sender, instance, **kwargs):
+    if type(instance).member.is_cached(instance):
+        tenant_id = instance.member.tenant_id
+    else:
+        tenant_id = MemberProfile.objects.filter(pk=instance.member_id).values_list('tenant_id', flat=True).first()
+    LeaderboardBuilder.refresh_on_commit(LEADERBOARD_SOURCES[sender], tenant_id)
+
+
+for model in LEADERBOARD_SOURCES:
+    post_save.connect(refresh_leaderboards, sender=model, dispatch_uid=f'leaderboard_save_{model.__name__}')
+    post_delete.connect(refresh_leaderboards, sender=model, dispatch_uid=f'leaderboard_delete_{model.__name__}')
+
+
+# ==================== Achievements ====================
+
+ACHIEVEMENT_EVENTS = {WorkoutLog: 'workout', Attendance: 'attendance'}
+
+
+def check_achievements(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        achievement_engine.record_event_on_commit(ACHIEVEMENT_EVENTS[sender], instance.member_id)
+
+
+for model in ACHIEVEMENT_EVENTS:
+    post_save.connect(check_achievements, sender=model, dispatch_uid=f'achievement_check_{model.__name__}')
+
+
+# ==================== Twilio clients ====================
+
+def invalidate_twilio_client(sender, instance, **kwargs):
+    twilio_clients.invalidate(instance.tenant_id)
+
+
+post_save.connect(invalidate_twilio_client, sender=BrandingConfig, dispatch_uid='twilio_client_save')
+post_delete.connect(invalidate_twilio_client, sender=BrandingConfig, dispatch_uid='twilio_client_delete')
@@ -3,9 +3,7 @@ SMS Service Module
 Handles sending SMS messages to gym members using Twilio API
 """
 
-from twilio.rest import Client
-from django.conf import settings
-from core.models import MemberProfile
+from .twilio_clients import twilio_clients
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,34 +12,28 @@ logger = logging.getLogger(__name__)
 class SMSService:
     """Service class for SMS messaging operations"""
     
-    def __init__(self):
-        """Initialize Twilio client with credentials from settings"""
-        self.account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
-        self.auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
-        self.twilio_number = getattr(settings, 'TWILIO_SMS_NUMBER', None) # Note: Need to add this to settings
-        
-        if self.account_sid and self.auth_token:
-            self.client = Client(self.account_sid, self.auth_token)
-        else:
-            self.client = None
-            logger.warning("Twilio credentials not configured. SMS service disabled.")
+    def get_account(self, tenant=None):
+        """Pooled Twilio account for the tenant (or the global one), or None"""
+        return twilio_clients.get(tenant)
     
-    def is_configured(self):
+    def is_configured(self, tenant=None):
         """Check if SMS service is properly configured"""
-        return self.client is not None
+        return self.get_account(tenant) is not None
     
-    def send_sms(self, phone_number, message_content):
+    def send_sms(self, phone_number, message_content, tenant=None):
         """
         Send SMS message to a single recipient
         
         Args:
             phone_number: Phone number in international format (+1234567890)
             message_content: Message text to send (max 160 chars recommended)
+            tenant: Gym whose Twilio credentials to use (falls back to settings)
             
         Returns:
             dict: {'success': bool, 'message_sid': str or None, 'error': str or None}
         """
-        if not self.is_configured():
+        account = self.get_account(tenant)
+        if account is None:
             return {
                 'success': False,
                 'message_sid': None,
@@ -57,9 +49,9 @@ class SMSService:
                     'error': 'Invalid phone number format. Must start with +'
                 }
             
-            message = self.client.messages.create(
+            message = account.client.messages.create(
                 body=message_content,
-                from_=self.twilio_number or getattr(settings, 'TWILIO_WHATSAPP_NUMBER', '').replace('whatsapp:', ''),
+                from_=account.sms_number,
                 to=phone_number
             )
             
@@ -78,13 +70,14 @@ class SMSService:
                 'error': str(e)
             }
     
-    def send_bulk_sms(self, members_queryset, message_template):
+    def send_bulk_sms(self, members_queryset, message_template, tenant=None):
         """
         Send SMS to multiple members
         
         Args:
             members_queryset: QuerySet of MemberProfile objects
             message_template: String with placeholders like {name}
+            tenant: Gym whose Twilio credentials to use (falls back to settings)
             
         Returns:
             dict: Summary of results
@@ -107,7 +100,7 @@ class SMSService:
                 due_date=str(member.next_payment_date)
             )
             
-            res = self.send_sms(phone, message)
+            res = self.send_sms(phone, message, tenant=tenant)
             if res['success']:
                 results['successful'] += 1
             else:
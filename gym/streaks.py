@@ -0,0 +1,121 @@
+"""
+Streak Service
+Current and longest attendance streaks for many members at once, from one
+ordered read of Attendance and NumPy run-length encoding
+"""
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+import numpy as np
+from core.models import Attendance
+from core.gamification_models import MemberEngagementScore
+
+
+class StreakService:
+    """
+    A streak is a run of consecutive days with a Present check-in; several
+    check-ins on one day count once. The current streak stays alive until the
+    end of the day after the last visit, so a member who came yesterday has
+    not lost it yet.
+
+    compute() reads the distinct (member_id, date) pairs in order into an
+    array and splits it into runs wherever the member changes or the gap is
+    not one day, so a whole tenant costs one query and a few vector ops.
+    EngagementScoringEngine stores the results on MemberEngagementScore;
+    check-ins update the stored row incrementally through extend().
+    """
+
+    CHUNK_SIZE = 5000
+
+    def compute(self, member_filter, today=None):
+        """
+        Args:
+            member_filter: Q object on the `member` relation (e.g. Q(member__tenant=t))
+
+        Returns:
+            {member_id: (current_streak_days, longest_streak_days)} for members with visits
+        """
+        today = today or timezone.localdate()
+        rows = (
+            Attendance.objects.filter(member_filter, status='Present')
+            .values_list('member_id', 'date')
+            .distinct()
+            .order_by('member_id', 'date')
+        )
+        pairs = np.array(
+            [(member_id, day.toordinal()) for member_id, day in rows.iterator(chunk_size=self.CHUNK_SIZE)],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        if not len(pairs):
+            return {}
+        members, days = pairs[:, 0], pairs[:, 1]
+
+        # Run-length encode: a run starts at a new member or after a missed day
+        breaks = np.ones(len(pairs), dtype=bool)
+        breaks[1:] = (members[1:] != members[:-1]) | (np.diff(days) != 1)
+        run_starts = np.flatnonzero(breaks)
+        run_lengths = np.diff(np.append(run_starts, len(pairs)))
+        run_members = members[run_starts]
+        run_last_days = days[run_starts + run_lengths - 1]
+
+        # Runs are grouped by member; reduce each group
+        member_starts = np.flatnonzero(np.r_[True, run_members[1:] != run_members[:-1]])
+        longest = np.maximum.reduceat(run_lengths, member_starts)
+        last_runs = np.append(member_starts[1:], len(run_starts)) - 1
+        alive = run_last_days[last_runs] >= today.toordinal() - 1
+        current = np.where(alive, run_lengths[last_runs], 0)
+
+        return dict(zip(run_members[member_starts].tolist(), zip(current.tolist(), longest.tolist())))
+
+    @staticmethod
+    def current_as_of(row, today):
+        """A stored current streak, or 0 once a day has been missed since it was written"""
+        if row.last_visit_date is None or row.last_visit_date < today - timedelta(days=1):
+            return 0
+        return row.current_streak_days
+
+    @staticmethod
+    def extend(row, visit_date):
+        """
+        Apply a new check-in to a score row before its last_visit_date moves.
+
+        Returns:
+            False when the visit is older than the last one, so the streaks
+            must be recomputed instead
+        """
+        last_visit = row.last_visit_date
+        if last_visit is not None and visit_date < last_visit:
+            return False
+        if last_visit == visit_date:
+            return True
+        if last_visit == visit_date - timedelta(days=1) and row.current_streak_days:
+            row.current_streak_days += 1
+        else:
+            row.current_streak_days = 1
+        row.longest_streak_days = max(row.longest_streak_days, row.current_streak_days)
+        return True
+
+    def member_streaks(self, member, today=None):
+        """{'current': days, 'longest': days} for one member, from the stored score row when there is one"""
+        today = today or timezone.localdate()
+        row = (
+            MemberEngagementScore.objects.filter(member=member)
+            .only('current_streak_days', 'longest_streak_days', 'last_visit_date')
+            .order_by('-calculated_at')
+            .first()
+        )
+        if row is None:
+            current, longest = self.compute(Q(member=member), today).get(member.id, (0, 0))
+        else:
+            current, longest = self.current_as_of(row, today), row.longest_streak_days
+        return {'current': current, 'longest': longest}
+
+
+# Singleton instance
+streak_service = StreakService()
+
+
+# Convenience functions
+def tenant_streaks(tenant, today=None):
+    """Quick function to compute every member's streaks for a tenant"""
+    return streak_service.compute(Q(member__tenant=tenant), today)
@@ -0,0 +1,108 @@
+"""
+Celery Tasks
+Entry points for Celery workers: queued BackgroundJobs and the periodic
+maintenance that CELERY_BEAT_SCHEDULE triggers
+"""
+from datetime import timedelta
+from celery import shared_task
+from django.utils import timezone
+from core.models import Tenant
+from .achievements import AchievementEngine
+from .background_jobs import job_runner
+from .churn_model import ChurnModelService
+from .engagement_service import engagement_tracker
+from .financial_rollup import FinancialRollupService
+from .leaderboards import LeaderboardBuilder
+from .payment_reminders import PaymentReminderEngine
+# Imported for their job handler registrations
+from . import ai_service, member_import, payment_reminders, report_export, whatsapp_dispatcher  # noqa: F401
+
+
+@shared_task(acks_late=True)
+def run_background_job(job_id):
+    """Run a queued BackgroundJob; a duplicate delivery finds it claimed and exits"""
+    job = job_runner.run(job_id)
+    return job.status if job else None
+
+
+# ----------------------------------------------------------------------
+# Periodic tasks
+# Fan-out tasks queue one child per tenant, so a slow or failing gym does
+# not hold up the rest and workers share the load.
+# ----------------------------------------------------------------------
+
+@shared_task
+def send_payment_reminders():
+    """Daily automatic WhatsApp payment reminders, one task per tenant"""
+    tenant_ids = list(PaymentReminderEngine.tenant_configs())
+    for tenant_id in tenant_ids:
+        send_tenant_payment_reminders.delay(tenant_id)
+    return len(tenant_ids)
+
+
+@shared_task(acks_late=True)
+def send_tenant_payment_reminders(tenant_id):
+    # The reminder ledger makes a re-run on the same day a no-op
+    return PaymentReminderEngine().run(tenant_ids=[tenant_id])
+
+
+@shared_task
+def expire_engagement_windows():
+    """Nightly engagement window roll-forward and churn re-scoring"""
+    tenant_ids = list(Tenant.objects.filter(is_active=True).values_list('id', flat=True))
+    for tenant_id in tenant_ids:
+        expire_tenant_engagement_windows.delay(tenant_id)
+    return len(tenant_ids)
+
+
+@shared_task
+def expire_tenant_engagement_windows(tenant_id):
+    tenant = Tenant.objects.get(pk=tenant_id)
+    result = engagement_tracker.expire_windows(tenant)
+    ChurnModelService.score_tenant(tenant)
+    return result
+
+
+@shared_task
+def train_churn_models():
+    """Weekly churn model retraining per tenant plus the global fallback"""
+    trained = 0
+    for tenant in Tenant.objects.filter(is_active=True):
+        if ChurnModelService.train(tenant=tenant) is not None:
+            trained += 1
+        ChurnModelService.score_tenant(tenant)
+    ChurnModelService.train()
+    return trained
+
+
+@shared_task
+def rebuild_recent_rollups(days=2):
+    """Re-derive the last few days of financial rollups to heal any drift"""
+    return FinancialRollupService.rebuild(date_from=timezone.localdate() - timedelta(days=days - 1))
+
+
+@shared_task
+def rebuild_leaderboards():
+    """Hourly leaderboard refresh (attendance boards and the start of new periods)"""
+    return LeaderboardBuilder.rebuild()
+
+
+@shared_task
+def refresh_tenant_leaderboards(source, tenant_id):
+    """Debounced refresh queued by workout and achievement writes"""
+    return LeaderboardBuilder.run_scheduled_refresh(source, tenant_id)
+
+
+@shared_task
+def award_achievements():
+    """Nightly achievement sweep (tenure badges and anything the incremental path missed)"""
+    tenant_ids = list(Tenant.objects.filter(is_active=True).values_list('id', flat=True))
+    for tenant_id in tenant_ids:
+        award_tenant_achievements.delay(tenant_id)
+    return len(tenant_ids)
+
+
+@shared_task
+def award_tenant_achievements(tenant_id):
+    # Awards are unique per member and badge, so a re-run is a no-op
+    return len(AchievementEngine().evaluate(tenant=Tenant.objects.get(pk=tenant_id)))
@@ -1,8 +1,20 @@
-from django.test import TestCase, Client
+import io
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
-from core.models import CustomUser, MemberProfile, Tenant
+from core.models import CustomUser, MemberProfile, Tenant, Attendance
 from django.utils import timezone
 
+
+def make_member(username, tenant, **fields):
+    """A member user and profile, with the profile fields tests rarely care about filled in"""
+    user = CustomUser.objects.create_user(username=username, password='password', role='member', tenant=tenant)
+    fields = {
+        'membership_type': 'monthly', 'age': 30, 'registration_amount': 0,
+        'monthly_amount': 500, 'allotted_slot': 'Morning', **fields,
+    }
+    return MemberProfile.objects.create(user=user, tenant=tenant, **fields)
+
+
 class ViewNavigationTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -57,3 +69,1359 @@ class ViewNavigationTests(TestCase):
         response = self.client.get(reverse('member_qr'))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'image/png')
+
+
+class EngagementScoringEngineTests(TestCase):
+    def setUp(self):
+        from core.models import Subscription
+        from core.gamification_models import Exercise
+
+        self.tenant = Tenant.objects.create(name="Score Gym", subdomain="scoregym", contact_email="score@example.com")
+        self.exercise = Exercise.objects.create(name='Squat', category='strength', measurement_type='weight')
+        today = timezone.now().date()
+        self.members = []
+        for i in range(4):
+            self.members.append(make_member(
+                f'scorer{i}', self.tenant, next_payment_date=today + timezone.timedelta(days=i * 5),
+            ))
+        active, lapsed, idle, failing = self.members
+
+        for day in range(14):
+            Attendance.objects.create(tenant=self.tenant, member=active, date=today - timezone.timedelta(days=day))
+        Attendance.objects.create(tenant=self.tenant, member=lapsed, date=today - timezone.timedelta(days=10))
+        Attendance.objects.create(tenant=self.tenant, member=failing, date=today - timezone.timedelta(days=40))
+
+        from core.gamification_models import WorkoutLog, Achievement
+        for _ in range(5):
+            WorkoutLog.objects.create(member=active, exercise=self.exercise, value=50)
+        Achievement.objects.create(member=active, achievement_type='first_workout', title='First', description='', icon='*')
+
+        from core.payment_models import SubscriptionPayment
+        for member, status in ((active, 'completed'), (failing, 'failed')):
+            subscription = Subscription.objects.create(
+                member=member, plan='monthly', start_date=today, end_date=today + timezone.timedelta(days=30), amount=500
+            )
+            SubscriptionPayment.objects.create(
+                subscription=subscription, member=member, amount=500, payment_method='cash', status=status
+            )
+
+    def test_bulk_scores_match_per_member_path(self):
+        from gym.analytics_service import AnalyticsService
+        from core.gamification_models import MemberEngagementScore
+
+        updated = AnalyticsService.update_all_engagement_scores(self.tenant)
+        self.assertEqual(updated, 4)
+
+        for member in self.members:
+            row = MemberEngagementScore.objects.get(member=member)
+            self.assertEqual(float(row.overall_score), AnalyticsService.calculate_engagement_score(member))
+            self.assertEqual(row.churn_risk, AnalyticsService.predict_churn_risk(member))
+
+        self.assertEqual(MemberEngagementScore.objects.get(member=self.members[3]).payment_status, 'overdue')
+
+    def test_rerun_updates_rows_in_place_with_constant_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from gym.engagement_service import EngagementScoringEngine
+        from core.gamification_models import MemberEngagementScore
+
+        EngagementScoringEngine().refresh_tenant(self.tenant)
+        with CaptureQueriesContext(connection) as ctx:
+            EngagementScoringEngine().refresh_tenant(self.tenant)
+
+        self.assertEqual(MemberEngagementScore.objects.filter(member__tenant=self.tenant).count(), 4)
+        self.assertLessEqual(len(ctx.captured_queries), 11)
+
+    def test_incremental_tracking_matches_full_refresh(self):
+        from gym.engagement_service import EngagementScoringEngine, engagement_tracker
+        from core.gamification_models import MemberEngagementScore, WorkoutLog
+
+        EngagementScoringEngine().refresh_tenant(self.tenant)
+        lapsed, idle = self.members[1], self.members[2]
+        engagement_tracker.record_attendance(
+            Attendance.objects.create(tenant=self.tenant, member=lapsed, date=timezone.now().date())
+        )
+        engagement_tracker.record_workout(
+            WorkoutLog.objects.create(member=idle, exercise=self.exercise, value=40)
+        )
+        incremental = {
+            row.member_id: (float(row.overall_score), row.churn_risk, row.attendance_count_30d, row.workout_count_30d)
+            for row in MemberEngagementScore.objects.filter(member__tenant=self.tenant)
+        }
+
+        engagement_tracker.expire_windows(self.tenant)
+        EngagementScoringEngine().refresh_tenant(self.tenant)
+        for row in MemberEngagementScore.objects.filter(member__tenant=self.tenant):
+            self.assertEqual(
+                incremental[row.member_id],
+                (float(row.overall_score), row.churn_risk, row.attendance_count_30d, row.workout_count_30d),
+            )
+
+
+class ChurnModelTests(TestCase):
+    def test_trained_model_scores_tenant_and_drives_predict_churn_risk(self):
+        from gym.analytics_service import AnalyticsService
+        from gym.benchmarking import seed_synthetic_tenant
+        from gym.churn_model import ChurnModelService
+        from core.gamification_models import MemberEngagementScore
+
+        tenant = seed_synthetic_tenant(80, seed=7)
+        artifact = ChurnModelService.train(tenant=tenant)
+        self.assertIsNotNone(artifact)
+        self.assertEqual(artifact.training_samples, MemberProfile.objects.filter(
+            tenant=tenant, registration_date__lte=timezone.now().date() - timezone.timedelta(days=30)
+        ).count())
+
+        self.assertEqual(AnalyticsService.update_all_engagement_scores(tenant), 80)
+        member = MemberProfile.objects.filter(tenant=tenant).first()
+        row = MemberEngagementScore.objects.get(member=member)
+        probability = ChurnModelService.predict([member], tenant=tenant)[member.id]
+        self.assertAlmostEqual(float(row.churn_probability), probability * 100, places=1)
+        self.assertEqual(row.churn_risk, AnalyticsService.predict_churn_risk(member))
+
+    def test_engagement_updates_keep_the_model_churn_columns(self):
+        from gym.analytics_service import AnalyticsService
+        from gym.benchmarking import seed_synthetic_tenant
+        from gym.churn_model import ChurnModelService
+        from gym.engagement_service import EngagementScoringEngine, engagement_tracker
+        from core.gamification_models import MemberEngagementScore
+
+        tenant = seed_synthetic_tenant(80, seed=7)
+        ChurnModelService.train(tenant=tenant)
+        AnalyticsService.update_all_engagement_scores(tenant)
+        member = MemberProfile.objects.filter(tenant=tenant).first()
+        scored = MemberEngagementScore.objects.get(member=member)
+
+        engagement_tracker.record_attendance(Attendance.objects.create(tenant=tenant, member=member, date=timezone.now().date()))
+        EngagementScoringEngine().refresh_members([member.id])
+        row = MemberEngagementScore.objects.get(member=member)
+        self.assertEqual(row.attendance_count_30d, scored.attendance_count_30d + 1)
+        self.assertEqual((row.churn_probability, row.churn_risk), (scored.churn_probability, scored.churn_risk))
+
+    def test_global_model_is_the_fallback(self):
+        from gym.benchmarking import seed_synthetic_tenant
+        from gym.churn_model import ChurnModelService
+
+        seed_synthetic_tenant(60, seed=3)
+        other = Tenant.objects.create(name="New Gym", subdomain="newgym", contact_email="new@example.com")
+        self.assertIsNone(ChurnModelService.get_artifact(other))
+
+        artifact = ChurnModelService.train()
+        self.assertEqual(ChurnModelService.get_artifact(other), artifact)
+
+
+@override_settings(SHARED_CACHE=True)
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Metric Gym", subdomain="metricgym", contact_email="m@example.com")
+        self.other = Tenant.objects.create(name="Other Gym", subdomain="othergym", contact_email="o@example.com")
+        CustomUser.objects.create(username='coach', role='trainer', tenant=self.tenant)
+        CustomUser.objects.create(username='elsewhere', role='trainer', tenant=self.other)
+        self.member = make_member('lifter', self.tenant, next_payment_date=timezone.now().date())
+
+    def test_metrics_are_tenant_scoped_and_kept_current_by_signals(self):
+        from decimal import Decimal
+        from core.models import Payment, Expense
+        from gym.dashboard_metrics import DashboardMetrics
+
+        metrics = DashboardMetrics.get(self.tenant)
+        self.assertEqual((metrics['total_members'], metrics['trainers_count'], metrics['income']), (1, 1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = Payment.objects.create(tenant=self.tenant, member=self.member, amount=Decimal('500.50'), payment_type='monthly')
+            expense = Expense.objects.create(tenant=self.tenant, category='other', amount=200, date=timezone.now().date(), description='')
+            payment.amount = Decimal('600.50')
+            payment.save()
+            expense.delete()
+            CustomUser.objects.create(username='desk', role='staff', tenant=self.tenant)
+
+        with self.assertNumQueries(0):
+            metrics = DashboardMetrics.get(self.tenant)
+        self.assertEqual(metrics['income'], Decimal('600.50'))
+        self.assertEqual(metrics['expense'], 0)
+        self.assertEqual(metrics['profit'], Decimal('600.50'))
+        self.assertEqual(metrics['staff_count'], 1)
+        self.assertEqual(DashboardMetrics.compute(self.tenant.id)['income'], 60050)
+
+        coach = CustomUser.objects.get(username='coach')
+        coach.role = 'staff'
+        with self.captureOnCommitCallbacks(execute=True):
+            coach.save()
+        metrics = DashboardMetrics.get(self.tenant)
+        self.assertEqual((metrics['trainers_count'], metrics['staff_count']), (0, 2))
+        self.assertEqual(DashboardMetrics.get(self.other)['total_members'], 0)
+
+    def test_rolled_back_writes_leave_the_totals_alone(self):
+        from decimal import Decimal
+        from django.db import transaction
+        from core.models import Payment
+        from gym.dashboard_metrics import DashboardMetrics
+
+        DashboardMetrics.get(self.tenant)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Payment.objects.create(tenant=self.tenant, member=self.member, amount=Decimal('75'), payment_type='monthly')
+                transaction.set_rollback(True)
+        with self.assertNumQueries(0):
+            self.assertEqual(DashboardMetrics.get(self.tenant)['income'], 0)
+
+        # A per-process cache cannot see other workers' deltas, so reads go to the database
+        with override_settings(SHARED_CACHE=False), self.assertNumQueries(5):
+            self.assertEqual(DashboardMetrics.get(self.tenant)['total_members'], 1)
+
+
+class FinancialRollupTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Ledger Gym", subdomain="ledgergym", contact_email="l@example.com")
+        self.member = make_member('payer', self.tenant, next_payment_date=timezone.now().date())
+
+    def test_incremental_rollup_matches_backfill(self):
+        from core.models import Payment, Expense
+        from core.reporting_models import DailyFinancialRollup
+        from gym.financial_rollup import FinancialRollupService
+
+        today = timezone.now().date()
+        last_month = today - timezone.timedelta(days=35)
+        Payment.objects.create(tenant=self.tenant, member=self.member, amount=1000, payment_type='registration')
+        moved = Payment.objects.create(tenant=self.tenant, member=self.member, amount=500, payment_type='monthly', date=today)
+        Payment.objects.create(tenant=self.tenant, member=self.member, amount=500, payment_type='monthly', date=last_month)
+        Expense.objects.create(tenant=self.tenant, category='salary', amount=300, date=today, description='')
+        doomed = Expense.objects.create(tenant=self.tenant, category='other', amount=50, date=today, description='')
+        Attendance.objects.create(tenant=self.tenant, member=self.member, date=today)
+
+        moved.date = last_month
+        moved.amount = 700
+        moved.save()
+        doomed.delete()
+
+        def snapshot():
+            return list(DailyFinancialRollup.objects.filter(tenant=self.tenant).order_by('date').values(
+                'date', 'revenue_registration', 'revenue_monthly', 'expense_salary', 'expense_other',
+                'attendance_count', 'new_members',
+            ))
+
+        incremental = snapshot()
+        totals = FinancialRollupService.totals(self.tenant)
+        self.assertEqual((totals['revenue'], totals['expenses']), (2200, 300))
+        self.assertEqual(FinancialRollupService.expense_breakdown(self.tenant), [{'category': 'salary', 'total': 300}])
+
+        FinancialRollupService.rebuild(tenant_id=self.tenant.id, all_tenants=False)
+        self.assertEqual(snapshot(), incremental)
+
+    def test_reports_view_reads_rollup(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.reporting_models import DailyFinancialRollup
+
+        # Rollup rows with no Payment, Expense or Attendance rows behind them
+        yesterday = timezone.now().date() - timezone.timedelta(days=1)
+        day_before = yesterday - timezone.timedelta(days=1)
+        DailyFinancialRollup.objects.bulk_create([
+            DailyFinancialRollup(tenant=self.tenant, date=yesterday, revenue_monthly=500, expense_salary=200, attendance_count=3),
+            DailyFinancialRollup(tenant=self.tenant, date=day_before, revenue_registration=1000, expense_other=50, attendance_count=2),
+        ])
+        admin = CustomUser.objects.create_user(username='boss', password='pw', role='tenant_admin', tenant=self.tenant)
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('reports'), HTTP_X_TENANT_ID=str(self.tenant.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['total_revenue'], response.context['total_expenses']), (1500, 250))
+        self.assertEqual(
+            [(item['category'], item['total']) for item in response.context['expense_breakdown']],
+            [('salary', 200), ('other', 50)],
+        )
+        self.assertEqual(
+            response.context['daily_attendance'],
+            [{'date': day_before, 'count': 2}, {'date': yesterday, 'count': 3}],
+        )
+        raw_tables = ('core_payment', 'core_expense', 'core_attendance')
+        self.assertFalse([q for q in queries.captured_queries if any(table in q['sql'] for table in raw_tables)])
+
+
+class ClassCalendarTests(TestCase):
+    def setUp(self):
+        from datetime import date, time
+        from core.booking_models import ClassSchedule
+
+        self.tenant = Tenant.objects.create(name="Class Gym", subdomain="classgym", contact_email="c@example.com")
+        self.instructor = CustomUser.objects.create(username='coachc', role='trainer', tenant=self.tenant, first_name='Coach')
+        self.member = make_member('booker', self.tenant, next_payment_date=timezone.now().date())
+        # June 2026: Monday the 1st through Tuesday the 30th
+        self.start, self.end = date(2026, 6, 1), date(2026, 6, 30)
+        self.schedules = [
+            ClassSchedule.objects.create(
+                tenant=self.tenant, class_name=f'Class {day}', class_type='yoga', instructor=self.instructor,
+                day_of_week=day, start_time=time(7), end_time=time(8), capacity=2,
+                effective_from=date(2026, 1, 1),
+            )
+            for day in range(7)
+        ]
+        # Ends mid-month, and one that has not started yet
+        ClassSchedule.objects.filter(id=self.schedules[0].id).update(effective_until=date(2026, 6, 14))
+        ClassSchedule.objects.create(
+            tenant=self.tenant, class_name='Future', class_type='yoga', day_of_week=0,
+            start_time=time(9), end_time=time(10), effective_from=date(2026, 7, 1),
+        )
+
+    def test_events_use_constant_queries_and_respect_effective_dates(self):
+        from datetime import date
+        from core.booking_models import ClassBooking
+        from gym.booking_calendar import ClassCalendar
+
+        tuesday = self.schedules[1]
+        others = [make_member(f'other{i}', self.tenant, next_payment_date=self.start) for i in range(2)]
+        for member in others + [self.member]:
+            ClassBooking.book(member, tuesday, date(2026, 6, 2))
+
+        with self.assertNumQueries(3):
+            events = ClassCalendar(self.tenant, self.member).events(self.start, self.end)
+
+        # 30 occurrences across the week, minus the three Mondays after the first schedule ends
+        self.assertEqual(len(events), 27)
+        self.assertFalse(any(e['extendedProps']['schedule_id'] == self.schedules[0].id and e['extendedProps']['date'] > '2026-06-14' for e in events))
+
+        event = next(e for e in events if e['id'] == f'{tuesday.id}_2026-06-02')
+        self.assertEqual(event['extendedProps']['booked'], 2)
+        self.assertTrue(event['extendedProps']['is_full'])
+        self.assertEqual(event['extendedProps']['booking_status'], 'waitlist')
+        self.assertEqual(event['extendedProps']['instructor'], 'Coach')
+
+    def test_booking_claims_seats_atomically_and_cancel_promotes(self):
+        from datetime import date, time
+        from django.core.exceptions import ValidationError
+        from core.booking_models import ClassBooking, ClassOccurrence, ClassSchedule
+
+        schedule = ClassSchedule.objects.create(
+            tenant=self.tenant, class_name='Spin', class_type='spinning', day_of_week=0,
+            start_time=time(7), end_time=time(8), capacity=1, waitlist_capacity=1,
+        )
+        class_date = timezone.now().date() + timezone.timedelta(days=14)
+        members = [self.member] + [make_member(f'spinner{i}', self.tenant, next_payment_date=class_date) for i in range(2)]
+
+        first = ClassBooking.book(members[0], schedule, class_date)
+        second = ClassBooking.book(members[1], schedule, class_date)
+        self.assertEqual((first.status, second.status), ('confirmed', 'waitlist'))
+        with self.assertRaises(ValidationError):
+            ClassBooking.book(members[2], schedule, class_date)
+        with self.assertRaises(ValidationError):
+            ClassBooking.book(members[0], schedule, class_date)
+
+        first.cancel()
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'confirmed')
+        occurrence = ClassOccurrence.objects.get(class_schedule=schedule, booking_date=class_date)
+        self.assertEqual((occurrence.confirmed_count, occurrence.waitlist_count), (1, 0))
+
+        # Rebooking re-uses the cancelled row and lands on the waitlist again
+        rebooked = ClassBooking.book(members[0], schedule, class_date)
+        self.assertEqual((rebooked.pk, rebooked.status), (first.pk, 'waitlist'))
+
+
+class TenantResolverTests(TestCase):
+    def setUp(self):
+        from core.models import BrandingConfig
+        from core.tenant_resolver import tenant_resolver
+
+        tenant_resolver.clear()
+        self.tenant = Tenant.objects.create(name="Cached Gym", subdomain="cachedgym", contact_email="c@example.com")
+        BrandingConfig.objects.create(tenant=self.tenant, app_name='Cached App')
+
+    def test_branding_api_pays_no_tenant_queries_when_warm(self):
+        from core.tenant_resolver import tenant_resolver
+
+        self.client.get('/api/branding/', HTTP_X_TENANT_ID=str(self.tenant.id))
+        before = tenant_resolver.stats()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/branding/', HTTP_X_TENANT_ID=str(self.tenant.id))
+        self.assertEqual(response.json()['app_name'], 'Cached App')
+        self.assertEqual(tenant_resolver.stats()['local_hits'], before['local_hits'] + 1)
+
+    def test_saves_invalidate_both_tiers(self):
+        from core.tenant_resolver import tenant_resolver
+
+        self.assertEqual(tenant_resolver.by_subdomain('cachedgym').branding.app_name, 'Cached App')
+        branding = self.tenant.branding
+        branding.app_name = 'Renamed App'
+        branding.save()
+        self.assertEqual(tenant_resolver.by_subdomain('cachedgym').branding.app_name, 'Renamed App')
+
+        self.tenant.subdomain = 'movedgym'
+        self.tenant.save()
+        self.assertIsNone(tenant_resolver.by_subdomain('cachedgym'))
+        self.assertEqual(tenant_resolver.by_subdomain('movedgym').pk, self.tenant.pk)
+
+
+class MemberImportTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+
+        settings_override = override_settings(
+            BACKGROUND_JOBS_EAGER=True,
+            BACKGROUND_JOB_FILES_ROOT=tempfile.mkdtemp(),
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.tenant = Tenant.objects.create(name="Import Gym", subdomain="importgym", contact_email="i@example.com")
+        self.admin = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='password', role='tenant_admin', tenant=self.tenant)
+        CustomUser.objects.create_user(username='taken', email='taken@example.com', password='password', tenant=self.tenant)
+
+    def test_upload_runs_job_and_reports_row_errors(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from core.models import BackgroundJob
+        from core.reporting_models import DailyFinancialRollup
+
+        lines = ['username,email,password,first_name,membership_type,age,registration_amount,monthly_amount']
+        lines += [f'new{i},new{i}@example.com,secret{i},New,monthly,{20 + i},100,50' for i in range(5)]
+        lines += [
+            'taken,other@example.com,secret,Dup,monthly,30,0,0',
+            'new0,fresh@example.com,secret,Again,monthly,30,0,0',
+            'nopass,np@example.com,,Empty,monthly,30,0,0',
+            'badage,ba@example.com,secret,Bad,monthly,old,0,0',
+        ]
+        upload = SimpleUploadedFile('members.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('bulk_import_members'), {'csv_file': upload})
+        job = BackgroundJob.objects.get(tenant=self.tenant)
+        self.assertRedirects(response, reverse('member_import_status', args=[job.id]))
+
+        status = self.client.get(reverse('background_job_status', args=[job.id])).json()
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['result'], {'total': 9, 'imported': 5, 'failed': 4})
+        self.assertEqual(status['progress']['current'], 9)
+        partial = self.client.get(reverse('background_job_status', args=[job.id]), HTTP_HX_REQUEST='true')
+        self.assertContains(partial, 'Imported 5 of 9 member(s).')
+
+        imported = CustomUser.objects.get(username='new3')
+        self.assertTrue(imported.check_password('secret3'))
+        self.assertEqual((imported.tenant, imported.member_profile.age), (self.tenant, 23))
+        self.assertEqual(DailyFinancialRollup.objects.get(tenant=self.tenant).new_members, 5)
+
+        report = self.client.get(reverse('background_job_error_report', args=[job.id])).content.decode()
+        self.assertEqual(
+            [line.split(',')[0:2] for line in report.strip().splitlines()[1:]],
+            [['7', 'taken'], ['8', 'new0'], ['9', 'nopass'], ['10', 'badage']],
+        )
+        job.refresh_from_db()
+        self.assertFalse(job.input_file)
+
+
+class PhoneImportTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Phone Gym", subdomain="phonegym", contact_email="p@example.com")
+        other = Tenant.objects.create(name="Other Gym", subdomain="otherphonegym", contact_email="o@example.com")
+        self.admin = CustomUser.objects.create_user(username='owner', password='password', role='tenant_admin', tenant=self.tenant)
+        for username, tenant, phone in [('ann', self.tenant, ''), ('bob', self.tenant, '+15550000002'), ('cat', other, '')]:
+            make_member(username, tenant, phone_number=phone)
+
+    def upload(self, dry_run):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        content = 'username,phone_number\nann,+1 555-000-0001\nbob,+15550000002\ncat,+15550000003\nann,+15550000009\ndan,12345\n'
+        return self.client.post(reverse('bulk_import_phones'), {
+            'csv_file': SimpleUploadedFile('phones.csv', content.encode(), content_type='text/csv'),
+            'dry_run': 'on' if dry_run else '',
+        })
+
+    def test_preview_then_apply_scoped_to_tenant(self):
+        self.client.force_login(self.admin)
+
+        response = self.upload(dry_run=True)
+        preview = response.context['preview']
+        self.assertEqual(preview['summary'], {'changed': 1, 'unchanged': 1, 'failed': 3})
+        self.assertEqual(preview['changes'][0]['new'], '+15550000001')
+        self.assertEqual(MemberProfile.objects.get(user__username='ann').phone_number, '')
+
+        response = self.upload(dry_run=False)
+        self.assertRedirects(response, reverse('member_list'), fetch_redirect_response=False)
+        phones = dict(MemberProfile.objects.values_list('user__username', 'phone_number'))
+        self.assertEqual(phones, {'ann': '+15550000001', 'bob': '+15550000002', 'cat': ''})
+
+
+class WhatsAppBroadcastTests(TestCase):
+    """Broadcasts go through the dispatcher against a local fake Twilio API"""
+
+    def setUp(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from unittest import mock
+        from urllib.parse import parse_qs
+        from django.test import override_settings
+        from gym.twilio_clients import twilio_clients
+        from gym.whatsapp_dispatcher import BroadcastDispatcher
+
+        calls = self.calls = []
+        ports = self.ports = set()
+        lock = threading.Lock()
+
+        class FakeTwilio(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+                to = form['To'][0]
+                with lock:
+                    calls.append(to)
+                    ports.add(self.client_address[1])
+                    attempt = calls.count(to)
+                if to.endswith('0002') and attempt == 1:
+                    status, payload = 429, {'code': 20429, 'message': 'Too Many Requests'}
+                elif to.endswith('0003'):
+                    status, payload = 503, {'code': 20503, 'message': 'Service Unavailable'}
+                else:
+                    status, payload = 201, {'sid': f'SM{to[-4:]}', 'to': to, 'status': 'queued'}
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTwilio)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        settings_override = override_settings(
+            BACKGROUND_JOBS_EAGER=True,
+            TWILIO_ACCOUNT_SID='AC' + '0' * 32,
+            TWILIO_AUTH_TOKEN='secret',
+            TWILIO_API_BASE_URL=f'http://127.0.0.1:{server.server_address[1]}',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        twilio_clients.clear()
+        self.addCleanup(twilio_clients.clear)
+
+        dispatcher = BroadcastDispatcher(max_workers=4, rate=1000, sleep=lambda seconds: None)
+        patcher = mock.patch('gym.whatsapp_dispatcher.broadcast_dispatcher', dispatcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tenant = Tenant.objects.create(name="Chat Gym", subdomain="chatgym", contact_email="w@example.com")
+        self.admin = CustomUser.objects.create_user(username='owner', password='password', role='tenant_admin', tenant=self.tenant)
+        for i, phone in enumerate(['+15550000001', '+15550000002', '+15550000003', '+15550000004', '']):
+            make_member(f'member{i}', self.tenant, phone_number=phone)
+
+    def test_broadcast_retries_and_records_each_recipient(self):
+        from core.models import WhatsAppMessage, WhatsAppDelivery
+        from gym.whatsapp_service import whatsapp_service
+
+        job = whatsapp_service.send_to_time_slot('Morning', 'Gym closed tomorrow', self.admin)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.result['sent'], job.result['failed']), (3, 1))
+        self.assertEqual((job.progress_current, job.progress_total), (4, 4))
+
+        deliveries = {
+            d.phone_number: (d.status, d.attempts, d.message_sid)
+            for d in WhatsAppDelivery.objects.all()
+        }
+        self.assertEqual(deliveries['+15550000001'], ('sent', 1, 'SM0001'))
+        self.assertEqual(deliveries['+15550000002'], ('sent', 2, 'SM0002'))
+        self.assertEqual(deliveries['+15550000003'][:2], ('failed', 4))
+        self.assertEqual(len(self.calls), 8)
+
+        log = WhatsAppMessage.objects.get()
+        self.assertEqual((log.status, log.recipient_count), ('sent', 4))
+        self.assertEqual(log.error_message, '1 messages failed to send')
+
+    def test_clients_are_pooled_per_tenant_and_reset_by_branding_changes(self):
+        from core.models import BrandingConfig
+        from gym.sms_service import sms_service
+        from gym.twilio_clients import twilio_clients
+        from gym.whatsapp_service import whatsapp_service
+
+        for i in range(5):
+            self.assertTrue(whatsapp_service.send_message(f'+1555000010{i}', 'hi', tenant=self.tenant)['success'])
+        with self.assertNumQueries(0):
+            self.assertTrue(sms_service.send_sms('+15550000109', 'hi', tenant=self.tenant)['success'])
+        # Keep-alive: six sends over a single connection
+        self.assertEqual(len(self.ports), 1)
+
+        account = twilio_clients.get(self.tenant)
+        BrandingConfig.objects.create(
+            tenant=self.tenant, twilio_account_sid='AC' + '1' * 32, twilio_auth_token='tenant-secret',
+            twilio_whatsapp_number='whatsapp:+15557654321',
+        )
+        fresh = twilio_clients.get(self.tenant)
+        self.assertIsNot(fresh, account)
+        self.assertEqual((fresh.account_sid, fresh.sms_number), ('AC' + '1' * 32, '+15557654321'))
+
+    def test_payment_reminders_are_selected_once_and_deduplicated_by_ledger(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from core.models import BrandingConfig, PaymentReminderLedger
+
+        today = timezone.localdate()
+        BrandingConfig.objects.create(tenant=self.tenant, enable_auto_whatsapp_reminders=True, whatsapp_reminder_days_before=3)
+        for username, offset in [('member0', 3), ('member1', 0), ('member2', -3), ('member3', -10), ('member4', 0)]:
+            MemberProfile.objects.filter(user__username=username).update(next_payment_date=today + timedelta(days=offset))
+
+        call_command('send_payment_reminders', '--shard', f'{(self.tenant.id + 1) % 2}/2', stdout=io.StringIO())
+        self.assertFalse(PaymentReminderLedger.objects.exists())
+
+        call_command('send_payment_reminders', '--tenant', str(self.tenant.id), stdout=io.StringIO())
+        ledger = dict(PaymentReminderLedger.objects.values_list('member__user__username', 'kind'))
+        self.assertEqual(ledger, {'member0': 'upcoming', 'member1': 'due_today', 'member2': 'overdue'})
+        self.assertEqual(
+            dict(PaymentReminderLedger.objects.values_list('member__user__username', 'whatsapp_message__status')),
+            {'member0': 'sent', 'member1': 'sent', 'member2': 'failed'},
+        )
+
+        calls = len(self.calls)
+        call_command('send_payment_reminders', stdout=io.StringIO())
+        self.assertEqual(len(self.calls), calls)
+        self.assertEqual(PaymentReminderLedger.objects.count(), 3)
+
+    def test_manual_reminder_is_queued_once_per_day_through_celery(self):
+        from unittest import mock
+        from django.test import override_settings
+        from core.models import BackgroundJob, WhatsAppMessage
+        from gym.tasks import run_background_job
+        from gym_management.celery import app as celery_app
+
+        # Run tasks in-process, as with CELERY_TASK_ALWAYS_EAGER
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, 'CELERY_TASK_ALWAYS_EAGER', False)
+        self.client.force_login(self.admin)
+        member, unreachable = MemberProfile.objects.filter(user__username__in=['member0', 'member2']).order_by('id')
+
+        with override_settings(BACKGROUND_JOBS_EAGER=False, CELERY_BROKER_URL='memory://'), \
+                mock.patch.object(run_background_job, 'apply_async', wraps=run_background_job.apply_async) as apply_async:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.get(reverse('send_payment_reminder', args=[member.id]))
+            self.assertEqual(apply_async.call_count, 1)
+            self.assertEqual(apply_async.call_args.kwargs['queue'], 'messaging')
+            self.assertEqual(self.calls, ['whatsapp:+15550000001'])
+
+            # A failed send fails the job, and the next click queues it again
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.get(reverse('send_payment_reminder', args=[unreachable.id]))
+            self.assertEqual(apply_async.call_count, 3)
+
+        jobs = BackgroundJob.objects.filter(job_type='whatsapp_reminder')
+        self.assertEqual(dict(jobs.values_list('params__member_id', 'status')), {member.id: 'completed', unreachable.id: 'failed'})
+        self.assertEqual(WhatsAppMessage.objects.filter(time_slot='payment_reminder').count(), 3)
+
+
+class BackgroundJobViewTests(TestCase):
+    def setUp(self):
+        from django.test import override_settings
+
+        settings_override = override_settings(BACKGROUND_JOBS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tenant = Tenant.objects.create(name="Job Gym", subdomain="jobgym", contact_email="j@example.com")
+        self.admin = CustomUser.objects.create_user(username='jobadmin', password='password', role='tenant_admin', tenant=self.tenant)
+        self.member_user = make_member('jobmember', self.tenant).user
+
+    def test_report_pdf_is_rendered_by_a_job_and_downloaded(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_report_pdf'))
+        job_url = response.url
+        page = self.client.get(job_url)
+        self.assertContains(page, 'PDF Report is ready')
+
+        job = page.context['job']
+        download = self.client.get(reverse('background_job_output', args=[job.id]))
+        self.assertEqual(download['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+        self.addCleanup(job.output_file.delete, save=False)
+
+        # Other users only see their own jobs
+        self.client.force_login(self.member_user)
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+
+    def test_ai_plan_waits_for_job_then_shows_result(self):
+        from unittest import mock
+        from core.models import BackgroundJob
+
+        self.client.force_login(self.member_user)
+        session = self.client.session
+        session['ai_connected'] = True
+        session.save()
+
+        plan = {'success': True, 'plan': {'plan_name': 'Queued Strength'}}
+        with self.settings(BACKGROUND_JOBS_EAGER=False), \
+                mock.patch('gym.ai_service.GeminiAIService.generate_workout_plan', return_value=plan) as generate:
+            response = self.client.post(reverse('ai_workout_plan'), {'goal': 'strength', 'duration': 4, 'days_per_week': 3})
+            self.assertRedirects(response, reverse('view_workout_plan'), fetch_redirect_response=False)
+
+            # Still pending: the view sends the member to the job's progress page
+            job = BackgroundJob.objects.get(job_type='ai_workout_plan')
+            waiting = self.client.get(reverse('view_workout_plan'))
+            self.assertTrue(waiting.url.startswith(reverse('background_job_detail', args=[job.id])))
+
+            from gym.background_jobs import job_runner
+            job_runner.run(job.id)
+            self.assertEqual(generate.call_args.kwargs['duration_weeks'], 4)
+
+        status = self.client.get(f"{reverse('background_job_status', args=[job.id])}?next={reverse('view_workout_plan')}", HTTP_HX_REQUEST='true')
+        self.assertEqual(status['HX-Redirect'], reverse('view_workout_plan'))
+        response = self.client.get(reverse('view_workout_plan'))
+        self.assertEqual(response.context['plan'], plan['plan'])
+
+
+class AIPlanCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from gym.ai_plan_cache import plan_cache
+
+        cache.clear()
+        plan_cache.clear()
+        self.addCleanup(plan_cache.clear)
+        tenant = Tenant.objects.create(name="AI Gym", subdomain="aigym", contact_email="ai@example.com")
+        self.members = []
+        for i, age in enumerate([30, 30, 41]):
+            self.members.append(make_member(f'ai{i}', tenant, age=age))
+
+    def test_identical_prompts_share_one_generation(self):
+        import threading
+        import time
+        from types import SimpleNamespace
+        from gym.ai_plan_cache import plan_cache
+        from gym.ai_service import GeminiAIService
+
+        prompts = []
+
+        class FakeModel:
+            def generate_content(self, prompt):
+                prompts.append(prompt)
+                time.sleep(0.2)
+                return SimpleNamespace(text='```json\n{"plan_name": "Shared"}\n```')
+
+        service = GeminiAIService()
+        service.model, service.is_configured = FakeModel(), True
+
+        # Concurrent identical requests coalesce onto one in-flight call
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                service.generate_workout_plan(self.members[0], 'Build  muscle', 4, 3)
+            ))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(prompts), 1)
+        self.assertTrue(all(result['plan'] == {'plan_name': 'Shared'} for result in results))
+
+        # Same normalised prompt for another member is a cache hit; a different age is not
+        results[0]['plan']['plan_name'] = 'Mutated by caller'
+        self.assertEqual(service.generate_workout_plan(self.members[1], 'build muscle', 4, 3)['plan']['plan_name'], 'Shared')
+        service.generate_workout_plan(self.members[2], 'build muscle', 4, 3)
+        self.assertEqual(len(prompts), 2)
+
+        # Diet restrictions are order-insensitive
+        service.generate_diet_plan(self.members[0], 'cut', ['Vegan', 'gluten-free'])
+        service.generate_diet_plan(self.members[1], 'cut', ['gluten-free', 'vegan '])
+        self.assertEqual(len(prompts), 3)
+
+        stats = plan_cache.stats()
+        self.assertEqual((stats['misses'], stats['coalesced'], stats['hits']), (3, 2, 2))
+        self.assertEqual(stats['hit_rate'], round(4 / 7, 4))
+
+    async def test_streaming_endpoint_sends_chunks_then_saves_the_parsed_plan(self):
+        import json
+        from types import SimpleNamespace
+        from gym.ai_service import gemini_ai_service
+
+        pieces = ['```json\n{"plan_name": ', '"Streamed", ', '"weeks": []}\n```']
+
+        class FakeStream:
+            def __aiter__(self):
+                return self._chunks()
+
+            async def _chunks(self):
+                for piece in pieces:
+                    yield SimpleNamespace(text=piece)
+
+        class FakeStreamingModel:
+            calls = 0
+
+            async def generate_content_async(self, prompt, stream=False):
+                assert stream
+                FakeStreamingModel.calls += 1
+                return FakeStream()
+
+        model, configured = gemini_ai_service.model, gemini_ai_service.is_configured
+        gemini_ai_service.model, gemini_ai_service.is_configured = FakeStreamingModel(), True
+        self.addCleanup(setattr, gemini_ai_service, 'model', model)
+        self.addCleanup(setattr, gemini_ai_service, 'is_configured', configured)
+
+        await self.async_client.aforce_login(self.members[0].user)
+        session = await self.async_client.asession()
+        await session.aset('ai_connected', True)
+        await session.asave()
+
+        async def stream():
+            response = await self.async_client.post(
+                reverse('ai_plan_stream', args=['workout']), {'goal': 'strength', 'duration': 4, 'days_per_week': 3}
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+            return [
+                (event.split('\n')[0][len('event: '):], json.loads(event.split('\n')[1][len('data: '):]))
+                for event in body.strip().split('\n\n')
+            ]
+
+        events = await stream()
+        self.assertEqual([data for name, data in events if name == 'chunk'], pieces)
+        self.assertEqual(events[-1], ('done', {'success': True, 'redirect': reverse('view_workout_plan')}))
+
+        session = await self.async_client.asession()
+        plan = await session.aget('generated_workout_plan')
+        self.assertEqual(plan['plan'], {'plan_name': 'Streamed', 'weeks': []})
+
+        # The same prompt again is served from the plan cache without streaming
+        events = await stream()
+        self.assertEqual([name for name, _ in events], ['done'])
+        self.assertEqual(FakeStreamingModel.calls, 1)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from core.models import Attendance
+
+        self.tenant = Tenant.objects.create(name="API Gym", subdomain="apigym", contact_email="api@example.com")
+        self.member = make_member('apimember', self.tenant)
+        self.user = self.member.user
+        today = timezone.localdate()
+        # Many rows share a date (and check_in_time), so id has to break ties
+        Attendance.objects.bulk_create([
+            Attendance(tenant=self.tenant, member=self.member, date=today - timedelta(days=i % 4))
+            for i in range(45)
+        ])
+        self.expected = list(
+            Attendance.objects.filter(member=self.member).order_by('-date', '-check_in_time', '-id').values_list('id', flat=True)
+        )
+
+    def test_pages_walk_the_composite_key_without_count_or_offset(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_login(self.user)
+        url = '/api/member/attendance/?page_size=10'
+        seen, pages, query_counts = [], [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            query_counts.append(len(queries))
+            for query in queries.captured_queries:
+                self.assertNotIn('COUNT(', query['sql'].upper())
+                self.assertNotIn('OFFSET', query['sql'].upper())
+            pages.append(response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 5)
+        # The first request also warms the tenant cache; deep pages cost the same as page 2
+        self.assertEqual(len(set(query_counts[1:])), 1)
+
+        # Walking back from the last page returns the previous page exactly
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual([row['id'] for row in previous['results']], self.expected[30:40])
+        first = self.client.get(self.client.get(pages[1]['previous']).data['next']).data
+        self.assertEqual([row['id'] for row in first['results']], self.expected[10:20])
+
+        self.assertEqual(self.client.get('/api/member/attendance/?cursor=not-a-cursor').status_code, 404)
+
+
+class MemberDashboardCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="App Gym", subdomain="appgym", contact_email="app@example.com")
+        self.member = make_member('appmember', self.tenant, next_payment_date=timezone.localdate() + timezone.timedelta(days=5))
+        self.user = self.member.user
+        self.client.force_login(self.user)
+
+    def test_unchanged_dashboard_is_a_304_and_writes_invalidate_it(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import Attendance, Payment
+
+        url = '/api/member/dashboard/'
+        first = self.client.get(url)
+        self.assertEqual(first.json()['payment_due_days'], 5)
+        etag = first['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        dashboard_tables = ('"attendance"', 'core_attendance', 'core_payment', 'core_subscription', 'core_memberprofile')
+        self.assertFalse([q['sql'] for q in queries.captured_queries if any(t in q['sql'] for t in dashboard_tables)])
+
+        # A cache hit without a matching ETag still skips the dashboard queries
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).content, first.content)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if any(t in q['sql'] for t in dashboard_tables)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(tenant=self.tenant, member=self.member, date=timezone.localdate())
+            # Until the write commits, other requests keep getting the committed state
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['total_attendance'], 1)
+        self.assertNotEqual(changed['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(tenant=self.tenant, member=self.member, amount=500, payment_type='monthly')
+        self.assertEqual(len(self.client.get(url).json()['recent_payments']), 1)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Etag Gym", subdomain="etaggym", contact_email="etag@example.com")
+        self.trainer = CustomUser.objects.create_user(username='etagtrainer', password='password', role='trainer', tenant=self.tenant)
+        self.member = make_member('etagmember', self.tenant)
+
+    def test_unchanged_member_list_is_a_304_until_a_member_changes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_login(self.trainer)
+        url = '/api/trainer/members/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertIn('Last-Modified', first)
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if 'core_memberprofile' in q['sql']])
+        # Other query strings are other representations
+        self.assertEqual(self.client.get(url + '?page=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.age = 31
+            self.member.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_member_import_invalidates_the_member_list(self):
+        from gym.member_import import MemberImportPipeline
+
+        self.client.force_login(self.trainer)
+        url = '/api/trainer/members/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        csv_file = io.BytesIO(b'username,email,password\nimported,imported@example.com,secret\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = MemberImportPipeline(self.tenant).run(csv_file)
+        self.assertEqual(summary['imported'], 1)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('imported', [row['username'] for row in changed.json()['results']])
+
+    def test_branding_honours_if_none_match(self):
+        headers = {'HTTP_X_TENANT_ID': str(self.tenant.id)}
+        first = self.client.get('/api/branding/', **headers)
+        self.assertEqual(first.json()['app_name'], 'Etag Gym')
+        self.assertEqual(self.client.get('/api/branding/', HTTP_IF_NONE_MATCH=first['ETag'], **headers).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tenant.name = 'Renamed Gym'
+            self.tenant.save()
+        self.assertEqual(self.client.get('/api/branding/', HTTP_IF_NONE_MATCH=first['ETag'], **headers).status_code, 200)
+
+
+class ChatRoomTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from core.models import ChatMessage
+
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Chat Gym", subdomain="chatgym", contact_email="chat@example.com")
+        other_tenant = Tenant.objects.create(name="Other Gym", subdomain="othergym", contact_email="other@example.com")
+        self.user = CustomUser.objects.create_user(username='chatter', password='password', role='member', tenant=self.tenant)
+        outsider = CustomUser.objects.create_user(username='outsider', password='password', role='member', tenant=other_tenant)
+        ChatMessage.objects.bulk_create(
+            [ChatMessage(tenant=self.tenant, sender=self.user, room_name='general', content=f'message {i}') for i in range(60)]
+        )
+        ChatMessage.objects.create(tenant=other_tenant, sender=outsider, room_name='general', content='other gym')
+        self.client.force_login(self.user)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_history_pages_and_polls_only_return_unseen_rows(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = reverse('chat_room', args=['general'])
+        page = self.client.get(url)
+        messages = page.context['messages']
+        self.assertEqual([m.content for m in messages], [f'message {i}' for i in range(10, 60)])
+        self.assertTrue(page.context['has_older'])
+
+        older = self.client.get(f'{url}?before={messages[0].id}', HTTP_HX_REQUEST='true')
+        self.assertEqual(len(older.context['messages']), 10)
+        self.assertFalse(older.context['has_older'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {'content': 'hello'}, HTTP_HX_REQUEST='true').status_code, 204)
+        new = self.client.get(f'{url}?since_id={messages[-1].id}', HTTP_HX_REQUEST='true')
+        self.assertEqual([m.content for m in new.context['messages']], ['hello'])
+
+        # Nothing newer: a 204 from the cached latest id, without reading chat messages
+        with CaptureQueriesContext(connection) as queries:
+            empty = self.client.get(f"{url}?since_id={new.context['messages'][0].id}", HTTP_HX_REQUEST='true')
+        self.assertEqual(empty.status_code, 204)
+        self.assertFalse([q for q in queries.captured_queries if 'core_chatmessage' in q['sql']])
+
+    def test_polls_read_the_database_when_the_cache_is_not_shared(self):
+        from core.models import ChatMessage
+
+        url = reverse('chat_room', args=['general'])
+        latest = ChatMessage.objects.filter(tenant=self.tenant).latest('id')
+        self.assertEqual(self.client.get(f'{url}?since_id={latest.id}', HTTP_HX_REQUEST='true').status_code, 204)
+        # Posted without the on-commit refresh, as by another worker with its own cache
+        ChatMessage.objects.create(tenant=self.tenant, sender=self.user, room_name='general', content='elsewhere')
+        new = self.client.get(f'{url}?since_id={latest.id}', HTTP_HX_REQUEST='true')
+        self.assertEqual([m.content for m in new.context['messages']], ['elsewhere'])
+
+
+class ChatSocketTests(TransactionTestCase):
+    # Messages are published on commit, so these need real transactions
+
+    def setUp(self):
+        tenant = Tenant.objects.create(name="Socket Gym", subdomain="socketgym", contact_email="socket@example.com")
+        CustomUser.objects.create_user(username='chatter', password='password', role='member', tenant=tenant)
+        self.client.login(username='chatter', password='password')
+
+    async def test_websocket_pushes_new_messages_to_the_room(self):
+        import asyncio
+        import json
+        from unittest import mock
+        from core.models import ChatMessage
+        from gym.chat_service import InMemoryChatLayer, chat_service
+        from gym.chat_socket import chat_socket
+
+        cookie = f'sessionid={self.client.cookies["sessionid"].value}'.encode()
+
+        async def connect(headers):
+            inbound, outbound = asyncio.Queue(), asyncio.Queue()
+            scope = {'type': 'websocket', 'path': '/ws/chat/general/', 'headers': headers}
+            await inbound.put({'type': 'websocket.connect'})
+            task = asyncio.create_task(chat_socket(scope, inbound.get, outbound.put))
+            return inbound, outbound, task
+
+        with mock.patch.object(chat_service, '_layer', InMemoryChatLayer()):
+            _, outbound, task = await connect([(b'host', b'testserver'), (b'origin', b'http://evil.example')])
+            self.assertEqual((await outbound.get())['code'], 4403)
+            await task
+
+            inbound, outbound, task = await connect([(b'host', b'testserver'), (b'cookie', cookie)])
+            self.assertEqual((await outbound.get())['type'], 'websocket.accept')
+
+            await inbound.put({'type': 'websocket.receive', 'text': json.dumps({'content': 'live'})})
+            frame = await asyncio.wait_for(outbound.get(), 2)
+            self.assertTrue(await ChatMessage.objects.filter(content='live', tenant__isnull=False).aexists())
+            pushed = json.loads(frame['text'])
+            self.assertEqual((pushed['content'], pushed['sender']), ('live', 'chatter'))
+
+            await inbound.put({'type': 'websocket.disconnect'})
+            await asyncio.wait_for(task, 2)
+            self.assertFalse(chat_service.layer._groups)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from core.gamification_models import Exercise
+
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Rank Gym", subdomain="rankgym", contact_email="rank@example.com")
+        other = Tenant.objects.create(name="Other Rank Gym", subdomain="otherrank", contact_email="other@example.com")
+        self.exercise = Exercise.objects.create(name='Row', category='cardio', measurement_type='time')
+        self.members = [make_member(f'ranker{i}', self.tenant) for i in range(3)] + [make_member('outsider', other)]
+
+    def _log(self, member, count, days_ago=0):
+        from core.gamification_models import WorkoutLog
+
+        for _ in range(count):
+            WorkoutLog.objects.create(
+                member=member, exercise=self.exercise, value=10,
+                logged_at=timezone.now() - timezone.timedelta(days=days_ago),
+            )
+
+    def test_boards_rank_per_tenant_and_refresh_as_logs_arrive(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from gym.leaderboards import LeaderboardBuilder
+
+        first, second, third, outsider = self.members
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(first, 3)
+            self._log(second, 3)
+            self._log(third, 1, days_ago=400)
+            self._log(outsider, 9)
+
+        def board(period):
+            return [(entry.member_id, entry.rank, int(entry.score)) for entry in LeaderboardBuilder.top(self.tenant.id, 'workouts', period)]
+
+        # Ties share a rank; the other gym's member is not ranked here
+        self.assertEqual(board('month'), [(first.id, 1, 3), (second.id, 1, 3)])
+        self.assertEqual(board('all_time'), [(first.id, 1, 3), (second.id, 1, 3), (third.id, 3, 1)])
+        self.assertEqual(LeaderboardBuilder.top(self.tenant.id, 'pbs', 'all_time')[0].score, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(second, 1)
+        self.assertEqual(board('month'), [(second.id, 1, 4), (first.id, 2, 3)])
+
+        # The first view builds boards the signals have not covered yet; later ones only read them
+        self.client.force_login(first.user)
+        self.client.get(reverse('leaderboard'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('leaderboard') + '?period=all_time')
+        self.assertEqual([entry.member_id for entry in response.context['leaders']], [second.id, first.id, third.id])
+        self.assertFalse([q for q in queries.captured_queries if 'workout_logs' in q['sql']])
+
+    def test_a_transaction_queues_one_refresh_per_tenant(self):
+        from unittest import mock
+        from django.db import transaction
+        from django.test import override_settings
+        from gym.leaderboards import LeaderboardBuilder
+        from gym.tasks import refresh_tenant_leaderboards
+
+        first, second, _, outsider = self.members
+        with mock.patch.object(LeaderboardBuilder, 'refresh') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._log(first, 3)
+                    self._log(second, 2)
+                    self._log(outsider, 1)
+        workout_refreshes = sorted(call.args for call in refresh.call_args_list if call.args[0] == 'workouts')
+        self.assertEqual(workout_refreshes, sorted([('workouts', [self.tenant.id]), ('workouts', [outsider.tenant_id])]))
+
+        # With a broker the refresh moves to a worker, and one task covers later writes too
+        with override_settings(CELERY_BROKER_URL='memory://'), \
+                mock.patch.object(refresh_tenant_leaderboards, 'apply_async') as apply_async:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self._log(first, 2)
+        self.assertEqual(apply_async.call_args_list, [
+            mock.call(args=['workouts', self.tenant.id], countdown=LeaderboardBuilder.DEBOUNCE_SECONDS),
+        ])
+
+
+class PersonalBestEngineTests(TestCase):
+    def setUp(self):
+        from core.gamification_models import Exercise
+
+        self.tenant = Tenant.objects.create(name="PB Gym", subdomain="pbgym", contact_email="pb@example.com")
+        self.exercise = Exercise.objects.create(name='Deadlift', category='strength', measurement_type='weight')
+        self.member = make_member('lifter', self.tenant)
+        self.user = self.member.user
+
+    def test_logs_move_the_best_only_upwards_and_recompute_matches(self):
+        from core.gamification_models import PersonalBest, WorkoutLog
+        from gym.personal_bests import personal_best_engine
+
+        flags = [
+            WorkoutLog.objects.create(member=self.member, exercise=self.exercise, value=value).is_personal_best
+            for value in (100, 90, 120, 120)
+        ]
+        self.assertEqual(flags, [True, False, True, False])
+        pb = PersonalBest.objects.get(member=self.member, exercise=self.exercise)
+        self.assertEqual((pb.best_value, pb.previous_best, pb.times_improved), (120, 100, 1))
+
+        # A bulk import skips save(); the batch recompute brings rows and flags back in line
+        base = timezone.now()
+        WorkoutLog.objects.bulk_create([
+            WorkoutLog(member=self.member, exercise=self.exercise, value=150, logged_at=base + timezone.timedelta(minutes=1)),
+            WorkoutLog(member=self.member, exercise=self.exercise, value=140, logged_at=base + timezone.timedelta(minutes=2)),
+        ])
+        self.assertEqual(personal_best_engine.recompute(self.tenant.id), {'personal_bests': 1, 'pb_logs': 3})
+        pb.refresh_from_db()
+        self.assertEqual((pb.best_value, pb.previous_best, pb.times_improved), (150, 120, 2))
+        self.assertEqual(
+            list(WorkoutLog.objects.filter(is_personal_best=True).order_by('logged_at', 'id').values_list('value', flat=True)),
+            [100, 120, 150],
+        )
+
+    def test_log_workout_view_records_the_weight_as_the_value(self):
+        from core.gamification_models import PersonalBest
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('log_workout'), {'exercise': self.exercise.id, 'sets': 3, 'reps': 5, 'weight': '62.5'})
+        self.assertEqual(PersonalBest.objects.get(member=self.member).best_value, 62.5)
+
+    def test_a_failed_log_insert_leaves_the_personal_best_alone(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from core.gamification_models import PersonalBest, WorkoutLog
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('log_workout'), {'exercise': self.exercise.id, 'weight': '100'})
+        with mock.patch.object(WorkoutLog, '_do_insert', side_effect=IntegrityError('insert failed')):
+            self.client.post(reverse('log_workout'), {'exercise': self.exercise.id, 'weight': '150'})
+        pb = PersonalBest.objects.get(member=self.member)
+        self.assertEqual((pb.best_value, pb.times_improved), (100, 0))
+        self.assertEqual(WorkoutLog.objects.filter(member=self.member).count(), 1)
+
+
+class AchievementEngineTests(TestCase):
+    def setUp(self):
+        from core.gamification_models import Exercise
+
+        self.tenant = Tenant.objects.create(name="Badge Gym", subdomain="badgegym", contact_email="badge@example.com")
+        self.exercise = Exercise.objects.create(name='Bench Press', category='strength', measurement_type='weight')
+        self.today = timezone.localdate()
+        self.regular, self.lapsed = [
+            make_member(username, self.tenant, registration_date=self.today - timezone.timedelta(days=40))
+            for username in ('regular', 'lapsed')
+        ]
+
+    def _visit(self, member, *days_ago):
+        for days in days_ago:
+            Attendance.objects.create(tenant=self.tenant, member=member, date=self.today - timezone.timedelta(days=days))
+
+    def _earned(self, member):
+        from core.gamification_models import Achievement
+
+        return set(Achievement.objects.filter(member=member).values_list('achievement_type', flat=True))
+
+    def test_events_award_their_badges_and_the_sweep_adds_the_rest_once(self):
+        from core.gamification_models import WorkoutLog
+        from gym.achievements import AchievementEngine
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Seven days in a row, one of them with a second check-in
+            self._visit(self.regular, 6, 5, 4, 3, 3, 2, 1, 0)
+            # Six days, a missed day, then three more
+            self._visit(self.lapsed, 10, 9, 8, 7, 6, 5, 3, 2, 1)
+            WorkoutLog.objects.create(member=self.regular, exercise=self.exercise, value=80)
+
+        self.assertIn('attendance_7_day', self._earned(self.regular))
+        self.assertTrue({'first_workout', 'first_pb'} <= self._earned(self.regular))
+        self.assertNotIn('attendance_7_day', self._earned(self.lapsed))
+        self.assertNotIn('member_1_month', self._earned(self.regular))
+
+        # Tenure badges come from the sweep; badges already held are not re-awarded
+        awards = AchievementEngine().evaluate(tenant=self.tenant)
+        self.assertEqual(sorted((a.member_id, a.achievement_type) for a in awards),
+                         sorted([(self.regular.id, 'member_1_month'), (self.lapsed.id, 'member_1_month')]))
+        self.assertEqual(AchievementEngine().evaluate(tenant=self.tenant), [])
+
+        self.client.force_login(self.regular.user)
+        response = self.client.get(reverse('achievements'))
+        self.assertIn('7 Day Streak', [badge['name'] for badge in response.context['earned_badges']])
+
+    def test_sweep_matches_per_member_evaluation(self):
+        from django.db import transaction
+        from core.gamification_models import Achievement
+        from gym.achievements import AchievementEngine
+        from gym.benchmarking import seed_synthetic_tenant
+        from gym.personal_bests import PersonalBestEngine
+
+        tenant = seed_synthetic_tenant(30, days=60)
+        PersonalBestEngine().recompute(tenant.id)
+        member_ids = list(MemberProfile.objects.filter(tenant=tenant).values_list('id', flat=True))
+        engine = AchievementEngine()
+
+        with transaction.atomic():
+            for member_id in member_ids:
+                engine.evaluate(member_ids=[member_id])
+            one_by_one = set(Achievement.objects.filter(member__tenant=tenant).values_list('member_id', 'achievement_type'))
+            transaction.set_rollback(True)
+
+        engine.evaluate(tenant=tenant)
+        swept = set(Achievement.objects.filter(member__tenant=tenant).values_list('member_id', 'achievement_type'))
+        self.assertTrue(swept)
+        self.assertEqual(swept, one_by_one)
+
+
+class StreakServiceTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Streak Gym", subdomain="streakgym", contact_email="streak@example.com")
+        self.today = timezone.localdate()
+        self.steady, self.lapsed, self.absent = [
+            make_member(username, self.tenant, next_payment_date=self.today + timezone.timedelta(days=20))
+            for username in ('steady', 'lapsed', 'absent')
+        ]
+
+    def _visit(self, member, days_ago, status='Present'):
+        return Attendance.objects.create(
+            tenant=self.tenant, member=member, status=status, date=self.today - timezone.timedelta(days=days_ago)
+        )
+
+    def test_tenant_streaks_are_run_length_encoded_in_one_query(self):
+        from gym.streaks import tenant_streaks
+
+        for days_ago in (5, 4, 3, 3, 1, 0):
+            self._visit(self.steady, days_ago)
+        for days_ago in (10, 9, 8, 7):
+            self._visit(self.lapsed, days_ago)
+        self._visit(self.absent, 0, status='Absent')
+
+        with self.assertNumQueries(1):
+            streaks = tenant_streaks(self.tenant, self.today)
+        self.assertEqual(streaks, {self.steady.id: (2, 3), self.lapsed.id: (0, 4)})
+
+    def test_check_ins_extend_the_stored_streak_and_dashboards_show_it(self):
+        from core.gamification_models import MemberEngagementScore
+        from gym.engagement_service import EngagementScoringEngine, engagement_tracker
+
+        self._visit(self.steady, 2)
+        self._visit(self.steady, 1)
+        EngagementScoringEngine().refresh_members([self.steady.id])
+
+        def stored():
+            row = MemberEngagementScore.objects.get(member=self.steady)
+            return row.current_streak_days, row.longest_streak_days
+
+        self.assertEqual(stored(), (2, 2))
+        engagement_tracker.record_attendance(self._visit(self.steady, 0))
+        self.assertEqual(stored(), (3, 3))
+        # A back-dated check-in joins the run; it is recounted rather than extended
+        engagement_tracker.record_attendance(self._visit(self.steady, 3))
+        self.assertEqual(stored(), (4, 4))
+
+        self.client.force_login(self.steady.user)
+        for name in ('member_dashboard', 'gamification_dashboard'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.context['streaks'], {'current': 4, 'longest': 4})
+
+    def test_absent_marks_leave_the_stored_streak_alone(self):
+        from core.gamification_models import MemberEngagementScore
+        from gym.engagement_service import EngagementScoringEngine, engagement_tracker
+        from gym.streaks import tenant_streaks
+
+        self._visit(self.steady, 2)
+        self._visit(self.steady, 1)
+        EngagementScoringEngine().refresh_members([self.steady.id])
+
+        engagement_tracker.record_attendance(self._visit(self.steady, 0, status='Absent'))
+        row = MemberEngagementScore.objects.get(member=self.steady)
+        self.assertEqual((row.current_streak_days, row.longest_streak_days), (2, 2))
+        self.assertEqual(row.last_visit_date, self.today - timezone.timedelta(days=1))
+        self.assertEqual(tenant_streaks(self.tenant, self.today)[self.steady.id], (2, 2))
@@ -0,0 +1,126 @@
+"""
+Twilio Client Registry
+Process-wide, per-tenant Twilio clients that keep their HTTP connections alive
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+from core.models import BrandingConfig
+
+logger = logging.getLogger(__name__)
+
+
+# A ready client plus the sender numbers that go with its credentials
+TwilioAccount = namedtuple('TwilioAccount', ['client', 'account_sid', 'whatsapp_number', 'sms_number'])
+
+
+class TwilioClientRegistry:
+    """
+    One Twilio client per tenant (or the global account), built on first use.
+
+    Building a Client per message meant a BrandingConfig query, a new
+    requests.Session and a fresh TLS handshake for every send. Registry
+    clients share a pooled session sized for the broadcast worker threads,
+    so bulk sends reuse warm connections.
+
+    Entries are dropped when the tenant's BrandingConfig is saved or deleted
+    (gym.signals); TTL bounds how long other processes keep old credentials.
+    """
+
+    TTL = 300
+    HTTP_TIMEOUT = 15
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or self.TTL
+        self._accounts = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, tenant=None):
+        """TwilioAccount for the tenant (falling back to global settings), or None"""
+        tenant_id = tenant.id if tenant else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._accounts.get(tenant_id)
+            if entry and entry[0] > now:
+                return entry[1]
+            version = self._version
+
+        account = self._build(tenant)
+        with self._lock:
+            # Skip caching if credentials were invalidated while we built it
+            if version == self._version:
+                self._accounts[tenant_id] = (now + self.ttl, account)
+        return account
+
+    def _credentials(self, tenant):
+        account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
+        auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
+        whatsapp_number = getattr(settings, 'TWILIO_WHATSAPP_NUMBER', None)
+
+        if tenant:
+            try:
+                branding = BrandingConfig.objects.filter(tenant=tenant).first()
+            except Exception as e:
+                logger.error(f"Error fetching tenant credentials: {str(e)}")
+                branding = None
+            if branding and branding.twilio_account_sid and branding.twilio_auth_token:
+                account_sid = branding.twilio_account_sid
+                auth_token = branding.twilio_auth_token
+                whatsapp_number = branding.twilio_whatsapp_number or whatsapp_number
+                logger.info(f"Using tenant-specific Twilio credentials for: {tenant.name}")
+
+        sms_number = getattr(settings, 'TWILIO_SMS_NUMBER', None) or (whatsapp_number or '').replace('whatsapp:', '')
+        return account_sid, auth_token, whatsapp_number, sms_number or None
+
+    def _build(self, tenant):
+        account_sid, auth_token, whatsapp_number, sms_number = self._credentials(tenant)
+        if not (account_sid and auth_token):
+            return None
+        try:
+            client = Client(account_sid, auth_token, http_client=self._http_client())
+        except Exception as e:
+            logger.error(f"Failed to initialize Twilio Client: {str(e)}")
+            return None
+
+        api_base_url = getattr(settings, 'TWILIO_API_BASE_URL', '')
+        if api_base_url:
+            client.api.base_url = api_base_url
+        return TwilioAccount(client, account_sid, whatsapp_number, sms_number)
+
+    def _http_client(self):
+        http_client = TwilioHttpClient(pool_connections=True, timeout=self.HTTP_TIMEOUT)
+        pool_size = max(10, getattr(settings, 'WHATSAPP_SEND_WORKERS', 8))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        http_client.session.mount('https://', adapter)
+        http_client.session.mount('http://', adapter)
+        return http_client
+
+    def invalidate(self, tenant_id):
+        """
+        Forget the tenant's client so the next send picks up new credentials.
+        In-flight sends keep using the old client until they finish.
+        """
+        with self._lock:
+            self._accounts.pop(tenant_id, None)
+            self._version += 1
+
+    def clear(self):
+        with self._lock:
+            self._accounts.clear()
+            self._version += 1
+
+
+# Singleton instance
+twilio_clients = TwilioClientRegistry()
+
+
+# Convenience functions
+def get_twilio_account(tenant=None):
+    """Quick function to get the pooled Twilio account for a tenant"""
+    return twilio_clients.get(tenant)
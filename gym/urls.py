@@ -45,6 +45,11 @@ urlpatterns = [
     path('members/import-phones/', views.bulk_import_phones, name='bulk_import_phones'),
     path('members/bulk-import/', views.bulk_import_members, name='bulk_import_members'),
     path('members/import-sample/', views.download_member_import_sample, name='download_member_import_sample'),
+    path('members/bulk-import/<int:job_id>/', views.member_import_status, name='member_import_status'),
+    path('jobs/<int:job_id>/', views.background_job_detail, name='background_job_detail'),
+    path('jobs/<int:job_id>/status/', views.background_job_status, name='background_job_status'),
+    path('jobs/<int:job_id>/output/', views.background_job_output, name='background_job_output'),
+    path('jobs/<int:job_id>/errors.csv', views.background_job_error_report, name='background_job_error_report'),
     path('branding/', views.branding_settings, name='branding_settings'),
 
     # Member Routes
@@ -94,12 +99,14 @@ urlpatterns = [
     path('ai/workout/view/', ai_views.view_workout_plan, name='view_workout_plan'),
     path('ai/diet/generate/', ai_views.ai_diet_plan, name='ai_diet_plan'),
     path('ai/diet/view/', ai_views.view_diet_plan, name='view_diet_plan'),
+    path('ai/<str:kind>/stream/', ai_views.ai_plan_stream, name='ai_plan_stream'),
     path('ai/analytics/member/', ai_views.member_insights, name='member_insights'),
     path('ai/analytics/gym/', ai_views.gym_analytics, name='gym_analytics'),
     
     # ============================================
     # PHASE 2 MODERNIZATION - GAMIFICATION ROUTES
     # ============================================
+    path('gamification/', gamification_views.gamification_dashboard, name='gamification_dashboard'),
     path('gamification/log/', gamification_views.log_workout, name='log_workout'),
     path('gamification/leaderboard/', gamification_views.leaderboard, name='leaderboard'),
     path('gamification/achievements/', gamification_views.achievements_view, name='achievements'),
@@ -2,11 +2,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from core.models import CustomUser, MemberProfile, Attendance, Payment, Expense, ChatMessage, DietPlan, WorkoutVideo, LeaveRequest
+from core.models import CustomUser, MemberProfile, Attendance, Payment, Expense, DietPlan, WorkoutVideo, LeaveRequest
 from .forms import VideoForm, DietPlanForm, LeaveRequestForm, MemberAddForm, MemberEditForm, TrainerAddForm, TrainerEditForm, StaffAddForm, StaffEditForm
 from django.db.models import Sum, Q, Count
 from django.core.paginator import Paginator
 from core.decorators import role_required
+from .engagement_service import engagement_tracker
+from .streaks import streak_service
+from .dashboard_metrics import DashboardMetrics
+from .financial_rollup import FinancialRollupService
 
 @login_required
 def dashboard(request):
@@ -23,37 +27,23 @@ def dashboard(request):
 
 @login_required
 def admin_dashboard(request):
-    # Admin View Logic
-    total_members = MemberProfile.objects.count()
-    trainers_count = CustomUser.objects.filter(role='trainer').count()
-    staff_count = CustomUser.objects.filter(role='staff').count()
-    
-    income = Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    expense_total = Expense.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    profit = income - expense_total
-
-    context = {
-        'total_members': total_members,
-        'trainers_count': trainers_count,
-        'staff_count': staff_count,
-        'income': income,
-        'expense': expense_total,
-        'profit': profit,
-    }
+    # Admin View Logic - totals come from the per-tenant metrics cache
+    context = DashboardMetrics.get(getattr(request, 'tenant', None))
     return render(request, 'gym/admin_dashboard.html', context)
 
 @login_required
 def trainer_dashboard(request):
     # Trainer View Logic
-    total_members = MemberProfile.objects.count()
-    # Logic for something specific to trainer could go here
-    # For now, just total members and maybe recent payments?
+    tenant = getattr(request, 'tenant', None)
+    total_members = DashboardMetrics.get(tenant)['total_members']
     
-    recent_payments = Payment.objects.order_by('-date')[:5]
+    recent_payments = Payment.objects.select_related('member__user').order_by('-date')
+    if tenant:
+        recent_payments = recent_payments.filter(member__tenant=tenant)
 
     context = {
         'total_members': total_members,
-        'recent_payments': recent_payments,
+        'recent_payments': recent_payments[:5],
     }
     return render(request, 'gym/trainer_dashboard.html', context)
 
@@ -69,7 +59,7 @@ def member_dashboard(request):
     if 0 <= days_until_due <= 10:
         show_payment_alert = True
         
-    # Attendance Stats (Mock logic for now, or simple count)
+    # Attendance Stats
     total_attendance = Attendance.objects.filter(member=member, status='Present').count()
     
     context = {
@@ -77,6 +67,7 @@ def member_dashboard(request):
         'show_payment_alert': show_payment_alert,
         'days_until_due': days_until_due,
         'total_attendance': total_attendance,
+        'streaks': streak_service.member_streaks(member),
     }
     return render(request, 'gym/member_dashboard.html', context)
 
@@ -266,6 +257,7 @@ def add_member(request):
                     # 4. Create Initial Payment Record
                     total_initial = profile.registration_amount + profile.monthly_amount
                     Payment.objects.create(
+                        tenant=profile.tenant,
                         member=profile,
                         amount=total_initial,
                         payment_type='registration',
@@ -331,13 +323,14 @@ def mark_attendance(request):
         today = timezone.now().date()
         
         # Create attendance record
-        Attendance.objects.create(
+        attendance = Attendance.objects.create(
             tenant=request.tenant if hasattr(request, 'tenant') else None,
             member=member, 
             date=today, 
             check_in_time=timezone.now().time(),
             status=status
         )
+        engagement_tracker.record_attendance(attendance)
         messages.success(request, f"Attendance marked for {member.user.username} at {timezone.now().strftime('%I:%M %p')}")
         
         return redirect('mark_attendance')
@@ -386,9 +379,10 @@ def finance_overview(request):
         expenses_all = expenses_all.filter(date__lte=date_to)
         payments_all = payments_all.filter(date__lte=date_to)
         
-    income = payments_all.aggregate(Sum('amount'))['amount__sum'] or 0
-    expense_total = expenses_all.aggregate(Sum('amount'))['amount__sum'] or 0
-    profit = income - expense_total
+    totals = FinancialRollupService.totals(tenant, date_from or None, date_to or None)
+    income = totals['revenue']
+    expense_total = totals['expenses']
+    profit = totals['profit']
     
     # Paginate expenses
     expense_paginator = Paginator(expenses_all, 10)
@@ -457,27 +451,43 @@ def add_expense(request):
 
 @login_required
 def chat_room(request, room_name='general'):
-    messages_list = ChatMessage.objects.filter(room_name=room_name).select_related('sender').order_by('timestamp')
+    """
+    Room page with the latest page of history. HTMX calls fetch older pages
+    (?before=<id>) or, when the WebSocket is unavailable, rows after the last
+    one shown (?since_id=<id>, 204 when there are none); new messages are
+    pushed over /ws/chat/<room>/.
+    """
+    from django.http import HttpResponse
+    from .chat_service import chat_service
+
+    tenant_id = request.user.tenant_id
     
     if request.method == 'POST':
-        content = request.POST.get('content')
+        content = (request.POST.get('content') or '').strip()
         if content:
-            ChatMessage.objects.create(
-                sender=request.user,
-                room_name=room_name,
-                content=content
-            )
-            # If HTMX request, just return the messages list partial
-            if request.headers.get('HX-Request'):
-                 messages_list = ChatMessage.objects.filter(room_name=room_name).select_related('sender').order_by('timestamp')
-                 return render(request, 'gym/partials/chat_message_list.html', {'messages': messages_list})
-            return redirect('chat_room', room_name=room_name)
-    
-    # If HTMX polling request (GET)
+            chat_service.post(request.user, tenant_id, room_name, content)
+        # The sender's page receives the message like everyone else's
+        if request.headers.get('HX-Request'):
+            return HttpResponse(status=204)
+        return redirect('chat_room', room_name=room_name)
+    
+    context = {'room_name': room_name, 'has_older': False}
+    since_id = request.GET.get('since_id')
+    before = request.GET.get('before')
+    if request.headers.get('HX-Request') and since_id and since_id.isdigit():
+        # Most polls find nothing new; answer those from the cached latest id
+        if not chat_service.has_new(tenant_id, room_name, int(since_id)):
+            return HttpResponse(status=204)
+        context['messages'] = chat_service.since(tenant_id, room_name, int(since_id))
+        return render(request, 'gym/partials/chat_message_list.html', context)
+    
+    context['messages'], context['has_older'] = chat_service.history(
+        tenant_id, room_name, before=int(before) if before and before.isdigit() else None
+    )
     if request.headers.get('HX-Request'):
-         return render(request, 'gym/partials/chat_message_list.html', {'messages': messages_list})
+        return render(request, 'gym/partials/chat_message_list.html', context)
             
-    return render(request, 'gym/chat.html', {'messages': messages_list, 'room_name': room_name})
+    return render(request, 'gym/chat.html', context)
 
 @login_required
 def member_qr(request):
@@ -517,13 +527,14 @@ def attendance_scan(request):
                 member = MemberProfile.objects.get(user__username=code)
                 
                 # Mark attendance
-                Attendance.objects.create(
+                attendance = Attendance.objects.create(
                     tenant=getattr(request, 'tenant', None),
                     member=member,
                     date=timezone.now().date(),
                     check_in_time=timezone.now().time(),
                     status='Present'
                 )
+                engagement_tracker.record_attendance(attendance)
                 
                 msg = f'<div class="alert alert-success">Checked in: <strong>{member.user.username}</strong></div>'
                 return HttpResponse(msg)
@@ -538,25 +549,30 @@ def attendance_scan(request):
 @login_required
 def notification_check(request):
     """View to show due payments and send SMS reminders"""
-    today = timezone.now().date()
-    deadline = today + timezone.timedelta(days=10)
+    from .payment_reminders import sms_due_members
     
+    today = timezone.localdate()
     tenant = getattr(request, 'tenant', None)
-    due_members = MemberProfile.objects.filter(next_payment_date__range=[today, deadline]).select_related('user')
-    if tenant:
-        due_members = due_members.filter(tenant=tenant)
+    due_members = sms_due_members(tenant, today)
         
     if request.method == 'POST' and 'send_sms' in request.POST:
         if request.user.role not in ['admin', 'tenant_admin', 'super_admin']:
             messages.error(request, "Permission denied.")
             return redirect('notifications')
             
-        from .sms_service import sms_service
-        
-        template = "Hello {name}, your gym membership is due on {due_date}. Please pay soon to avoid interruption."
-        results = sms_service.send_bulk_sms(due_members, template)
+        from .background_jobs import start_job_once
         
-        messages.success(request, f"SMS Reminders: {results['successful']} sent, {results['failed']} failed.")
+        job, created = start_job_once(
+            f"sms_reminders:{tenant.id if tenant else 'global'}:{today.isoformat()}",
+            'sms_reminders',
+            tenant=tenant,
+            user=request.user,
+            params={'date': today.isoformat()},
+        )
+        if created:
+            messages.success(request, f"SMS reminders queued for {due_members.count()} member(s) (job #{job.id}).")
+        else:
+            messages.info(request, f"Today's SMS reminders were already sent (job #{job.id}).")
         return redirect('notifications')
     
     return render(request, 'gym/notifications.html', {'due_members': due_members})
@@ -568,44 +584,18 @@ def reports_view(request):
     """Analytics and Reports for Admin"""
     
     tenant = getattr(request, 'tenant', None)
+    today = timezone.now().date()
     
-    # Revenue Stats (Last 6 Months)
-    from django.db.models.functions import TruncMonth
-    from datetime import datetime, timedelta
-    
-    six_months_ago = timezone.now() - timedelta(days=180)
-    
-    payments = Payment.objects.all()
-    if tenant:
-        payments = payments.filter(tenant=tenant)
+    # All series come from the pre-aggregated daily rollup
+    from datetime import timedelta
     
-    monthly_revenue = payments.filter(date__gte=six_months_ago)\
-        .annotate(month=TruncMonth('date'))\
-        .values('month')\
-        .annotate(total=Sum('amount'))\
-        .order_by('month')
-
-    # Expense breakdown by category
-    expenses = Expense.objects.all()
-    if tenant:
-        expenses = expenses.filter(tenant=tenant)
-        
-    expense_breakdown = expenses.values('category')\
-        .annotate(total=Sum('amount'))\
-        .order_by('-total')
-
-    # Attendance Trends
-    attendance = Attendance.objects.all()
-    if tenant:
-        attendance = attendance.filter(tenant=tenant)
-        
-    daily_attendance = attendance.filter(date__gte=timezone.now() - timedelta(days=30))\
-        .values('date')\
-        .annotate(count=Count('id'))\
-        .order_by('date')
+    monthly_revenue = FinancialRollupService.monthly_revenue(tenant, since=today - timedelta(days=180))
+    expense_breakdown = FinancialRollupService.expense_breakdown(tenant)
+    daily_attendance = FinancialRollupService.daily_attendance(tenant, since=today - timedelta(days=30))
 
-    total_revenue = payments.aggregate(Sum('amount'))['amount__sum'] or 0
-    total_expenses = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
+    totals = FinancialRollupService.totals(tenant)
+    total_revenue = totals['revenue']
+    total_expenses = totals['expenses']
 
     context = {
         'monthly_revenue': monthly_revenue,
@@ -622,58 +612,11 @@ def reports_view(request):
 @login_required
 @role_required(['admin', 'tenant_admin', 'super_admin'])
 def export_report_pdf(request):
-    """Generate PDF report for the gym"""
-        
-    from django.template.loader import render_to_string
-    from xhtml2pdf import pisa
-    from django.http import HttpResponse
-    
-    tenant = getattr(request, 'tenant', None)
+    """Queue a PDF report for the gym and show its progress"""
+    from .report_export import export_report_pdf as queue_report_pdf
     
-    # Same logic as reports_view to get data
-    from django.db.models.functions import TruncMonth
-    from datetime import timedelta
-    
-    six_months_ago = timezone.now() - timedelta(days=180)
-    
-    payments = Payment.objects.all()
-    expenses = Expense.objects.all()
-    if tenant:
-        payments = payments.filter(tenant=tenant)
-        expenses = expenses.filter(tenant=tenant)
-    
-    monthly_revenue = payments.filter(date__gte=six_months_ago)\
-        .annotate(month=TruncMonth('date'))\
-        .values('month')\
-        .annotate(total=Sum('amount'))\
-        .order_by('month')
-
-    expense_breakdown = expenses.values('category')\
-        .annotate(total=Sum('amount'))\
-        .order_by('-total')
-
-    total_revenue = payments.aggregate(Sum('amount'))['amount__sum'] or 0
-    total_expenses = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    context = {
-        'monthly_revenue': monthly_revenue,
-        'expense_breakdown': expense_breakdown,
-        'total_revenue': total_revenue,
-        'total_expenses': total_expenses,
-        'profit': total_revenue - total_expenses,
-        'generate_date': timezone.now(),
-        'tenant': tenant,
-    }
-    
-    html = render_to_string('gym/report_pdf.html', context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="gym_report_{timezone.now().strftime("%Y%m%d")}.pdf"'
-    
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    
-    if pisa_status.err:
-        return HttpResponse('We had some errors <pre>' + html + '</pre>')
-    return response
+    job = queue_report_pdf(getattr(request, 'tenant', None), user=request.user)
+    return redirect('background_job_detail', job_id=job.id)
 
 @login_required
 @role_required(['trainer', 'admin', 'tenant_admin', 'super_admin'])
@@ -956,30 +899,18 @@ def send_whatsapp_message(request):
                 messages.warning(request, 'No members found in the selected time slot.')
                 return render(request, 'gym/send_whatsapp.html', {'form': form})
             
-            # Send messages
+            # Queue the broadcast; delivery happens in the background
             try:
-                whatsapp_log = whatsapp_service.send_to_time_slot(
+                job = whatsapp_service.send_to_time_slot(
                     time_slot=time_slot,
                     message_content=message_content,
                     sent_by_user=request.user
                 )
-                
-                if whatsapp_log.status == 'sent':
-                    messages.success(
-                        request,
-                        f'WhatsApp message sent successfully to {whatsapp_log.recipient_count} members!'
-                    )
-                elif whatsapp_log.status == 'failed':
-                    messages.error(
-                        request,
-                        f'Failed to send WhatsApp messages. Error: {whatsapp_log.error_message}'
-                    )
-                else:
-                    messages.warning(
-                        request,
-                        f'Message sent with some errors: {whatsapp_log.error_message}'
-                    )
-                
+                messages.success(
+                    request,
+                    f'WhatsApp broadcast to {recipient_count} members queued (job #{job.id}). '
+                    'Delivery status updates in the message history.'
+                )
                 return redirect('whatsapp_history')
                 
             except Exception as e:
@@ -1027,9 +958,10 @@ def whatsapp_history(request):
 @login_required
 @role_required(['admin', 'tenant_admin', 'super_admin', 'trainer'])
 def send_payment_reminder(request, member_id):
-    """Send WhatsApp payment reminder to a specific member"""
+    """Queue a WhatsApp payment reminder to a specific member"""
     from .whatsapp_service import whatsapp_service
-    from core.models import MemberProfile, WhatsAppMessage
+    from .background_jobs import start_job_once
+    from core.models import MemberProfile
     
     member = get_object_or_404(MemberProfile, id=member_id)
     
@@ -1041,122 +973,70 @@ def send_payment_reminder(request, member_id):
     if not whatsapp_service.is_configured(tenant=tenant):
         messages.error(request, "WhatsApp service is not configured for this gym. Please set up your Twilio credentials in Portal Settings.")
         return redirect('member_list')
-        
-    gym_name = member.tenant.name if member.tenant else "Your Gym"
-    amount = member.monthly_amount
-    due_date = member.next_payment_date.strftime('%B %d, %Y') if member.next_payment_date else "N/A"
-    
-    # Construct message
-    first_name = member.user.first_name or member.user.username
-    message_content = f"Hello {first_name}, this is a friendly reminder from {gym_name}. Your gym subscription payment of {amount} is due on {due_date}. Please clear it as soon as possible to continue your workouts. Thank you!"
-    
-    # Send message
-    result = whatsapp_service.send_message(member.phone_number, message_content, tenant=tenant)
-    
-    # Log the message in WhatsApp history
-    WhatsAppMessage.objects.create(
-        tenant=member.tenant,
-        sent_by=request.user,
-        recipients=[member.id],
-        message_content=message_content,
-        status='sent' if result['success'] else 'failed',
-        error_message=result.get('error', '') if not result['success'] else '',
-        recipient_count=1,
-        time_slot='payment_reminder'
-    )
     
-    if result['success']:
-        messages.success(request, f"Payment reminder sent to {member.user.username} via WhatsApp!")
+    # One reminder per member per day, however often the button is pressed
+    job, created = start_job_once(
+        f"whatsapp_reminder:{member.id}:{timezone.localdate().isoformat()}",
+        'whatsapp_reminder',
+        tenant=tenant,
+        user=request.user,
+        params={'member_id': member.id},
+    )
+    job.refresh_from_db()
+    if job.status == 'failed':
+        messages.error(request, f"Failed to send WhatsApp reminder: {job.error_message}")
+    elif created:
+        messages.success(request, f"Payment reminder to {member.user.username} queued for WhatsApp.")
     else:
-        messages.error(request, f"Failed to send WhatsApp reminder: {result.get('error')}")
+        messages.info(request, f"A payment reminder was already sent to {member.user.username} today.")
         
     return redirect('member_list')
 
 @login_required
 @role_required(['admin', 'tenant_admin', 'super_admin'])
 def bulk_import_phones(request):
-    """Bulk import phone numbers from CSV"""
+    """Bulk import phone numbers from CSV, with a dry-run preview"""
     
     from .forms import BulkPhoneImportForm
+    from .phone_import import PhoneImportPipeline
     import csv
-    import io
-    
-    from django.core.exceptions import ValidationError # Added for validation
     
+    preview = None
     if request.method == 'POST':
         form = BulkPhoneImportForm(request.POST, request.FILES)
         if form.is_valid():
-            csv_file = request.FILES['csv_file']
-            
-            # Read CSV file
+            pipeline = PhoneImportPipeline(getattr(request, 'tenant', None))
             try:
-                decoded_file = csv_file.read().decode('utf-8')
-                io_string = io.StringIO(decoded_file)
-                reader = csv.DictReader(io_string)
-                
-                success_count = 0
-                error_count = 0
-                errors = []
-                
-                for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-                    try:
-                        username = row.get('username', '').strip()
-                        phone_number = row.get('phone_number', '').strip()
-                        
-                        if not username or not phone_number:
-                            errors.append(f"Row {row_num}: Missing username or phone number")
-                            error_count += 1
-                            continue
-                        
-                        # Find member by username
-                        try:
-                            member = MemberProfile.objects.select_related('user').get(
-                                user__username=username
-                            )
-                        except MemberProfile.DoesNotExist:
-                            errors.append(f"Row {row_num}: Member '{username}' not found")
-                            error_count += 1
-                            continue
-                        
-                        # Validate phone number format
-                        try:
-                            phone_clean = MemberProfile.validate_phone(phone_number)
-                            member.phone_number = phone_clean
-                            member.save()
-                            success_count += 1
-                        except ValidationError as e:
-                            errors.append(f"Row {row_num}: Invalid phone format for '{username}' - {str(e)}")
-                            error_count += 1
-                            continue
-                        
-                    except Exception as e:
-                        errors.append(f"Row {row_num}: Error - {str(e)}")
-                        error_count += 1
-                
-                # Show results
-                if success_count > 0:
-                    messages.success(
-                        request,
-                        f'Successfully imported {success_count} phone number(s)!'
-                    )
-                
-                if error_count > 0:
-                    error_msg = f'{error_count} error(s) occurred:<br>'
+                pipeline.plan(request.FILES['csv_file'])
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error reading CSV file: {str(e)}')
+            else:
+                errors = pipeline.error_messages()
+                if errors:
+                    error_msg = f'{len(errors)} error(s) occurred:<br>'
                     error_msg += '<br>'.join(errors[:10])  # Show first 10 errors
                     if len(errors) > 10:
                         error_msg += f'<br>... and {len(errors) - 10} more errors'
                     messages.warning(request, error_msg)
                 
-                if success_count > 0:
-                    return redirect('member_list')
-                    
-            except Exception as e:
-                messages.error(request, f'Error reading CSV file: {str(e)}')
+                if form.cleaned_data['dry_run']:
+                    preview = pipeline.preview()
+                else:
+                    updated = pipeline.apply()
+                    if updated > 0:
+                        messages.success(
+                            request,
+                            f'Successfully imported {updated} phone number(s)!'
+                        )
+                        return redirect('member_list')
+                    if not errors:
+                        messages.info(request, 'All phone numbers are already up to date.')
     else:
         form = BulkPhoneImportForm()
     
     context = {
         'form': form,
+        'preview': preview,
     }
     return render(request, 'gym/bulk_import_phones.html', context)
 
@@ -1164,92 +1044,111 @@ def bulk_import_phones(request):
 @login_required
 @role_required(['admin', 'tenant_admin', 'super_admin'])
 def bulk_import_members(request):
-    """Bulk import members from CSV"""
+    """Bulk import members from CSV as a background job"""
     from .forms import BulkMemberImportForm
-    import csv
-    import io
-    from django.db import transaction
+    from .background_jobs import start_job
     
     if request.method == 'POST':
         form = BulkMemberImportForm(request.POST, request.FILES)
         if form.is_valid():
-            csv_file = request.FILES['csv_file']
-            try:
-                decoded_file = csv_file.read().decode('utf-8')
-                io_string = io.StringIO(decoded_file)
-                reader = csv.DictReader(io_string)
-                
-                success_count = 0
-                error_count = 0
-                errors = []
-                tenant = getattr(request, 'tenant', None)
-                
-                with transaction.atomic():
-                    for row_num, row in enumerate(reader, start=2):
-                        try:
-                            username = row.get('username', '').strip()
-                            email = row.get('email', '').strip()
-                            password = row.get('password', '').strip()
-                            first_name = row.get('first_name', '').strip()
-                            last_name = row.get('last_name', '').strip()
-                            
-                            if not username or not email or not password:
-                                errors.append(f"Row {row_num}: Missing username, email, or password")
-                                error_count += 1
-                                continue
-                            
-                            if CustomUser.objects.filter(username=username).exists():
-                                errors.append(f"Row {row_num}: Username '{username}' already exists")
-                                error_count += 1
-                                continue
-                                
-                            # Create User
-                            user = CustomUser.objects.create_user(
-                                username=username,
-                                email=email,
-                                password=password,
-                                first_name=first_name,
-                                last_name=last_name,
-                                role='member',
-                                tenant=tenant
-                            )
-                            
-                            # Create Profile
-                            MemberProfile.objects.create(
-                                user=user,
-                                tenant=tenant,
-                                membership_type=row.get('membership_type', 'monthly').lower(),
-                                age=int(row.get('age', 20)),
-                                phone_number=row.get('phone_number', ''),
-                                registration_amount=float(row.get('registration_amount', 0)),
-                                monthly_amount=float(row.get('monthly_amount', 0)),
-                                allotted_slot=row.get('allotted_slot', 'General'),
-                                address=row.get('address', ''),
-                                registration_date=timezone.now().date()
-                            )
-                            success_count += 1
-                            
-                        except Exception as e:
-                            errors.append(f"Row {row_num}: Error - {str(e)}")
-                            error_count += 1
-                
-                if success_count > 0:
-                    messages.success(request, f'Successfully imported {success_count} member(s)!')
-                
-                if error_count > 0:
-                    messages.warning(request, f'{error_count} error(s) occurred. Check details.')
-                    # You could show more details here if needed
-                
-                return redirect('member_list')
-                
-            except Exception as e:
-                messages.error(request, f'Error reading CSV file: {str(e)}')
+            job = start_job(
+                'member_import',
+                tenant=getattr(request, 'tenant', None),
+                user=request.user,
+                input_file=request.FILES['csv_file'],
+            )
+            messages.info(request, 'Import started. You can leave this page; progress is saved.')
+            return redirect('member_import_status', job_id=job.id)
     else:
         form = BulkMemberImportForm()
         
     return render(request, 'gym/bulk_import_members.html', {'form': form})
 
 
+def _get_tenant_job(request, job_id):
+    """BackgroundJob visible to the current user, or 404"""
+    from core.models import BackgroundJob
+    
+    tenant = getattr(request, 'tenant', None)
+    jobs = BackgroundJob.objects.filter(tenant=tenant) if tenant else BackgroundJob.objects.filter(tenant__isnull=True)
+    if not (request.user.is_superuser or request.user.role in ['admin', 'tenant_admin', 'super_admin']):
+        # Members and trainers only see the jobs they started
+        jobs = jobs.filter(created_by=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+
+def _job_next_url(request):
+    """Same-site ?next= target to open once a job finishes"""
+    from django.utils.http import url_has_allowed_host_and_scheme
+    
+    next_url = request.GET.get('next', '')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return next_url
+    return ''
+
+
+@login_required
+@role_required(['admin', 'tenant_admin', 'super_admin'])
+def member_import_status(request, job_id):
+    """Progress page for a member import"""
+    job = _get_tenant_job(request, job_id)
+    return render(request, 'gym/member_import_status.html', {'job': job})
+
+
+@login_required
+def background_job_detail(request, job_id):
+    """Progress page for any background job"""
+    job = _get_tenant_job(request, job_id)
+    return render(request, 'gym/background_job.html', {'job': job, 'next_url': _job_next_url(request)})
+
+
+@login_required
+def background_job_status(request, job_id):
+    """Job progress/result as JSON, or the progress partial for HTMX polling"""
+    from django.http import JsonResponse
+    
+    job = _get_tenant_job(request, job_id)
+    if request.headers.get('HX-Request'):
+        next_url = _job_next_url(request)
+        response = render(request, 'gym/partials/job_progress.html', {'job': job, 'next_url': next_url})
+        if next_url and job.status == 'completed':
+            response['HX-Redirect'] = next_url
+        return response
+    return JsonResponse(job.as_dict())
+
+
+@login_required
+def background_job_output(request, job_id):
+    """Download the file a finished job produced"""
+    from django.http import FileResponse, Http404
+    import os
+    
+    job = _get_tenant_job(request, job_id)
+    if job.status != 'completed' or not job.output_file:
+        raise Http404("This job has no output file")
+    
+    return FileResponse(
+        job.output_file.open('rb'),
+        as_attachment=True,
+        filename=job.result.get('filename') or os.path.basename(job.output_file.name),
+    )
+
+
+@login_required
+@role_required(['admin', 'tenant_admin', 'super_admin'])
+def background_job_error_report(request, job_id):
+    """Download the per-row error report of a finished job as CSV"""
+    from django.http import HttpResponse, Http404
+    
+    job = _get_tenant_job(request, job_id)
+    if not job.error_report:
+        raise Http404("This job has no error report")
+    
+    response = HttpResponse(job.error_report, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{job.job_type}_{job.id}_errors.csv"'
+    return response
+
+
 @login_required
 @role_required(['admin', 'tenant_admin', 'super_admin'])
 def download_member_import_sample(request):
@@ -0,0 +1,252 @@
+"""
+WhatsApp Broadcast Dispatcher
+Sends broadcast messages concurrently with per-tenant rate limiting and retries
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from twilio.base.exceptions import TwilioException, TwilioRestException
+from core.models import MemberProfile, WhatsAppMessage, WhatsAppDelivery
+from .background_jobs import job_runner, start_job
+from .whatsapp_service import whatsapp_service
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class BroadcastDispatcher:
+    """
+    Deliver one message body to many recipients through a bounded thread pool.
+
+    Every send takes a token from the tenant's bucket first, so concurrent
+    broadcasts from one gym share its rate limit. Twilio 429s, 5xx responses
+    and connection errors are retried with exponential backoff and jitter;
+    other errors (bad number, unverified sender...) fail the recipient at once.
+
+    Worker threads only talk to Twilio. Delivery rows and job progress are
+    written from the dispatching thread in batches.
+    """
+
+    MAX_ATTEMPTS = 4
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 8.0
+    WRITE_BATCH = 25
+
+    def __init__(self, max_workers=None, rate=None, sleep=time.sleep):
+        self.max_workers = max_workers
+        self.rate = rate
+        self.sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def bucket(self, tenant_id):
+        with self._lock:
+            bucket = self._buckets.get(tenant_id)
+            if bucket is None:
+                rate = self.rate or getattr(settings, 'WHATSAPP_SEND_RATE', 10)
+                bucket = self._buckets[tenant_id] = TokenBucket(rate, sleep=self.sleep)
+            return bucket
+
+    @staticmethod
+    def is_retryable(error):
+        if isinstance(error, TwilioRestException):
+            return error.status == 429 or error.status >= 500
+        return True  # Connection errors and timeouts
+
+    def backoff(self, attempt):
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def send_one(self, client, from_number, bucket, to, body):
+        """
+        Send with retries.
+
+        Returns:
+            dict with success, message_sid, error, attempts
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            bucket.acquire()
+            try:
+                message = client.messages.create(body=body, from_=from_number, to=to)
+                return {'success': True, 'message_sid': message.sid, 'error': None, 'attempts': attempt}
+            except (TwilioException, OSError) as e:
+                if attempt >= self.MAX_ATTEMPTS or not self.is_retryable(e):
+                    logger.warning(f"WhatsApp send to {to} failed after {attempt} attempt(s): {e}")
+                    return {'success': False, 'message_sid': None, 'error': str(e), 'attempts': attempt}
+                self.sleep(self.backoff(attempt))
+
+    def send_many(self, tenant, messages):
+        """
+        Send (key, phone_number, body) messages concurrently.
+
+        Yields (key, result) as sends complete, in completion order.
+        """
+        client, from_number = whatsapp_service.get_client(tenant)
+        if not client:
+            for key, _, _ in messages:
+                yield key, {'success': False, 'message_sid': None, 'attempts': 0,
+                            'error': 'WhatsApp service not configured for this gym'}
+            return
+
+        bucket = self.bucket(tenant.id if tenant else None)
+        workers = self.max_workers or getattr(settings, 'WHATSAPP_SEND_WORKERS', 8)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whatsapp-send') as pool:
+            futures = {}
+            for key, phone_number, body in messages:
+                to = whatsapp_service.format_phone_number(phone_number)
+                futures[pool.submit(self.send_one, client, from_number, bucket, to, body)] = key
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    # ------------------------------------------------------------------
+    # Broadcasts
+    # ------------------------------------------------------------------
+
+    def queue_broadcast(self, tenant, sent_by, time_slot, message_content):
+        """
+        Record a broadcast and its per-recipient rows, then queue the send.
+
+        Returns:
+            the BackgroundJob delivering it
+        """
+        members = MemberProfile.objects.filter(tenant=tenant)
+        if time_slot != 'all':
+            members = members.filter(allotted_slot=time_slot)
+        recipients = list(members.exclude(phone_number__isnull=True).exclude(phone_number='').values_list(
+            'id', 'phone_number'
+        ))
+
+        whatsapp_log = WhatsAppMessage.objects.create(
+            tenant=tenant,
+            sent_by=sent_by,
+            time_slot=time_slot,
+            message_content=message_content,
+            status='pending',
+            recipients=[member_id for member_id, _ in recipients],
+            recipient_count=len(recipients),
+        )
+        if not recipients:
+            whatsapp_log.status = 'failed'
+            whatsapp_log.error_message = 'No phone numbers found for members in this slot'
+            whatsapp_log.save(update_fields=['status', 'error_message'])
+
+        WhatsAppDelivery.objects.bulk_create(
+            [
+                WhatsAppDelivery(message=whatsapp_log, member_id=member_id, phone_number=phone_number)
+                for member_id, phone_number in recipients
+            ],
+            batch_size=500,
+        )
+        return start_job(
+            'whatsapp_broadcast',
+            tenant=tenant,
+            user=sent_by,
+            params={'whatsapp_message_id': whatsapp_log.id},
+        )
+
+    def dispatch(self, whatsapp_log, job=None):
+        """Send every pending delivery of a broadcast and record the outcome"""
+        deliveries = {delivery.id: delivery for delivery in whatsapp_log.deliveries.filter(status='pending')}
+        if job is not None:
+            job.set_progress(0, len(deliveries))
+
+        pending_writes = []
+        done = 0
+        body = whatsapp_log.message_content
+        results = self.send_many(
+            whatsapp_log.tenant,
+            [(delivery.id, delivery.phone_number, body) for delivery in deliveries.values()],
+        )
+        for delivery_id, result in results:
+            delivery = deliveries[delivery_id]
+            delivery.status = 'sent' if result['success'] else 'failed'
+            delivery.message_sid = result['message_sid'] or ''
+            delivery.error_message = result['error'] or ''
+            delivery.attempts += result['attempts']
+            delivery.updated_at = timezone.now()
+            pending_writes.append(delivery)
+            done += 1
+            if len(pending_writes) >= self.WRITE_BATCH:
+                self._write(pending_writes, job, done)
+                pending_writes = []
+        self._write(pending_writes, job, done)
+
+        return self.finish(whatsapp_log)
+
+    @staticmethod
+    def _write(deliveries, job, done):
+        if deliveries:
+            WhatsAppDelivery.objects.bulk_update(
+                deliveries, fields=['status', 'message_sid', 'error_message', 'attempts', 'updated_at']
+            )
+        if job is not None:
+            job.set_progress(done)
+
+    @staticmethod
+    def finish(whatsapp_log):
+        """Roll delivery rows up into the broadcast's status"""
+        counts = dict(
+            whatsapp_log.deliveries.values('status').annotate(total=Count('id')).values_list('status', 'total')
+        )
+        sent, failed = counts.get('sent', 0), counts.get('failed', 0)
+        if not sent and not failed:
+            return {'sent': 0, 'failed': 0}
+
+        if failed == 0:
+            whatsapp_log.status = 'sent'
+        elif sent > 0:
+            whatsapp_log.status = 'sent'
+            whatsapp_log.error_message = f"{failed} messages failed to send"
+        else:
+            whatsapp_log.status = 'failed'
+            whatsapp_log.error_message = "All messages failed to send"
+        whatsapp_log.save(update_fields=['status', 'error_message'])
+        return {'sent': sent, 'failed': failed}
+
+
+# Singleton instance
+broadcast_dispatcher = BroadcastDispatcher()
+
+
+@job_runner.register('whatsapp_broadcast', queue='messaging')
+def run_whatsapp_broadcast_job(job):
+    """BackgroundJob handler delivering a queued broadcast"""
+    whatsapp_log = WhatsAppMessage.objects.select_related('tenant').get(pk=job.params['whatsapp_message_id'])
+    summary = broadcast_dispatcher.dispatch(whatsapp_log, job=job)
+    return {'result': {'whatsapp_message_id': whatsapp_log.id, **summary}}
@@ -1,7 +1,21 @@
+"""
+ASGI entry point, served by start.sh through Gunicorn's Uvicorn workers (or directly with
+`uvicorn gym_management.asgi:application`)
+so async views such as the streaming AI plan endpoint do not tie up a worker per request,
+and so chat rooms can push new messages over WebSockets (/ws/chat/<room_name>/).
+"""
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym_management.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from gym.chat_socket import chat_socket  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await chat_socket(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,15 @@
+"""
+Celery application
+Workers run BackgroundJobs and the periodic tasks from CELERY_BEAT_SCHEDULE:
+
+    celery -A gym_management worker -Q default,messaging,ai,reports,analytics
+    celery -A gym_management beat
+"""
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gym_management.settings')
+
+app = Celery('gym_management')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     'drf_spectacular',
+    'django_celery_beat',
     
     # Local apps
     'core',
@@ -80,6 +81,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'gym_management.wsgi.application'
+ASGI_APPLICATION = 'gym_management.asgi.application'
 
 
 # Database
@@ -94,6 +96,102 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis when REDIS_URL is set (shared across workers), per-process memory otherwise
+
+REDIS_URL = config('REDIS_URL', default='')
+
+# Whether every web worker shares the default cache. Caches kept current with
+# deltas (dashboard totals) or read in place of the database (the newest chat
+# message id answering polls) are only enabled when it does. Set it for a
+# single-process deployment on LocMem as well.
+SHARED_CACHE = config('SHARED_CACHE', default=bool(REDIS_URL), cast=bool)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gym-management',
+        }
+    }
+
+
+# Background jobs
+# Long-running work (imports, messaging, AI plans, PDF exports) is recorded as a
+# BackgroundJob and handed to Celery when CELERY_BROKER_URL is set, otherwise to
+# in-process worker threads; set BACKGROUND_JOBS_EAGER to run it inline instead.
+
+BACKGROUND_JOBS_EAGER = config('BACKGROUND_JOBS_EAGER', default=False, cast=bool)
+BACKGROUND_JOB_WORKERS = config('BACKGROUND_JOB_WORKERS', default=2, cast=int)
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0, cast=int)  # 0 = one per CPU
+BACKGROUND_JOB_FILES_ROOT = config('BACKGROUND_JOB_FILES_ROOT', default=str(BASE_DIR / 'private' / 'jobs'))
+
+# Celery
+# One queue per workload so slow AI calls or PDF renders never hold up messaging.
+# CELERY_TASK_ALWAYS_EAGER runs tasks in-process (tests, local development).
+# The broker is opt-in and not derived from REDIS_URL: once it is set, jobs wait
+# for a worker, and the schedule below only runs with a beat process.
+
+from celery.schedules import crontab
+
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'gym.tasks.send_payment_reminders': {'queue': 'messaging'},
+    'gym.tasks.send_tenant_payment_reminders': {'queue': 'messaging'},
+    'gym.tasks.expire_engagement_windows': {'queue': 'analytics'},
+    'gym.tasks.expire_tenant_engagement_windows': {'queue': 'analytics'},
+    'gym.tasks.train_churn_models': {'queue': 'analytics'},
+    'gym.tasks.rebuild_recent_rollups': {'queue': 'reports'},
+    'gym.tasks.rebuild_leaderboards': {'queue': 'analytics'},
+    'gym.tasks.refresh_tenant_leaderboards': {'queue': 'analytics'},
+    'gym.tasks.award_achievements': {'queue': 'analytics'},
+    'gym.tasks.award_tenant_achievements': {'queue': 'analytics'},
+}
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'send-payment-reminders': {
+        'task': 'gym.tasks.send_payment_reminders',
+        'schedule': crontab(hour=9, minute=0),
+    },
+    'expire-engagement-windows': {
+        'task': 'gym.tasks.expire_engagement_windows',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'train-churn-models': {
+        'task': 'gym.tasks.train_churn_models',
+        'schedule': crontab(hour=3, minute=0, day_of_week='sunday'),
+    },
+    'rebuild-recent-rollups': {
+        'task': 'gym.tasks.rebuild_recent_rollups',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'rebuild-leaderboards': {
+        'task': 'gym.tasks.rebuild_leaderboards',
+        'schedule': crontab(minute=15),
+    },
+    'award-achievements': {
+        'task': 'gym.tasks.award_achievements',
+        'schedule': crontab(hour=2, minute=30),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -217,6 +315,9 @@ LOGOUT_REDIRECT_URL = 'login'
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_WHATSAPP_NUMBER = config('TWILIO_WHATSAPP_NUMBER', default='whatsapp:+14155238886')
+TWILIO_API_BASE_URL = config('TWILIO_API_BASE_URL', default='')  # Override for a local/fake Twilio API
+WHATSAPP_SEND_RATE = config('WHATSAPP_SEND_RATE', default=10, cast=float)  # Messages per second per tenant
+WHATSAPP_SEND_WORKERS = config('WHATSAPP_SEND_WORKERS', default=8, cast=int)
 
 # ============================================
 # PHASE 1 MODERNIZATION - PAYMENT GATEWAYS
@@ -11,5 +11,5 @@ python create_superuser.py || echo "Superuser creation skipped or failed (might
 echo "Creating Demo Tenant..."
 python manage.py create_demo_tenant || echo "Demo tenant creation skipped (might already exist)"
 
-echo "Starting Gunicorn..."
-gunicorn gym_management.wsgi
+echo "Starting Gunicorn (Uvicorn workers)..."
+gunicorn -k uvicorn.workers.UvicornWorker gym_management.asgi:application